@@ -1,33 +1,120 @@
-from flask import Flask, render_template, jsonify, request, send_file
+import hmac
+import os
+
+# Green-thread servers have to patch the standard library before anything else is imported
+ASYNC_MODE = os.environ.get('ASYNC_MODE', 'threading')
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, render_template, jsonify, request, abort, send_from_directory
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 import random
-import os
-import glob
-import string
-from pathlib import Path
-from io import BytesIO
-from difflib import SequenceMatcher
+import time
 import audio_output
+import audio_spool
+import audio_store
 import difficulty
+import fact_round
+import image_assets
+import image_catalog
+import input_sync
+import metrics
+import models
+import name_index
+import party_codes
+import party_store
+import profiler
+import round_payloads
+import round_results
+import timer_wheel
+import task_pool
 import word_generator
+import workers
+from round_prefetch import AudioPrefetcher
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 CORS(app)
 app.config['SECRET_KEY'] = 'cognitive-overload-secret'
-socketio = SocketIO(app, cors_allowed_origins="*")
+# With several worker processes, a message queue (e.g. redis://host) relays emits between them
+# SOCKETIO_SERIALIZER=msgpack sends binary packets (pip3 install msgpack; game.html loads the
+# matching client parser)
+SOCKETIO_SERIALIZER = os.environ.get('SOCKETIO_SERIALIZER', 'default')
+socketio = SocketIO(
+    app, cors_allowed_origins="*", async_mode=ASYNC_MODE,
+    message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None,
+    serializer=SOCKETIO_SERIALIZER,
+)
+# Every emit records its fan-out for /metrics
+metrics.count_emits(socketio)
+# gTTS and MP3 assembly run on this bounded pool so they never hold up other parties' events
+workers.configure(ASYNC_MODE)
 
 # ── Party / session management ──────────────────────────────────
-parties = {}           # code -> party dict
-player_sessions = {}   # socket sid -> {party_code, name, role}
+# State lives in a PartyStore (PARTY_STORE: memory, sqlite:///path or redis://host, see
+# party_store.py). Handlers mutate the cached dicts, then call parties.save(code) or
+# player_sessions.save(sid) so other workers see the change.
+party_state = party_store.open_store(os.environ.get('PARTY_STORE', 'memory'))
+parties = party_store.StateMap(party_state, 'party')                # code -> models.Party
+player_sessions = party_store.StateMap(party_state, 'session')      # socket sid -> {party_code, name, role}
+# This process's slot when several workers share the load (parties are routed by code)
+WORKER_INDEX = int(os.environ.get('WORKER_INDEX', 0))
+WORKER_COUNT = int(os.environ.get('WORKER_COUNT', 1))
+name_indexes = {}      # code -> NameIndex of the lobby's names, for voice help requests
+MAX_HELP_TRANSCRIPTS = 5  # speech recognition alternatives checked per help request
+
+# Live answer inputs, coalesced per (player, field) and flushed to the party on a fixed tick
+input_buffers = input_sync.InputCoalescer(
+    lambda sid, batch: socketio.emit('sync_input_batch', batch, room=sid),
+    lambda code: list(party.players) if (party := parties.cached(code)) else [],
+)
+
+
+# Generated round audio, held in memory and served by /api/audio/<clip id>.
+# Clips of live rounds that overflow the memory budget spill to a reaped disk spool. Each worker
+# spools into its own subdirectory, since start() empties it.
+audio_clip_spool = audio_spool.AudioSpool(
+    audio_spool.worker_spool_dir(os.environ.get('AUDIO_SPOOL_DIR', audio_spool.DEFAULT_SPOOL_DIR),
+                                 WORKER_INDEX),
+    ttl_seconds=float(os.environ.get('AUDIO_SPOOL_TTL', audio_spool.DEFAULT_TTL_SECONDS)),
+    max_bytes=int(os.environ.get('AUDIO_SPOOL_MB', 256)) * 1024 * 1024,
+)
+audio_clips = audio_store.AudioStore(
+    int(os.environ.get('AUDIO_STORE_MB', 64)) * 1024 * 1024,
+    spool=audio_clip_spool,
+)
+
+# ── Metrics (GET /metrics) ──────────────────────────────────────
+# Event handlers are timed by @metrics.instrument; these cover the work inside request_round
+TTS_SECONDS = metrics.histogram('tts_render_seconds', 'Round audio synthesis time (clip cache or gTTS)')
+TTS_FAILURES = metrics.counter('tts_failures_total', 'Round audio syntheses that failed')
+TTS_FIRST_CHUNK_SECONDS = metrics.histogram('tts_first_chunk_seconds',
+                                            'Time until the first chunk of streamed round audio')
+AUDIO_BYTES_SERVED = metrics.counter('audio_served_bytes_total', 'Audio bytes sent by /api/audio')
+VISUAL_TASK_SECONDS = metrics.histogram(
+    'visual_task_seconds', 'Time to produce a round\'s visual task', ['source'],  # source: pool | built
+)
+metrics.gauge('parties', 'Parties held by this worker', lambda: len(parties))
+metrics.gauge('audio_store_bytes', 'Round audio held in memory', lambda: audio_clips.total_bytes)
+
+
+# Party codes come from a pre-shuffled pool; freed codes cool down before reuse. Only codes
+# routed to this worker are handed out, optionally behind a fixed prefix (PARTY_CODE_PREFIX).
+code_allocator = party_codes.CodeAllocator(
+    prefix=os.environ.get('PARTY_CODE_PREFIX', '').upper(),
+    accept=lambda code: (
+        party_store.worker_for_party(code, WORKER_COUNT) == WORKER_INDEX and code not in parties
+    ),
+)
 
 
 def generate_party_code():
-    """Generate a unique 4-character alphanumeric party code"""
-    while True:
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        if code not in parties:
-            return code
+    """Generate a unique 4-character alphanumeric party code routed to this worker"""
+    return code_allocator.allocate()
 
 
 # Scripted visual tasks for first 5 rounds (no addition tasks)
@@ -52,6 +139,12 @@ IMAGE_ALIASES = {
     'icecream': ['i'],           # no space in filename, still i for ice cream
 }
 
+# Clipart / colored image index, rebuilt in the background when static/images changes
+images = image_catalog.CatalogHolder(IMAGE_ALIASES)
+
+# Resized WebP/AVIF variants of those images (built by image_assets.py)
+image_variants = image_assets.AssetManifest(avif=os.environ.get('IMAGE_AVIF') == '1')
+
 # Visual task templates - weighted to favor clipart images (2.5:1:1:1 ratio)
 # More clipart entries = higher probability of image tasks
 VISUAL_TASK_TYPES = ['clipart_images', 'clipart_images', 'clipart_images', 'clipart_images', 'clipart_images', 
@@ -59,59 +152,20 @@ VISUAL_TASK_TYPES = ['clipart_images', 'clipart_images', 'clipart_images', 'clip
 
 def generate_clipart_task(difficulty_level, num_items):
     """Generate a clipart-based image selection task"""
-    # Scan the static/images directory for available images
-    image_files = [f for f in os.listdir('static/images') if f.endswith(('.png', '.jpg', '.jpeg', '.svg'))]
-    
+    catalog = images.catalog
+
     # If no images are found, return None
-    if not image_files:
+    if not catalog.stems:
         return None
 
-    # Get item names from filenames
-    items = [Path(f).stem for f in image_files]
-    
-    # Try to find a letter that has at least one matching image
-    max_attempts = 20
-    letter = None
-    selected_items = []
-    correct_items = []
-    ambiguous_items = []  # Items that can be clicked or not without penalty
-    
-    for attempt in range(max_attempts):
-        test_letter = random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
-        test_selected = random.sample(items, min(num_items, len(items)))
-        
-        # Check which items match this letter
-        test_correct = []
-        test_ambiguous = []
-        for item in test_selected:
-            item_lower = item.lower()
-            # Check if item starts with the letter (primary match)
-            if item_lower.startswith(test_letter.lower()):
-                test_correct.append(item)
-            # Check aliases - these are ambiguous/optional
-            elif item_lower in IMAGE_ALIASES:
-                if test_letter.lower() in [alias.lower() for alias in IMAGE_ALIASES[item_lower]]:
-                    test_ambiguous.append(item)
-        
-        # Accept if we have at least one correct item and not too many
-        if 1 <= len(test_correct) <= len(test_selected) - 1:
-            letter = test_letter
-            selected_items = test_selected
-            correct_items = test_correct
-            ambiguous_items = test_ambiguous
-            break
-    
-    # Fallback: if no good letter found, just pick the first letter of a random item
-    if letter is None:
-        selected_items = random.sample(items, min(num_items, len(items)))
-        letter = selected_items[0][0].upper()
-        correct_items = [item for item in selected_items if item.upper().startswith(letter)]
-        ambiguous_items = []
-    
+    # Letter with at least one matching image (but not all), drawn from the catalog's letter tables
+    letter, selected_items, correct_items, ambiguous_items = catalog.sample_letter_items(num_items)
+
     # Map item names back to full filenames for the frontend
-    selected_filenames = [f for f in image_files if Path(f).stem in selected_items]
-    correct_filenames = [f for f in image_files if Path(f).stem in correct_items]
-    ambiguous_filenames = [f for f in image_files if Path(f).stem in ambiguous_items]
+    filename_by_stem = catalog.filename_by_stem
+    selected_filenames = [filename_by_stem[item] for item in selected_items]
+    correct_filenames = [filename_by_stem[item] for item in correct_items]
+    ambiguous_filenames = [filename_by_stem[item] for item in ambiguous_items]
 
     return {
         'type': 'clipart_images',
@@ -124,186 +178,167 @@ def generate_clipart_task(difficulty_level, num_items):
     }
 
 def load_color_images():
-    """Load color images from static/images/colored and group by color"""
-    image_dir = 'static/images/colored'
-    if not os.path.exists(image_dir):
-        return {}
-
-    image_files = [f for f in os.listdir(image_dir) if f.endswith(('.png', '.jpg', '.jpeg'))]
-
-    # Group images by color (extract from filename)
-    color_groups = {}
-    for filename in image_files:
-        # Extract color from filename: "red.png" -> "red", "red1.png" -> "red"
-        stem = Path(filename).stem
-        # Split on digits to get the base color name
-        color = ''.join(c for c in stem if not c.isdigit())
-        if color:
-            if color not in color_groups:
-                color_groups[color] = []
-            color_groups[color].append(filename)
-
-    return color_groups
+    """Color -> image files in static/images/colored (from the startup-built catalog)"""
+    return images.catalog.color_groups
+
+def pick_visual_task_type(current_round=None):
+    """Scripted task type for the first rounds, otherwise a weighted random pick"""
+    if current_round and current_round in SCRIPTED_VISUAL_TASKS:
+        return SCRIPTED_VISUAL_TASKS[current_round]
+    return random.choice(VISUAL_TASK_TYPES)
 
 def generate_visual_task(difficulty_level, current_round=None):
-    """Generate a visual task - randomly choose between different task types"""
+    """Take a pre-built visual task (or build one)"""
+    start = time.perf_counter()
+    task_type = pick_visual_task_type(current_round)
+    task = visual_tasks.take((difficulty_level, task_type))
+    source = 'pool'
+    if task is None:
+        task = build_visual_task(difficulty_level, task_type)
+        source = 'built'
+    VISUAL_TASK_SECONDS.labels(source).observe(time.perf_counter() - start)
+    return task
+
+def build_visual_task(difficulty_level, task_type):
+    """Build a visual task of the given type (clipart falls back to number counting without images)"""
     # Scale items based on difficulty
     base_items = 6
     items_per_level = 2
     num_items = base_items + (difficulty_level * items_per_level)
 
-    # Use scripted task type for first 5 rounds if round info provided
-    if current_round and current_round in SCRIPTED_VISUAL_TASKS:
-        task_type = SCRIPTED_VISUAL_TASKS[current_round]
-    else:
-        task_type = random.choice(VISUAL_TASK_TYPES)
-
     if task_type == 'clipart_images':
         task = generate_clipart_task(difficulty_level, num_items)
         if task:
             return task
         # Fallback to another type if clipart fails
         task_type = 'number_count'
+    return VISUAL_TASK_BUILDERS[task_type](num_items)
 
-    if task_type == 'color_count':
-        color_groups = load_color_images()
-
-        # If we couldn't load images, fallback to colored boxes
-        if not color_groups:
-            colors = ['red', 'blue', 'green', 'yellow', 'purple', 'orange', 'pink']
-            color = random.choice(colors)
-
-            items = []
-            items.append({'id': 0, 'color': color, 'type': 'colored_box'})
-            correct_count = 1
-
-            for i in range(1, num_items):
-                item_color = random.choice(colors)
-                items.append({'id': i, 'color': item_color, 'type': 'colored_box'})
-                if item_color == color:
-                    correct_count += 1
-
-            random.shuffle(items)
-            for i, item in enumerate(items):
-                item['id'] = i
-
-            return {
-                'type': 'color_count',
-                'instruction': f'Count all {color} colored items',
-                'items': items,
-                'correct_answer': correct_count,
-                'display_type': 'count'
-            }
+def _build_color_count_task(num_items):
+    """Count the images (or boxes) of one color"""
+    color_groups = load_color_images()
 
-        # Select a target color and its images
-        target_color = random.choice(list(color_groups.keys()))
-        target_images = color_groups[target_color]
+    # If we couldn't load images, fallback to colored boxes
+    if not color_groups:
+        colors = ['red', 'blue', 'green', 'yellow', 'purple', 'orange', 'pink']
+        color = random.choice(colors)
 
         items = []
-        correct_count = 0
-
-        # Add target color images
-        num_target = random.randint(max(1, num_items // 3), min(len(target_images), num_items - 1))
-        selected_target = random.sample(target_images, num_target)
-        for filename in selected_target:
-            items.append({'id': len(items), 'filename': f'colored/{filename}', 'type': 'image'})
-            correct_count += 1
+        items.append({'id': 0, 'color': color, 'type': 'colored_box'})
+        correct_count = 1
 
-        # Fill remaining with non-target color images
-        other_colors = [c for c in color_groups.keys() if c != target_color]
-        remaining_slots = num_items - len(items)
-
-        while remaining_slots > 0 and other_colors:
-            other_color = random.choice(other_colors)
-            available = color_groups[other_color]
-            if available:
-                filename = random.choice(available)
-                items.append({'id': len(items), 'filename': f'colored/{filename}', 'type': 'image'})
-                remaining_slots -= 1
+        for i in range(1, num_items):
+            item_color = random.choice(colors)
+            items.append({'id': i, 'color': item_color, 'type': 'colored_box'})
+            if item_color == color:
+                correct_count += 1
 
-        # Shuffle to randomize position
         random.shuffle(items)
         for i, item in enumerate(items):
             item['id'] = i
 
         return {
             'type': 'color_count',
-            'instruction': f'Count all {target_color} images',
+            'instruction': f'Count all {color} colored items',
             'items': items,
             'correct_answer': correct_count,
             'display_type': 'count'
         }
+
+    # Target color images plus other colors' images, drawn from the catalog's color groups
+    target_color, targets, others = images.catalog.sample_color_items(num_items)
+    items = [{'id': 0, 'filename': f'colored/{filename}', 'type': 'image'} for filename in targets + others]
+    correct_count = len(targets)
+
+    # Shuffle to randomize position
+    random.shuffle(items)
+    for i, item in enumerate(items):
+        item['id'] = i
+
+    return {
+        'type': 'color_count',
+        'instruction': f'Count all {target_color} images',
+        'items': items,
+        'correct_answer': correct_count,
+        'display_type': 'count'
+    }
+
+def _build_number_count_task(num_items):
+    """Count the odd or even numbers"""
+    num_type = random.choice(['odd', 'even'])
     
-    elif task_type == 'number_count':
-        num_type = random.choice(['odd', 'even'])
-        
-        # Ensure at least 1 correct answer
-        if num_type == 'odd':
-            numbers = [random.choice([1, 3, 5, 7, 9, 11, 13, 15, 17, 19, 21, 23, 25, 27, 29])]  # Start with an odd
-        else:
-            numbers = [random.choice([2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30])]  # Start with an even
-        
-        # Add remaining random numbers
-        remaining = random.sample(range(1, 50), min(num_items - 1, 48))
-        numbers.extend(remaining)
-        
-        # Count correct answers
-        correct_count = 0
-        for num in numbers:
-            if num_type == 'odd' and num % 2 == 1:
-                correct_count += 1
-            elif num_type == 'even' and num % 2 == 0:
-                correct_count += 1
-        
-        # Shuffle to randomize position
-        random.shuffle(numbers)
-        items = [{'id': i, 'value': num, 'type': 'number'} for i, num in enumerate(numbers)]
-        
-        return {
-            'type': 'number_count',
-            'instruction': f'Count all {num_type} numbers',
-            'items': items,
-            'correct_answer': correct_count,
-            'display_type': 'count'
-        }
+    # Ensure at least 1 correct answer
+    if num_type == 'odd':
+        numbers = [random.choice([1, 3, 5, 7, 9, 11, 13, 15, 17, 19, 21, 23, 25, 27, 29])]  # Start with an odd
+    else:
+        numbers = [random.choice([2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30])]  # Start with an even
     
-    elif task_type == 'number_sum':
-        operation = random.choice(['add_even', 'add_odd', 'add_all'])
-        numbers = random.sample(range(1, 30), min(num_items, 29))
-        
-        if operation == 'add_even':
-            correct_answer = sum(n for n in numbers if n % 2 == 0)
-            instruction = 'Add all EVEN numbers'
-        elif operation == 'add_odd':
-            correct_answer = sum(n for n in numbers if n % 2 == 1)
-            instruction = 'Add all ODD numbers'
-        else:
-            correct_answer = sum(numbers)
-            instruction = 'Add ALL numbers'
-        
-        items = [{'id': i, 'value': num, 'type': 'number'} for i, num in enumerate(numbers)]
-        
-        return {
-            'type': 'number_sum',
-            'instruction': instruction,
-            'items': items,
-            'correct_answer': correct_answer,
-            'display_type': 'count'
-        }
+    # Add remaining random numbers
+    remaining = random.sample(range(1, 50), min(num_items - 1, 48))
+    numbers.extend(remaining)
     
-    # Fallback
-    return generate_clipart_task(difficulty_level, num_items)
-
-def generate_audio_task(difficulty_level, time_limit=45, current_round=None):
-    """Generate an audio task using the difficulty module"""
-    # Clean up old audio files to prevent clutter
-    old_files = glob.glob('number_audio_*.mp3')
-    for old_file in old_files:
-        try:
-            os.remove(old_file)
-        except:
-            pass
+    # Count correct answers
+    correct_count = 0
+    for num in numbers:
+        if num_type == 'odd' and num % 2 == 1:
+            correct_count += 1
+        elif num_type == 'even' and num % 2 == 0:
+            correct_count += 1
+    
+    # Shuffle to randomize position
+    random.shuffle(numbers)
+    items = [{'id': i, 'value': num, 'type': 'number'} for i, num in enumerate(numbers)]
     
+    return {
+        'type': 'number_count',
+        'instruction': f'Count all {num_type} numbers',
+        'items': items,
+        'correct_answer': correct_count,
+        'display_type': 'count'
+    }
+
+def _build_number_sum_task(num_items):
+    """Add up the even, odd or all numbers"""
+    operation = random.choice(['add_even', 'add_odd', 'add_all'])
+    numbers = random.sample(range(1, 30), min(num_items, 29))
+
+    if operation == 'add_even':
+        correct_answer = sum(n for n in numbers if n % 2 == 0)
+        instruction = 'Add all EVEN numbers'
+    elif operation == 'add_odd':
+        correct_answer = sum(n for n in numbers if n % 2 == 1)
+        instruction = 'Add all ODD numbers'
+    else:
+        correct_answer = sum(numbers)
+        instruction = 'Add ALL numbers'
+
+    items = [{'id': i, 'value': num, 'type': 'number'} for i, num in enumerate(numbers)]
+
+    return {
+        'type': 'number_sum',
+        'instruction': instruction,
+        'items': items,
+        'correct_answer': correct_answer,
+        'display_type': 'count'
+    }
+
+VISUAL_TASK_BUILDERS = {
+    'color_count': _build_color_count_task,
+    'number_count': _build_number_count_task,
+    'number_sum': _build_number_sum_task,
+}
+
+# Ready-made visual tasks per (difficulty, task type), topped up in the background
+visual_tasks = task_pool.TaskPool(
+    build_visual_task,
+    [(level, task_type) for level in range(1, 6) for task_type in sorted(set(VISUAL_TASK_TYPES))],
+)
+images.listeners.append(visual_tasks.invalidate)
+images.listeners.append(image_variants.refresh)
+
+def generate_audio_task(difficulty_level, time_limit=45, current_round=None, party_code=None,
+                        stream=False):
+    """Generate an audio task using the difficulty module (stream: only wait for the first chunk, see _stream_audio)"""
     slow = difficulty.speech_rate_by_difficulty(difficulty_level)
     accents = difficulty.use_accents_by_difficulty(difficulty_level)
     audio_content = difficulty.audio_output_by_difficulty(
@@ -315,21 +350,148 @@ def generate_audio_task(difficulty_level, time_limit=45, current_round=None):
     # Remove trailing punctuation and whitespace for display
     task_instruction_clean = task_instruction.rstrip('. ')
     
-    # Generate audio file (may fail due to network/gTTS issues)
+    # Calculate correct answer based on task
+    audio_task = {
+        'instruction': task_instruction_clean,
+        'audio_id': None,
+        'correct_answer': calculate_audio_answer(audio_content, task_instruction_clean),
+    }
+
+    # Generate audio (may fail due to network/gTTS issues) and keep it in memory
+    round_number = current_round or 0
+    if stream:
+        # Cached clips assemble in milliseconds; anything else is streamed while gTTS runs
+        audio_data = workers.run_blocking(audio_output.render_cached_audio, audio_content, slow, accents)
+        if audio_data is None:
+            _stream_audio(audio_task, audio_content, slow, accents, party_code, round_number)
+        else:
+            audio_task['audio_id'] = audio_clips.put(party_code, audio_data, round_number=round_number)
+    else:
+        try:
+            with TTS_SECONDS.time():
+                audio_data = workers.run_blocking(audio_output.render_number_audio, audio_content, slow, accents)
+        except Exception as e:
+            TTS_FAILURES.inc()
+            print(f"[audio] gTTS failed: {e}")
+            raise
+        audio_task['audio_id'] = audio_clips.put(party_code, audio_data, round_number=round_number)
+
+    return audio_task
+
+
+def _stream_audio(audio_task, audio_content, slow, accents, party_code, round_number):
+    """
+    Synthesize the clip's first chunk (the instruction), then the rest on a background task while
+    /api/audio streams the chunks as they arrive. Raises if the first chunk fails, so the round
+    goes ahead without audio; if a later chunk fails, the round's audio is dropped (_drop_audio).
+    """
+    chunks = audio_output.stream_number_audio(audio_content, slow, accents)
+    start = time.perf_counter()
     try:
-        audio_filename = audio_output.create_number_audio(audio_content, slow, accents)
+        # Each chunk blocks on gTTS, so the generator is advanced on the blocking pool
+        first = workers.run_blocking(next, chunks, None)
+        if not first:
+            raise RuntimeError("no audio was produced")
     except Exception as e:
+        TTS_FAILURES.inc()
         print(f"[audio] gTTS failed: {e}")
         raise
-    
-    # Calculate correct answer based on task
-    correct_answer = calculate_audio_answer(audio_content, task_instruction_clean)
-    
-    return {
-        'instruction': task_instruction_clean,
-        'audio_file': audio_filename,
-        'correct_answer': correct_answer
-    }
+    TTS_FIRST_CHUNK_SECONDS.observe(time.perf_counter() - start)
+    clip = audio_clips.open_stream(party_code, round_number)
+    clip.append(first)
+    audio_task['audio_id'] = clip.clip_id
+
+    def synthesize():
+        try:
+            chunk = workers.run_blocking(next, chunks, None)
+            while chunk is not None:
+                clip.append(chunk)
+                chunk = workers.run_blocking(next, chunks, None)
+        except Exception as e:
+            TTS_FAILURES.inc()
+            print(f"[audio] gTTS failed while streaming round {round_number}: {e}")
+            clip.finish(failed=True)
+            _drop_audio(party_code, audio_task)
+        else:
+            TTS_SECONDS.observe(time.perf_counter() - start)
+            clip.finish()
+        audio_clips.finish_stream(clip)
+
+    socketio.start_background_task(synthesize)
+
+
+def _drop_audio(code, audio_task):
+    """A round's audio broke off: stop requiring it (graded as correct) and tell the party"""
+    # Set on the task itself: request_round checks it once the round is in place, and from then
+    # on the round is found here
+    audio_task['dropped'] = True
+    party = parties.get(code)
+    if party and party.round_data and party.round_data.audio_task is audio_task:
+        parties.save(code)
+        socketio.emit('audio_dropped', {
+            'round': party.round_data.number,
+            'audio_url': _audio_url(code, audio_task['audio_id']),
+        }, room=code)
+
+
+def _audio_url(code, audio_id):
+    """Where clients fetch a round's audio; the party code lets a load balancer route the request to this worker"""
+    return f'/api/audio/{audio_id}?party={code}'
+
+
+def _release_prefetched(code, round_number, audio_task):
+    """Give back the clip of a prefetched task that was superseded or discarded"""
+    if audio_task and audio_task.get('audio_id'):
+        audio_clips.discard(audio_task['audio_id'], code, round_number)
+
+
+prefetcher = AudioPrefetcher(generate_audio_task, release=_release_prefetched)
+
+
+def predict_round_settings(current_round):
+    """Difficulty and time limit the client will request for a round (mirrors getDifficulty in game.js)"""
+    level = min(-(-current_round // 2), 5)
+    time_limit = max(45 - current_round * 2, 25)
+    return level, time_limit
+
+
+def _prefetch_round(code, round_number):
+    """Start building a round's audio task ahead of time (the next round, while this one is played)"""
+    if round_number <= 3:
+        return
+    level, time_limit = predict_round_settings(round_number)
+    prefetcher.schedule(code, level, time_limit, round_number)
+
+
+def _round_closed(code, round_data):
+    """The round's results are out: get the round the party plays next ready while they read them"""
+    _prefetch_round(code, round_data.next_number)
+
+
+# Every round deadline of this worker runs on one timer wheel, advanced by a single background task
+timers = timer_wheel.TimerWheel()
+# Answers are collected per round; the room gets one round_results when everyone expected has
+# answered or the deadline passes (ROUND_ANSWER_TICKS=0 turns off the "X has answered" ticks)
+round_collector = round_results.RoundCollector(
+    parties,
+    lambda event, payload, room: socketio.emit(event, payload, room=room),
+    timers,
+    on_close=_round_closed,
+    ticks=os.environ.get('ROUND_ANSWER_TICKS', '1') != '0',
+)
+
+
+def warm_audio_cache():
+    """Fill the per-token TTS clip cache (default accent) so rounds can skip gTTS"""
+    levels = range(1, 6)
+    try:
+        synthesized = audio_output.warm_clip_cache(
+            difficulty.audio_vocabulary(),
+            slows=sorted({difficulty.speech_rate_by_difficulty(d) for d in levels}),
+        )
+        print(f"[audio] Clip cache ready ({synthesized} new clips)")
+    except Exception as e:
+        print(f"[audio] Clip cache warm-up failed: {e}")
 
 def calculate_audio_answer(audio_content, task):
     """Calculate the correct answer for an audio task"""
@@ -362,98 +524,131 @@ def calculate_audio_answer(audio_content, task):
 @app.route('/')
 def index():
     """Serve the main game page"""
-    return render_template('game.html')
+    return render_template('game.html', socketio_serializer=SOCKETIO_SERIALIZER)
+
+
+_catalog_document = (None, None)   # ((catalog, manifest), document) for the current images
+
+
+def current_catalog_document():
+    """The /api/catalog document, rebuilt when the image catalog or variant manifest changes"""
+    global _catalog_document
+    key = (images.catalog, image_variants.manifest)
+    cached_key, document = _catalog_document
+    if cached_key is None or cached_key[0] is not key[0] or cached_key[1] is not key[1]:
+        document = round_payloads.catalog_document(images.catalog, image_variants)
+        _catalog_document = (key, document)
+    return document
+
+
+@app.route('/api/catalog')
+def serve_catalog():
+    """Image paths by ID plus their srcsets; round payloads refer to images by these IDs"""
+    document = current_catalog_document()
+    response = jsonify(document)
+    response.set_etag(document['version'])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.after_request
+def cache_built_assets(response):
+    """Content-hashed image variants never change, so let browsers keep them"""
+    if request.path.startswith(image_assets.BUILD_URL + '/') and response.status_code == 200:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
+
+@app.route('/api/audio/<clip_id>')
+def serve_audio(clip_id):
+    """Serve a round's audio from memory (supports Range and ETag revalidation), or stream it while
+    it is still being synthesized"""
+    stream = audio_clips.get_stream(clip_id)
+    if stream is not None:
+        return audio_store.serve_stream(stream, count=AUDIO_BYTES_SERVED.inc)
+    clip = audio_clips.get(clip_id)
+    if clip is None:
+        return jsonify({'error': 'Audio file not found'}), 404
+    response = audio_store.serve(clip, request)
+    AUDIO_BYTES_SERVED.inc(response.content_length or 0)
+    return response
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Handler latencies, emit fan-out, synthesis and task generation times in Prometheus text format"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+# ── Admin: on-demand profiling ──────────────────────────────────
+# Disabled unless ADMIN_TOKEN is set; requests send it in an X-Admin-Token header
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+handler_profiler = profiler.SamplingProfiler(
+    party_of=lambda: (player_sessions.get(request.sid) or {}).get('party_code'),
+    mode=ASYNC_MODE,
+)
 
 
-@app.route('/api/audio/<filename>')
-def serve_audio(filename):
-    """Serve an audio file (cleanup happens when new rounds generate audio)"""
-    audio_path = Path(__file__).parent / filename
-    if audio_path.exists():
-        with open(audio_path, 'rb') as f:
-            audio_data = BytesIO(f.read())
-        return send_file(audio_data, mimetype='audio/mpeg', download_name=filename)
-    return jsonify({'error': 'Audio file not found'}), 404
+def _require_admin():
+    if not ADMIN_TOKEN:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        abort(403)
 
 
-# ── Fact answer matching ────────────────────────────────────────
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """GET: running session and saved profiles. POST {seconds, event?, party?, interval?}: start sampling"""
+    _require_admin()
+    if request.method == 'GET':
+        return jsonify(handler_profiler.status())
+    data = request.get_json(silent=True) or {}
+    try:
+        session = handler_profiler.start(
+            data.get('seconds', 30), event=data.get('event'), party=data.get('party'),
+            interval=data.get('interval', profiler.DEFAULT_INTERVAL),
+        )
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    except (TypeError, ValueError):
+        return jsonify({'error': 'seconds and interval must be numbers'}), 400
+    return jsonify(session), 202
 
-_STOP_WORDS = frozenset(
-    'i me my he she his her they their them a an the is am are was were '
-    'be been being do does did have has had that this it its of in to for '
-    'on at by with about as just also very really and or but so if then '
-    'than too not no'.split()
-)
 
+@app.route('/admin/profile/stop', methods=['POST'])
+def admin_profile_stop():
+    """End the running profiling session early (its samples are still written)"""
+    _require_admin()
+    handler_profiler.stop()
+    return jsonify({'stopping': handler_profiler.status()['running'] is not None})
 
-def _extract_keywords(text):
-    """Pull meaningful words out of a sentence, lowercased, stop-words removed."""
-    words = text.lower().split()
-    # strip punctuation off each word
-    cleaned = [''.join(ch for ch in w if ch.isalnum()) for w in words]
-    return [w for w in cleaned if w and w not in _STOP_WORDS]
 
+@app.route('/admin/profile/<name>')
+def admin_profile_download(name):
+    """A finished profile in collapsed-stack format (for flamegraph.pl, speedscope, inferno)"""
+    _require_admin()
+    return send_from_directory(handler_profiler.out_dir, name, mimetype='text/plain')
+
+
+@app.route('/api/stats/task-pools')
+def task_pool_stats():
+    """Pre-built visual task pools: depth, hits and misses per (difficulty, task type)"""
+    return jsonify(visual_tasks.stats())
 
-def _check_fact_answer(answer, fact):
-    """
-    Return True if the player's answer is close enough to the stored fact.
-
-    Uses multiple signals so paraphrases like "king triton" → "he was king
-    triton" or "triton" still match:
-      1. SequenceMatcher ratio on the full strings
-      2. Keyword overlap (Jaccard-style)
-      3. Whether all important fact keywords appear somewhere in the answer
-      4. Whether the answer is a substring of the fact or vice versa
-    """
-    if not answer or not fact:
-        return False
-
-    a = answer.lower().strip()
-    f = fact.lower().strip()
-
-    # 1. Direct SequenceMatcher on full strings
-    seq_ratio = SequenceMatcher(None, a, f).ratio()
-    if seq_ratio >= 0.50:
-        return True
-
-    # 2. Substring containment (either direction)
-    if a in f or f in a:
-        return True
-
-    # 3. Keyword-based scoring
-    a_kw = set(_extract_keywords(answer))
-    f_kw = set(_extract_keywords(fact))
-
-    if not f_kw:
-        return seq_ratio >= 0.40
-
-    # How many fact keywords did the answer mention?
-    overlap = a_kw & f_kw
-    recall = len(overlap) / len(f_kw)  # what fraction of fact words were hit?
-
-    # If the answer nails most of the fact's keywords, accept it
-    if recall >= 0.50:
-        return True
-
-    # 4. Fuzzy per-word matching (catches typos/partial words)
-    #    For each fact keyword, check if any answer keyword is close
-    fuzzy_hits = 0
-    for fword in f_kw:
-        for aword in a_kw:
-            word_sim = SequenceMatcher(None, aword, fword).ratio()
-            if word_sim >= 0.70:
-                fuzzy_hits += 1
-                break
-    fuzzy_recall = fuzzy_hits / len(f_kw)
-    if fuzzy_recall >= 0.50:
-        return True
 
-    return False
+# ── Fact rounds ─────────────────────────────────────────────────
+
+# Distractors for fact quiz rounds, loaded once at startup
+filler_facts = fact_round.FactCorpus.load()
 
 
 # ── Socket.IO events ───────────────────────────────────────────
 
 @socketio.on('update_fact')
+@metrics.instrument('update_fact')
 def handle_update_fact(data):
     """Player updates their fun fact"""
     info = player_sessions.get(request.sid)
@@ -464,26 +659,27 @@ def handle_update_fact(data):
     if not party:
         return
 
-    fact = data.get('fact', '').strip()
-    party['players'][request.sid]['fact'] = fact
+    player = party.players.get(request.sid)
+    if not player:
+        return
+    player.fact = data.get('fact', '').strip()
+    party.touch()
+    parties.save(code)
     # Broadcast updated player list to all players
     _broadcast_lobby(code)
 
 
 @socketio.on('create_party')
+@metrics.instrument('create_party')
 def handle_create_party(data):
     name = data.get('name', 'Host').strip() or 'Host'
     fact = data.get('fact', '').strip()
-    code = generate_party_code()
-    parties[code] = {
-        'host_sid': request.sid,
-        'players': {request.sid: {'name': name, 'role': 'host', 'fact': fact}},
-        'state': 'lobby',
-        'round': 0,
-        'scores': {request.sid: 0},
-        'round_data': None,
-        'fact_rounds_done': 0,
-    }
+    try:
+        code = generate_party_code()
+    except RuntimeError:
+        emit('error', {'message': 'The server is full right now. Please try again later.'})
+        return
+    parties[code] = models.Party(code, request.sid, models.Player(name, 'host', fact))
     player_sessions[request.sid] = {'party_code': code, 'name': name, 'role': 'host'}
     join_room(code)
     emit('party_created', {'code': code, 'name': name})
@@ -491,19 +687,26 @@ def handle_create_party(data):
 
 
 @socketio.on('join_party')
+@metrics.instrument('join_party')
 def handle_join_party(data):
     code = data.get('code', '').strip().upper()
     name = data.get('name', 'Player').strip() or 'Player'
     if code not in parties:
         emit('error', {'message': 'Party not found. Check the code and try again.'})
         return
+    if party_store.worker_for_party(code, WORKER_COUNT) != WORKER_INDEX:
+        # The party lives on another worker: the client reconnects routed by the code and joins again
+        parties.forget(code)
+        emit('party_elsewhere', {'code': code})
+        return
     party = parties[code]
-    if party['state'] != 'lobby':
+    if party.state != 'lobby':
         emit('error', {'message': 'Game already in progress. Wait for the next session.'})
         return
     fact = data.get('fact', '').strip()
-    party['players'][request.sid] = {'name': name, 'role': 'helper', 'fact': fact}
-    party['scores'][request.sid] = 0
+    party.players[request.sid] = models.Player(name, 'helper', fact)
+    party.touch()
+    parties.save(code)
     player_sessions[request.sid] = {'party_code': code, 'name': name, 'role': 'helper'}
     join_room(code)
     emit('party_joined', {'code': code, 'name': name, 'role': 'helper'})
@@ -511,6 +714,7 @@ def handle_join_party(data):
 
 
 @socketio.on('start_game')
+@metrics.instrument('start_game')
 def handle_start_game():
     info = player_sessions.get(request.sid)
     if not info or info['role'] != 'host':
@@ -519,12 +723,15 @@ def handle_start_game():
     party = parties.get(code)
     if not party:
         return
-    party['state'] = 'playing'
-    party['round'] = 0
+    party.state = 'playing'
+    party.round = 0
+    party.touch()
+    parties.save(code)
     socketio.emit('game_started', {}, room=code)
 
 
 @socketio.on('request_round')
+@metrics.instrument('request_round')
 def handle_request_round(data):
     info = player_sessions.get(request.sid)
     if not info:
@@ -538,10 +745,15 @@ def handle_request_round(data):
     current_round = data.get('round', 1)
     time_limit = data.get('time_limit', 45)
 
-    party['round'] = current_round
+    # The previous round's audio is no longer needed once the party moves on
+    if party.round != current_round:
+        audio_clips.release_round(code, party.round)
+    party.round = current_round
+    party.touch()
+    input_buffers.reset(code, current_round)
 
    # ── Teammate Fact Quiz Round (round 6, 10, 14, … i.e. 6 + every 4) ──
-    num_players = len(party['players'])
+    num_players = len(party.players)
     is_fact_round = (
         current_round >= 6
         and (current_round - 6) % 4 == 0
@@ -549,75 +761,33 @@ def handle_request_round(data):
     )
     if is_fact_round:
         sids_with_facts = [
-            sid for sid in party['players']
-            if party['players'][sid].get('fact')
+            sid for sid, player in party.players.items()
+            if player.fact
         ]
         if len(sids_with_facts) >= 2:
-            all_sids = list(party['players'].keys())
-            # Simple rotation so nobody gets their own fact
-            targets = sids_with_facts[1:] + [sids_with_facts[0]]
-            assignments = {}
-            for i, sid in enumerate(sids_with_facts):
-                assignments[sid] = targets[i]
-            for sid in all_sids:
-                if sid not in assignments:
-                    available = [s for s in sids_with_facts if s != sid]
-                    assignments[sid] = (
-                        random.choice(available) if available
-                        else sids_with_facts[0]
-                    )
-
-            # Load filler facts for multiple choice distractors
-            filler_facts = []
-            try:
-                with open('static/filler_facts.txt', 'r') as f:
-                    filler_facts = [
-                        line.strip() for line in f
-                        if line.strip()
-                    ]
-            except Exception as e:
-                print(f"[facts] Could not load filler_facts.txt: {e}")
+            all_sids = list(party.players)
+            assignments = fact_round.assign_targets(all_sids, sids_with_facts)
 
-            party['round_data'] = {
-                'round_type': 'fact',
-                'assignments': assignments,
-            }
-            party['fact_rounds_done'] = party.get('fact_rounds_done', 0) + 1
+            choices = {}
+            party.round_data = models.RoundState.fact(current_round, assignments, choices)
+            party.fact_rounds_done += 1
+            round_collector.open(code, party.round_data, time_limit)
 
             for sid in all_sids:
-                target_sid = assignments[sid]
-                about = party['players'][target_sid]
-                correct_fact = about.get('fact', '')
-
-                # Build 3 distractors that aren't the correct answer
-                distractors = [
-                    f for f in filler_facts
-                    if f.lower() != correct_fact.lower()
-                ]
-                choices = random.sample(
-                    distractors,
-                    min(3, len(distractors))
-                )
-                choices.append(correct_fact)
-                random.shuffle(choices)
-
+                about = party.players[assignments[sid]]
+                question = fact_round.build_question(about.name, about.fact, filler_facts)
+                choices[sid] = frozenset(c.lower() for c in question['choices'])
                 response = {
                     'round_type': 'fact',
                     'round': current_round,
-                    'fact_question': {
-                        'about_player': about['name'],
-                        'question': (
-                            f"What fun fact did {about['name']} share "
-                            f"about themselves?"
-                        ),
-                        'choices': choices,
-                        'correct_answer': correct_fact,
-                    },
+                    'fact_question': round_payloads.fact_question_payload(question),
                     'visual_task': None,
                     'audio_task': None,
                     'has_audio': False,
                 }
                 socketio.emit('round_data', response, room=sid)
+            parties.save(code)
+            _prefetch_round(code, current_round + 1)
             return
 
     # ── Normal round ────────────────────────────────────────────
@@ -629,27 +799,48 @@ def handle_request_round(data):
     has_audio = current_round > 3
     audio_task = None
     if has_audio:
-        try:
-            audio_task = generate_audio_task(
-                difficulty_level, time_limit, current_round=current_round
-            )
-        except Exception as e:
-            print(f"[audio] Generation failed for round {current_round}: {e}")
-            has_audio = False
+        audio_task = prefetcher.take(code, difficulty_level, time_limit, current_round)
+        if audio_task is None:
+            try:
+                # Not prefetched: hand out the audio URL once its first chunk is ready and stream
+                # the rest of the clip as it is synthesized
+                audio_task = generate_audio_task(
+                    difficulty_level, time_limit, current_round=current_round,
+                    party_code=code, stream=True,
+                )
+            except Exception as e:
+                print(f"[audio] Generation failed for round {current_round}: {e}")
+                has_audio = False
 
-    party['round_data'] = {
-        'visual_task': visual_task,
-        'audio_task': audio_task,
-        'has_audio': has_audio,
-        'permissioned_players': [party['players'][party['host_sid']]['name']],  # Start with host
-    }
+    # Every player gets the same compact task: catalog IDs for images, no answers
+    document = current_catalog_document()
+    visual_payload = round_payloads.visual_payload(
+        visual_task, images.catalog.asset_ids, document['version']
+    )
+    if visual_task['display_type'] == 'clickable':
+        # Answers come back as these IDs; keep them with the task for grading
+        visual_task['item_ids'] = visual_payload['items']
+
+    party.round_data = models.RoundState(
+        current_round,
+        visual_task=visual_task,
+        audio_task=audio_task,
+        has_audio=has_audio,
+        permissioned={party.host().name},  # Start with host
+    )
+    if audio_task is not None and audio_task.get('dropped'):
+        # Its stream broke off before the round was in place (see _drop_audio)
+        audio_task = None
+        has_audio = party.round_data.has_audio = False
+    round_collector.open(code, party.round_data, time_limit)
+    parties.save(code)
 
     response = {
-        'visual_task': visual_task,
+        'visual_task': visual_payload,
         'audio_task': (
             {
                 'instruction': audio_task['instruction'],
-                'audio_url': f'/api/audio/{audio_task["audio_file"]}',
+                'audio_url': _audio_url(code, audio_task['audio_id']),
             }
             if audio_task
             else None
@@ -657,53 +848,58 @@ def handle_request_round(data):
         'difficulty': difficulty_level,
         'has_audio': has_audio,
         'round': current_round,
-        'permissioned_players': party['round_data']['permissioned_players'],
+        'permissioned_players': sorted(party.round_data.permissioned),
     }
     socketio.emit('round_data', response, room=code)
+    _prefetch_round(code, current_round + 1)
 
 
 @socketio.on('submit_answer')
+@metrics.instrument('submit_answer')
 def handle_submit_answer(data):
+    """Grade a player's answer; the round's results go out once it closes (round_results.py)"""
     info = player_sessions.get(request.sid)
     if not info:
         return
     code = info['party_code']
     party = parties.get(code)
-    if not party or not party['round_data']:
+    if not party or not party.round_data:
+        return
+    player = party.players.get(request.sid)
+    if not player:
         return
+    rd = party.round_data
+    if rd.closed or request.sid in rd.answers:
+        return
+    party.touch()
 
     visual_answer = data.get('visual_answer')
     audio_answer = data.get('audio_answer')
-    rd = party['round_data']
 
     # ── Fact round answer ───────────────────────────────────────
-    if isinstance(rd, dict) and rd.get('round_type') == 'fact':
+    if rd.is_fact:
         fact_answer = data.get('fact_answer', '').strip()
-        assignment = rd.get('assignments', {}).get(request.sid)
+        assignment = rd.assignments.get(request.sid)
         if not assignment:
             return
-        correct_fact = party['players'].get(assignment, {}).get('fact', '')
-        # Multiple choice — exact match is sufficient
-        fact_correct = fact_answer.lower() == correct_fact.lower()
-        if fact_correct:
-            party['scores'][request.sid] = (
-                party['scores'].get(request.sid, 0) + 1
-            )
-        result = {
-            'round_type': 'fact',
+        about = party.players.get(assignment)
+        correct_fact = about.fact if about else ''
+        # Multiple choice: only one of the options this player was shown counts, matched exactly
+        fact_correct = (fact_answer.lower() in rd.choices.get(request.sid, ())
+                        and fact_answer.lower() == correct_fact.lower())
+        # The collector credits the score, and only if it accepts the answer
+        round_collector.submit(code, request.sid, {
             'both_correct': fact_correct,
             'visual_correct': True,
             'audio_correct': True,
             'fact_expected': correct_fact,
             'player': info['name'],
-            'total_correct': party['scores'].get(request.sid, 0),
-        }
-        socketio.emit('round_result', result, room=request.sid)
+        })
         return
 
     # ── Normal round answer ─────────────────────────────────────
-    vt = rd['visual_task']
-    at = rd['audio_task']
+    vt = rd.visual_task
+    at = rd.audio_task
 
     visual_correct = False
     audio_correct = False
@@ -713,62 +909,78 @@ def handle_submit_answer(data):
         if vt['display_type'] == 'clickable':
             correct_set = set(vt['correct_answer']) if vt['correct_answer'] else set()
             ambiguous_set = set(vt.get('ambiguous_answer', []))
-            user_set = set(visual_answer) if visual_answer else set()
+            # Clients answer with the catalog IDs they were shown
+            user_set = round_payloads.selected_filenames(vt, visual_answer)
             user_set_filtered = user_set - ambiguous_set
             visual_correct = correct_set == user_set_filtered
         else:
             visual_correct = visual_answer == vt['correct_answer']
 
-    # Check audio answer
-    if at:
+    # Check audio answer (not required if the round's audio broke off, see _drop_audio)
+    if at and not at.get('dropped'):
         audio_correct = audio_answer == at['correct_answer']
-        audio_expected = at['correct_answer']
     else:
         audio_correct = True
-        audio_expected = 'N/A'
 
     both_correct = visual_correct and audio_correct
-    if both_correct:
-        party['scores'][request.sid] = party['scores'].get(request.sid, 0) + 1
 
-    result = {
+    # Expected answers are revealed with the round's results; the score is credited by the
+    # collector when it accepts the answer
+    round_collector.submit(code, request.sid, {
         'visual_correct': visual_correct,
         'audio_correct': audio_correct,
         'both_correct': both_correct,
-        'visual_expected': vt['correct_answer'] if vt else None,
-        'audio_expected': audio_expected,
         'player': info['name'],
-        'total_correct': party['scores'].get(request.sid, 0),
-    }
-    socketio.emit('round_result', result, room=code)
+    })
+
+
+def _name_index(code, party):
+    """The party's NameIndex, built from its players when this process has none (party loaded from the store)"""
+    index = name_indexes.get(code)
+    if index is None:
+        index = name_indexes[code] = name_index.NameIndex(p.name for p in party.players.values())
+    return index
 
 
 @socketio.on('request_help')
+@metrics.instrument('request_help')
 def handle_request_help(data):
-    """Host or permissioned player asks a specific helper for help"""
+    """Host or permissioned player calls a teammate's name (a voice transcript) for help"""
     info = player_sessions.get(request.sid)
     if not info:
         return
     code = info['party_code']
     party = parties.get(code)
-    if not party or not party.get('round_data'):
+    if not party or not party.round_data:
         return
 
     requester_name = info['name']
-    helper_name = data.get('helper_name', '')
-
-    permissioned = party['round_data'].get('permissioned_players', [])
+    permissioned = party.round_data.permissioned
 
     # Check if requester has permission
-    if requester_name.lower() not in [p.lower() for p in permissioned]:
+    if permissioned is None or requester_name not in permissioned:
         return
 
-    # Check if target already has permission (avoid duplicates)
-    if any(p.lower() == helper_name.lower() for p in permissioned):
+    # Resolve the spoken transcript (or an explicit name) to a teammate who doesn't have
+    # permission yet; the speaker and existing helpers are never matched
+    index = _name_index(code, party)
+    helper_name = None
+    if data.get('helper_name'):
+        helper_name = index.canonical(data['helper_name'])
+    else:
+        excluded = permissioned | {requester_name}
+        final = bool(data.get('final', True))
+        for transcript in (data.get('transcripts') or [])[:MAX_HELP_TRANSCRIPTS]:
+            helper_name = index.resolve(str(transcript), excluded, final=final)
+            if helper_name:
+                break
+    if not helper_name or helper_name in permissioned:
         return
 
     # Add helper to permissioned players
-    party['round_data']['permissioned_players'].append(helper_name)
+    permissioned.add(helper_name)
+    party.touch()
+    parties.save(code)
 
     # Broadcast updated permissions to all players
     socketio.emit(
@@ -776,13 +988,14 @@ def handle_request_help(data):
         {
             'from': requester_name,
             'helper_name': helper_name,
-            'permissioned_players': party['round_data']['permissioned_players'],
+            'permissioned_players': sorted(permissioned),
         },
         room=code,
     )
 
 
 @socketio.on('transfer_host')
+@metrics.instrument('transfer_host')
 def handle_transfer_host(data):
     """Current host transfers host role to another player"""
     info = player_sessions.get(request.sid)
@@ -795,23 +1008,28 @@ def handle_transfer_host(data):
     new_host_name = data.get('new_host_name', '')
     # Find the target player by name
     new_host_sid = None
-    for sid, p in party['players'].items():
-        if p['name'] == new_host_name:
+    for sid, p in party.players.items():
+        if p.name == new_host_name:
             new_host_sid = sid
             break
     if not new_host_sid or new_host_sid == request.sid:
         return
     # Demote current host
-    party['players'][request.sid]['role'] = 'helper'
+    party.players[request.sid].role = 'helper'
     player_sessions[request.sid]['role'] = 'helper'
     # Promote new host
-    party['players'][new_host_sid]['role'] = 'host'
-    party['host_sid'] = new_host_sid
+    party.players[new_host_sid].role = 'host'
+    party.host_sid = new_host_sid
     player_sessions[new_host_sid]['role'] = 'host'
+    party.touch()
+    parties.save(code)
+    player_sessions.save(request.sid)
+    player_sessions.save(new_host_sid)
     _broadcast_lobby(code)
 
 
 @socketio.on('return_to_lobby')
+@metrics.instrument('return_to_lobby')
 def handle_return_to_lobby():
     """Host sends everyone back to the lobby and resets game progress"""
     info = player_sessions.get(request.sid)
@@ -822,19 +1040,20 @@ def handle_return_to_lobby():
     if not party:
         return
     # Reset party state
-    party['state'] = 'lobby'
-    party['round'] = 0
-    party['round_data'] = None
-    party['fact_rounds_done'] = 0
-    for sid in party['scores']:
-        party['scores'][sid] = 0
+    party.reset_progress()
+    party.touch()
+    prefetcher.discard(code)
+    audio_clips.drop_party(code)
+    input_buffers.drop(code)
+    parties.save(code)
     # Notify each player individually with their current role
-    for sid, p in party['players'].items():
-        socketio.emit('returned_to_lobby', {'your_role': p['role']}, room=sid)
+    for sid, p in party.players.items():
+        socketio.emit('returned_to_lobby', {'your_role': p.role}, room=sid)
     _broadcast_lobby(code)
 
 
 @socketio.on('player_start_game')
+@metrics.instrument('player_start_game')
 def handle_player_start_game():
     """Any player clicks Start Game on instruction page — broadcast to all"""
     info = player_sessions.get(request.sid)
@@ -845,28 +1064,45 @@ def handle_player_start_game():
 
 
 @socketio.on('sync_input')
+@metrics.instrument('sync_input')
 def handle_sync_input(data):
-    """Broadcast input changes to all other players in the party"""
+    """Buffer an input change; the coalescer sends it to the other players on its next tick"""
     info = player_sessions.get(request.sid)
-    if not info:
+    if not info or not isinstance(data, dict):
         return
-    code = info['party_code']
-    # Broadcast to everyone except the sender
-    socketio.emit('sync_input_update', data, room=code, include_self=False)
+    field = data.get('type')
+    value = data.get('selectedItems') if field == 'selection' else data.get('value')
+    input_buffers.update(info['party_code'], request.sid, field, value)
+
+
+@socketio.on('sync_input_ack')
+@metrics.instrument('sync_input_ack')
+def handle_sync_input_ack(data):
+    """Client has applied every input change up to data['version']"""
+    info = player_sessions.get(request.sid)
+    if not info or not isinstance(data, dict):
+        return
+    input_buffers.ack(info['party_code'], request.sid, data.get('version'))
 
 
 @socketio.on('next_round')
-def handle_next_round(data):
-    """Host or any player triggers next/retry — broadcast to all"""
+@metrics.instrument('next_round')
+def handle_next_round(data=None):
+    """Any player moves the party on once the round has closed, as the server decided"""
     info = player_sessions.get(request.sid)
     if not info:
         return
     code = info['party_code']
-    advance = data.get('advance', False)
-    socketio.emit('sync_next_round', {'advance': advance}, room=code)
+    party = parties.get(code)
+    rd = party.round_data if party else None
+    if rd is None or not rd.closed:
+        # Still being played: the round ends when everyone answered or at its deadline
+        return
+    socketio.emit('sync_next_round', {'advance': rd.advance, 'round': rd.next_number}, room=code)
 
 
 @socketio.on('disconnect')
+@metrics.instrument('disconnect')
 def handle_disconnect():
     info = player_sessions.pop(request.sid, None)
     if not info:
@@ -875,41 +1111,72 @@ def handle_disconnect():
     party = parties.get(code)
     if not party:
         return
-    party['players'].pop(request.sid, None)
-    party['scores'].pop(request.sid, None)
+    party.players.pop(request.sid, None)
+    input_buffers.remove_player(code, request.sid)
     leave_room(code)
 
-    if not party['players']:
+    if not party.players:
         # Last player left – delete the party
-        del parties[code]
+        _close_party(code)
     else:
         # If the host left, promote someone else
         if info['role'] == 'host':
-            new_host_sid = next(iter(party['players']))
-            party['players'][new_host_sid]['role'] = 'host'
-            party['host_sid'] = new_host_sid
+            new_host_sid = next(iter(party.players))
+            party.players[new_host_sid].role = 'host'
+            party.host_sid = new_host_sid
             player_sessions[new_host_sid]['role'] = 'host'
+            player_sessions.save(new_host_sid)
             socketio.emit('role_changed', {'role': 'host'}, room=new_host_sid)
+        parties.save(code)
         _broadcast_lobby(code)
+        # The round may have been waiting only on this player's answer
+        round_collector.players_changed(code)
+
+
+def _close_party(code):
+    """Delete a party and everything held for it (its last player left, or it sat idle too long)"""
+    party = parties.get(code)
+    parties.pop(code)
+    code_allocator.release(code)
+    name_indexes.pop(code, None)
+    input_buffers.drop(code)
+    prefetcher.discard(code)
+    round_collector.discard(code)
+    audio_clips.drop_party(code)
+    if party:
+        # Sockets of an abandoned party may still be open: detach them
+        for sid in party.players:
+            player_sessions.pop(sid, None)
+        socketio.emit('error', {'message': 'This party was closed after being idle.'}, room=code)
+        socketio.close_room(code)
+
+
+# Drops stale round payloads and closes parties nobody has touched in a long time
+idle_sweeper = models.IdleSweeper(
+    parties, _close_party,
+    owns=lambda code: party_store.worker_for_party(code, WORKER_COUNT) == WORKER_INDEX,
+)
 
 
 def _broadcast_lobby(code):
     party = parties.get(code)
     if not party:
         return
-    players_list = [
-        {'name': p['name'], 'role': p['role'], 'fact': p.get('fact', '')}
-        for p in party['players'].values()
-    ]
+    players_list = party.lobby_list()
+    name_indexes[code] = name_index.NameIndex(p['name'] for p in players_list)
     socketio.emit('lobby_update', {'players': players_list, 'code': code}, room=code)
 
 
 if __name__ == "__main__":
-    # Clean up any leftover audio files on startup
-    for f in glob.glob('number_audio_*.mp3'):
-        try:
-            os.remove(f)
-        except:
-            pass
+    # Start from an empty spool and expire clips in the background
+    audio_clip_spool.start()
+    images.start_watching()
+    word_generator.WORD_BANK.start_watching()
+    image_variants.ensure_assets()
+    socketio.start_background_task(warm_audio_cache)
+    socketio.start_background_task(input_buffers.run, socketio.sleep)
+    socketio.start_background_task(idle_sweeper.run, socketio.sleep)
+    socketio.start_background_task(visual_tasks.run, socketio.sleep)
+    socketio.start_background_task(timers.run, socketio.sleep)
     port = int(os.environ.get("PORT", 5000))
     socketio.run(app, host="0.0.0.0", port=port, allow_unsafe_werkzeug=True)
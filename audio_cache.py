@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from gtts import gTTS
+
+'''
+Per-token clip cache for the audio task.
+
+The audio vocabulary is small and fixed (task strings, the word files and the numbers 1-30),
+so instead of sending every round's sentence to gTTS we synthesize each token once per
+(token, tld, slow) and keep the raw MP3 frames in memory and on disk under tts_cache/.
+
+A round is then assembled by concatenating the cached frames, with silent frames inserted
+where the item list asks for a pause (', ' between items, '. ' after the task instruction).
+MP3 is a stream of independent frames, so plain concatenation plays back fine as long as
+every clip shares the same sample rate and channel layout, which gTTS output always does.
+'''
+
+CACHE_DIR = Path(__file__).parent / 'tts_cache'
+INDEX_FILE = 'index.json'
+
+# Pause lengths inserted by the assembler
+COMMA_PAUSE_MS = 350
+SENTENCE_PAUSE_MS = 700
+
+# Consecutive gTTS failures after which warm() gives up (e.g. no network)
+MAX_WARM_FAILURES = 5
+# Pause between warm-up requests, so the warm-up is a trickle rather than a burst against gTTS
+WARM_INTERVAL_SECONDS = 0.5
+
+# MPEG audio header tables (layer III only, gTTS never emits layer I/II)
+_BITRATES_MPEG1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_MPEG2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def normalize_token(item: str) -> str:
+    '''
+    Strips the spacing and punctuation audio_output_by_difficulty adds around items.
+    item (str): A single entry of the spoken item list, e.g. 'Count all numbers. ' or ', '.
+    Returns: str: The spoken token, or '' when the entry is only a pause.
+    '''
+    return item.strip().rstrip('.,').strip()
+
+
+def _parse_header(data: bytes, pos: int):
+    '''
+    Parses the MPEG audio frame header at data[pos:pos + 4].
+    Returns: tuple[int, int, int] | None: (frame length, samples per frame, sample rate), or None if not a layer III header.
+    '''
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x03
+    layer = (data[pos + 1] >> 1) & 0x03
+    bitrate_index = (data[pos + 2] >> 4) & 0x0F
+    rate_index = (data[pos + 2] >> 2) & 0x03
+    padding = (data[pos + 2] >> 1) & 0x01
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if version == 3:
+        bitrate = _BITRATES_MPEG1[bitrate_index] * 1000
+        return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+    bitrate = _BITRATES_MPEG2[bitrate_index] * 1000
+    return 72 * bitrate // sample_rate + padding, 576, sample_rate
+
+
+def extract_frames(data: bytes) -> bytes:
+    '''
+    Drops ID3 tags and any Xing/Info header frame so clips can be concatenated.
+    data (bytes): A complete MP3 file as returned by gTTS.
+    Returns: bytes: Only the audio frames.
+    '''
+    pos = 0
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size
+
+    frames = bytearray()
+    while pos < len(data):
+        header = _parse_header(data, pos)
+        if header is None:
+            # Resync on the next frame marker (skips junk and trailing ID3v1 tags)
+            pos += 1
+            continue
+        length = header[0]
+        frame = data[pos:pos + length]
+        if len(frame) < length:
+            break
+        # The Xing/Info frame describes the original file's length, which is wrong once joined
+        if not frames and (b'Xing' in frame[:64] or b'Info' in frame[:64]):
+            pos += length
+            continue
+        frames += frame
+        pos += length
+    return bytes(frames)
+
+
+def silence_frames(reference: bytes, duration_ms: int) -> bytes:
+    '''
+    Builds silent MP3 frames matching the format of an existing clip.
+    A frame whose side info and main data are all zero decodes to silence.
+    reference (bytes): Frames from a cached clip, used for the header format.
+    duration_ms (int): How much silence to produce.
+    Returns: bytes: The silent frames (empty if the reference could not be parsed).
+    '''
+    header = _parse_header(reference, 0)
+    if header is None or duration_ms <= 0:
+        return b''
+    # Clear the padding bit so every silent frame has the same length
+    header_bytes = bytes([reference[0], reference[1], reference[2] & 0xFD, reference[3]])
+    length = _parse_header(header_bytes + bytes(4), 0)[0]
+    _, samples, sample_rate = header
+    count = max(1, round(duration_ms * sample_rate / (samples * 1000)))
+    frame = header_bytes + bytes(length - 4)
+    return frame * count
+
+
+class ClipCache:
+    '''
+    Thread-safe cache of synthesized MP3 frames keyed by (token, tld, slow).
+    Clips live in memory and are mirrored to cache_dir so the cache survives restarts.
+    '''
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._clips = {}
+        self._silence = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @staticmethod
+    def _filename(token: str, tld: str, slow: bool) -> str:
+        digest = hashlib.sha1(f'{token}|{tld}|{int(slow)}'.encode('utf-8')).hexdigest()
+        return f'{digest}.mp3'
+
+    def load(self) -> int:
+        '''
+        Loads every clip listed in the on-disk index into memory.
+        Returns: int: The number of clips loaded.
+        '''
+        index_path = self.cache_dir / INDEX_FILE
+        loaded = 0
+        if index_path.exists():
+            try:
+                with open(index_path, 'r') as f:
+                    entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[audio] Ignoring unreadable clip index: {e}")
+                entries = []
+            for token, tld, slow, filename in entries:
+                try:
+                    with open(self.cache_dir / filename, 'rb') as f:
+                        frames = f.read()
+                except OSError:
+                    continue
+                if frames:
+                    self._clips[(token, tld, bool(slow))] = frames
+                    loaded += 1
+        self._loaded = True
+        return loaded
+
+    def save_index(self):
+        '''Writes the list of cached clips to disk (atomically, via a temp file).'''
+        with self._lock:
+            entries = [
+                [token, tld, slow, self._filename(token, tld, slow)]
+                for (token, tld, slow) in self._clips
+            ]
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_dir / (INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.cache_dir / INDEX_FILE)
+
+    def get(self, token: str, tld: str, slow: bool):
+        '''Returns the cached frames for a token, or None if it hasn't been synthesized yet.'''
+        return self._clips.get((token, tld, slow))
+
+    def put(self, token: str, tld: str, slow: bool, frames: bytes):
+        '''Stores frames for a token in memory and on disk.'''
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_dir / self._filename(token, tld, slow), 'wb') as f:
+            f.write(frames)
+        with self._lock:
+            self._clips[(token, tld, slow)] = frames
+
+    def fetch(self, token: str, tld: str, slow: bool) -> bytes:
+        '''
+        Returns the frames for a token, synthesizing them with gTTS on a miss.
+        This is the only method that touches the network.
+        '''
+        frames = self.get(token, tld, slow)
+        if frames is None:
+            tts = gTTS(text=token, lang='en', slow=slow, tld=tld)
+            data = b''.join(tts.stream())
+            frames = extract_frames(data)
+            self.put(token, tld, slow, frames)
+        return frames
+
+    def warm(self, tokens: list[str], tlds: list[str], slows: list[bool],
+             interval: float = WARM_INTERVAL_SECONDS) -> int:
+        '''
+        Synthesizes every missing (token, tld, slow) combination, one gTTS request every interval
+        seconds. Failures are logged and skipped so one bad token doesn't stop the warm-up.
+        Returns: int: The number of clips synthesized.
+        '''
+        if not self._loaded:
+            self.load()
+        synthesized = 0
+        failures = 0
+        for slow in slows:
+            for tld in tlds:
+                for token in tokens:
+                    if self.get(token, tld, slow) is not None:
+                        continue
+                    if synthesized or failures:
+                        time.sleep(interval)
+                    try:
+                        self.fetch(token, tld, slow)
+                        synthesized += 1
+                        failures = 0
+                    except Exception as e:
+                        print(f"[audio] Could not cache '{token}' ({tld}): {e}")
+                        failures += 1
+                        if failures >= MAX_WARM_FAILURES:
+                            print("[audio] gTTS unreachable, stopping clip cache warm-up")
+                            if synthesized:
+                                self.save_index()
+                            return synthesized
+                if synthesized:
+                    self.save_index()
+        return synthesized
+
+    def silence(self, reference: bytes, duration_ms: int) -> bytes:
+        '''Returns (and memoizes) silent frames in the reference clip's format.'''
+        key = (reference[:4], duration_ms)
+        frames = self._silence.get(key)
+        if frames is None:
+            frames = silence_frames(reference, duration_ms)
+            self._silence[key] = frames
+        return frames
+
+    def assemble(self, text: list[str], tld: str, slow: bool):
+        '''
+        Joins cached clips for a spoken item list into a single MP3.
+        text (list[str]): Items as produced by difficulty.audio_output_by_difficulty.
+        tld (str): The gTTS accent the clips were synthesized with.
+        slow (bool): Whether the clips were synthesized with slow speech.
+        Returns: bytes | None: The MP3 data, or None if any token is not cached yet.
+        '''
+        clips = []
+        for item in text:
+            token = normalize_token(item)
+            if not token:
+                clips.append(COMMA_PAUSE_MS)
+                continue
+            frames = self.get(token, tld, slow)
+            if frames is None:
+                return None
+            clips.append(frames)
+            if item.rstrip().endswith('.'):
+                clips.append(SENTENCE_PAUSE_MS)
+
+        reference = next((clip for clip in clips if isinstance(clip, bytes)), None)
+        if reference is None:
+            return None
+        return b''.join(
+            clip if isinstance(clip, bytes) else self.silence(reference, clip)
+            for clip in clips
+        )
+
+
+if __name__ == "__main__":
+    with open(Path(__file__).parent / 'number_audio.mp3', 'rb') as f:
+        sample = extract_frames(f.read())
+    print(f"Sample clip: {len(sample)} bytes of frames, header {sample[:4].hex()}")
+    print(f"500 ms of silence: {len(silence_frames(sample, 500))} bytes")
@@ -1,6 +1,10 @@
 from gtts import gTTS
+import os
 import random
 import time
+from io import BytesIO
+from pathlib import Path
+import audio_cache
 
 '''
 Credit to https://pypi.org/project/gTTS/
@@ -18,30 +22,120 @@ for checking user input.
 
 The list input should consist of both numbers and words to be spoken. The words can be randomly generated
 by having a words file with words of varying difficulty levels, then randomly selecting words from that file based on the level.
+
+Rounds are assembled from the per-token clip cache (see audio_cache.py) whenever every token is cached,
+so the common case never waits on gTTS. The whole sentence is only sent to gTTS while the cache is cold.
+On that cold path stream_number_audio() yields the audio in chunks as gTTS produces them, the task
+instruction first (as its own request), so a client can start playing before the items are done.
+
+TTS_BACKEND=stub replaces gTTS with a fixed sample clip (number_audio.mp3) and no network calls, for
+load tests and offline development; TTS_STUB_LATENCY_MS adds a simulated synthesis delay.
 '''
 
+POSSIBLE_ACCENTS = ['com', 'co.uk', 'ca', 'com.au', 'ie', 'co.in', 'co.za', 'com.ng']
+
+TTS_BACKEND = os.environ.get('TTS_BACKEND', 'gtts')
+STUB_LATENCY_SECONDS = float(os.environ.get('TTS_STUB_LATENCY_MS', 0)) / 1000
+STUB_CLIP = Path(__file__).parent / 'number_audio.mp3'
+
+CLIP_CACHE = audio_cache.ClipCache()
 
-def create_number_audio(text: list[str], slow: bool, accents: bool) -> str:
+
+def warm_clip_cache(tokens: list[str], slows: list[bool]) -> int:
+    '''
+    Loads the clip cache from disk and synthesizes any missing tokens in the default accent.
+    Meant to run once in a background thread at startup. The other accents are not warmed: that
+    would multiply the requests to gTTS by len(POSSIBLE_ACCENTS), and rounds with a random accent
+    are synthesized whole (and usually prefetched) instead.
+    tokens (list[str]): The spoken vocabulary (see difficulty.audio_vocabulary).
+    slows (list[bool]): The speech rates in use.
+    Returns: int: The number of clips synthesized.
     '''
-    Converts the given text to speech and saves it as an audio file.
+    if TTS_BACKEND == 'stub':
+        return 0
+    return CLIP_CACHE.warm(tokens, ['com'], slows)
+
+
+def render_number_audio(text: list[str], slow: bool, accents: bool) -> bytes:
+    '''
+    Converts the given text to speech and returns the MP3 data without touching the disk.
     text (list[str]): The text to be converted to speech. Should contain both numbers and words.
-    Returns: str: The name of the output audio file.
+    Returns: bytes: The MP3 audio.
     '''
-    # Use timestamp to prevent caching issues
-    timestamp = int(time.time() * 1000)
-    output_filename = f"number_audio_{timestamp}.mp3"
-    speech_output = ' '.join(text)
-    possible_accents = ['com', 'co.uk', 'ca', 'com.au', 'ie', 'co.in', 'co.za', 'com.ng']
-    if accents:
-        tld = random.choice(possible_accents)
-    else:
-        tld = 'com'
+    if TTS_BACKEND == 'stub':
+        return _render_stub_audio()
+
+    tld = _pick_tld(accents)
+
+    # Fast path: every token is already cached, no network call
+    audio_data = CLIP_CACHE.assemble(text, tld, slow)
+    if audio_data is not None:
+        return audio_data
 
+    speech_output = ' '.join(text)
     tts = gTTS(text=speech_output, lang='en', slow=slow, tld=tld)
-    tts.save(output_filename)
+    buffer = BytesIO()
+    tts.write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+def render_cached_audio(text: list[str], slow: bool, accents: bool):
+    '''
+    Assembles the audio from the clip cache only.
+    Returns: bytes | None: The MP3 audio, or None if a token isn't cached (or TTS_BACKEND=stub).
+    '''
+    if TTS_BACKEND == 'stub':
+        return None
+    return CLIP_CACHE.assemble(text, _pick_tld(accents), slow)
+
+
+def stream_number_audio(text: list[str], slow: bool, accents: bool):
+    '''
+    Converts the given text to speech chunk by chunk: the task instruction (text[0]) first, then the
+    items as gTTS returns each part of them. Every chunk is whole MP3 frames, so the chunks
+    concatenated in order are the complete audio.
+    Yields: bytes: MP3 frames.
+    '''
+    if TTS_BACKEND == 'stub':
+        yield _render_stub_audio()
+        return
+
+    tld = _pick_tld(accents)
+    instruction, items = text[:1], text[1:]
+    first = CLIP_CACHE.assemble(instruction, tld, slow)
+    if first is None:
+        first = b''.join(_synthesize_parts(' '.join(instruction), slow, tld))
+        if first:
+            first += CLIP_CACHE.silence(first, audio_cache.SENTENCE_PAUSE_MS)
+    yield first
+
+    if not any(audio_cache.normalize_token(item) for item in items):
+        return
+    cached = CLIP_CACHE.assemble(items, tld, slow)
+    if cached is not None:
+        yield cached
+        return
+    yield from _synthesize_parts(' '.join(items), slow, tld)
+
+
+def _synthesize_parts(speech: str, slow: bool, tld: str):
+    # gTTS splits long text into parts of up to 100 characters, one request each
+    tts = gTTS(text=speech, lang='en', slow=slow, tld=tld)
+    for part in tts.stream():
+        yield audio_cache.extract_frames(part)
+
+
+def _pick_tld(accents: bool) -> str:
+    return random.choice(POSSIBLE_ACCENTS) if accents else 'com'
+
+
+def _render_stub_audio() -> bytes:
+    if STUB_LATENCY_SECONDS:
+        time.sleep(STUB_LATENCY_SECONDS)
+    return STUB_CLIP.read_bytes()
 
-    return output_filename
 
 if __name__ == "__main__":
     sample_text = ["one", "two", "three", "apple", "banana"]
-    create_number_audio(sample_text)
\ No newline at end of file
+    audio_data = render_number_audio(sample_text, slow=False, accents=False)
+    print(f"Rendered {len(audio_data)} bytes of MP3 for {sample_text}")
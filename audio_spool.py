@@ -0,0 +1,182 @@
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+'''
+Disk spool for round audio that no longer fits in the in-memory AudioStore.
+
+Clips are written under <spool dir>/<party code>/ and reference-counted per (party, round): a round's
+clips stay on disk while the round is live and become reclaimable once the party moves on or closes.
+Nothing in the request path scans the directory. A single background reaper thread expires
+unreferenced clips by age and keeps the whole spool under a disk budget, so the cost of generating
+a round does not depend on how many other parties are active.
+'''
+
+DEFAULT_SPOOL_DIR = Path(__file__).parent / 'audio_spool'
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+REAP_INTERVAL_SECONDS = 30
+# Referenced clips are still expired after this many TTLs, in case a release was missed
+HARD_TTL_FACTOR = 4
+
+
+def worker_spool_dir(base, worker_index: int) -> Path:
+    '''
+    The spool directory of one worker process. Workers can share a base directory, but each one
+    empties its own spool when it starts, so they must not share the spool itself.
+    base (str | Path): The configured spool directory.
+    worker_index (int): The worker's WORKER_INDEX.
+    Returns: Path: <base>/worker-<index>.
+    '''
+    return Path(base) / f'worker-{worker_index}'
+
+
+class SpoolEntry:
+    __slots__ = ('path', 'party_code', 'round_number', 'size', 'created')
+
+    def __init__(self, path: Path, party_code: str, round_number: int, size: int):
+        self.path = path
+        self.party_code = party_code
+        self.round_number = round_number
+        self.size = size
+        self.created = time.monotonic()
+
+
+class AudioSpool:
+    '''
+    Reference-counted on-disk clip spool with a TTL/budget reaper.
+    spool_dir (Path): Directory owned by the spool; it is emptied on start().
+    ttl_seconds (float): Age after which unreferenced clips are deleted.
+    max_bytes (int): Disk budget; oldest unreferenced clips go first when it is exceeded.
+    '''
+
+    def __init__(self, spool_dir: Path = DEFAULT_SPOOL_DIR, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.spool_dir = Path(spool_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = {}  # clip id -> SpoolEntry
+        self._refs = {}     # party code -> {round: reference count}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def start(self, interval: float = REAP_INTERVAL_SECONDS):
+        '''Clears leftovers from a previous run and starts the reaper thread.'''
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        if self._reaper is None:
+            self._reaper = threading.Thread(
+                target=self._reap_forever, args=(interval,), name='audio-spool-reaper', daemon=True
+            )
+            self._reaper.start()
+
+    def acquire(self, party_code: str, round_number: int):
+        '''Marks a (party, round) as live so its spooled clips are kept.'''
+        with self._lock:
+            rounds = self._refs.setdefault(party_code, {})
+            rounds[round_number] = rounds.get(round_number, 0) + 1
+
+    def release(self, party_code: str, round_number: int, count: int = 1):
+        '''
+        Drops count references to a (party, round); once none are left, its clips become
+        reclaimable.
+        '''
+        with self._lock:
+            rounds = self._refs.get(party_code)
+            if rounds is None or round_number not in rounds:
+                return
+            remaining = rounds[round_number] - count
+            if remaining > 0:
+                rounds[round_number] = remaining
+                return
+            del rounds[round_number]
+            if not rounds:
+                del self._refs[party_code]
+
+    def release_party(self, party_code: str):
+        '''Drops all of a party's references (party closed or reset).'''
+        with self._lock:
+            self._refs.pop(party_code, None)
+
+    def is_referenced(self, party_code: str, round_number: int) -> bool:
+        return round_number in self._refs.get(party_code, ())
+
+    def write(self, clip_id: str, party_code: str, round_number: int, data: bytes):
+        '''Writes a clip to the spool.'''
+        party_dir = self.spool_dir / (party_code or '_')
+        party_dir.mkdir(parents=True, exist_ok=True)
+        path = party_dir / f'{round_number}-{clip_id}.mp3'
+        with open(path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            self._entries[clip_id] = SpoolEntry(path, party_code, round_number, len(data))
+            self.total_bytes += len(data)
+
+    def read(self, clip_id: str):
+        '''
+        Reads a spooled clip back.
+        Returns: tuple[bytes, str, int] | None: (data, party code, round), or None if it is not spooled.
+        '''
+        entry = self._entries.get(clip_id)
+        if entry is None:
+            return None
+        try:
+            with open(entry.path, 'rb') as f:
+                return f.read(), entry.party_code, entry.round_number
+        except OSError:
+            return None
+
+    def discard(self, clip_id: str):
+        '''Deletes a spooled clip now (e.g. after it was loaded back into memory).'''
+        with self._lock:
+            entry = self._entries.pop(clip_id, None)
+            if entry:
+                self.total_bytes -= entry.size
+        if entry:
+            self._unlink(entry.path)
+
+    def reap(self) -> int:
+        '''
+        Deletes expired clips, then the oldest unreferenced ones until the spool is within budget.
+        Returns: int: The number of clips deleted.
+        '''
+        now = time.monotonic()
+        doomed = set()
+        with self._lock:
+            by_age = sorted(self._entries.items(), key=lambda item: item[1].created)
+            for clip_id, entry in by_age:
+                age = now - entry.created
+                referenced = self.is_referenced(entry.party_code, entry.round_number)
+                if (not referenced and age > self.ttl_seconds) or age > self.ttl_seconds * HARD_TTL_FACTOR:
+                    doomed.add(clip_id)
+            remaining = self.total_bytes - sum(self._entries[cid].size for cid in doomed)
+            for clip_id, entry in by_age:
+                if remaining <= self.max_bytes:
+                    break
+                if clip_id in doomed or self.is_referenced(entry.party_code, entry.round_number):
+                    continue
+                doomed.add(clip_id)
+                remaining -= entry.size
+            entries = [self._entries.pop(clip_id) for clip_id in doomed]
+            self.total_bytes -= sum(entry.size for entry in entries)
+        for entry in entries:
+            self._unlink(entry.path)
+        return len(entries)
+
+    def _reap_forever(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"[audio] Spool reaper failed: {e}")
+
+    @staticmethod
+    def _unlink(path: Path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
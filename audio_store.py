@@ -0,0 +1,315 @@
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+from flask import Response
+
+'''
+In-memory store for generated round audio.
+
+Clips are kept in a byte-budgeted LRU under opaque random IDs, grouped by party so a closed party
+can drop all of its clips at once. When the budget is exceeded, clips of rounds that are still in
+play spill to the disk spool (audio_spool.py) instead of being lost.
+
+serve() answers requests straight from the stored bytes (ranges are cut through a memoryview, so
+only the requested span is copied), supports Range requests for seeking, and sends a strong ETag
+so browsers that re-request a clip get a 304 instead of the body.
+
+A clip that is still being synthesized is a StreamingClip: chunks are appended as the TTS engine
+produces them, and serve_stream() sends them with chunked transfer encoding as they arrive, so
+playback can start before synthesis ends. A finished stream moves into the store under the same
+ID, and later requests are served from the stored bytes as above.
+'''
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# A streaming response gives up if no chunk arrives for this long
+STREAM_TIMEOUT_SECONDS = 30
+
+
+class AudioClip:
+    __slots__ = ('clip_id', 'party_code', 'round_number', 'data', 'etag')
+
+    def __init__(self, clip_id: str, party_code: str, round_number: int, data: bytes):
+        self.clip_id = clip_id
+        self.party_code = party_code
+        self.round_number = round_number
+        self.data = data
+        self.etag = hashlib.sha1(data).hexdigest()
+
+
+class StreamingClip:
+    '''
+    A clip whose MP3 chunks are still arriving. Any number of responses can read it at once, each
+    from the first chunk.
+    '''
+    __slots__ = ('clip_id', 'party_code', 'round_number', 'failed', '_chunks', '_done', '_cond')
+
+    def __init__(self, clip_id: str, party_code: str, round_number: int):
+        self.clip_id = clip_id
+        self.party_code = party_code
+        self.round_number = round_number
+        self.failed = False
+        self._chunks = []
+        self._done = False
+        self._cond = threading.Condition()
+
+    def append(self, chunk: bytes):
+        with self._cond:
+            self._chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, failed: bool = False):
+        '''No more chunks will arrive (failed: synthesis broke off; the audio is incomplete).'''
+        with self._cond:
+            self.failed = failed
+            self._done = True
+            self._cond.notify_all()
+
+    def data(self) -> bytes:
+        with self._cond:
+            return b''.join(self._chunks)
+
+    def chunks(self, timeout: float = STREAM_TIMEOUT_SECONDS):
+        '''Yields every chunk from the first, waiting for new ones until the clip is finished.'''
+        sent = 0
+        while True:
+            with self._cond:
+                while sent == len(self._chunks) and not self._done:
+                    if not self._cond.wait(timeout):
+                        return
+                pending = self._chunks[sent:]
+                done = self._done
+            yield from pending
+            sent += len(pending)
+            if done:
+                return
+
+
+class AudioStore:
+    '''
+    Thread-safe LRU of audio clips bounded by total size in bytes.
+    max_bytes (int): Budget for all stored clips; least recently used clips are evicted past it.
+    spool (AudioSpool, optional): Disk tier; evicted clips of rounds that are still live are written
+        there instead of being dropped, and read back on the next request.
+    '''
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, spool=None):
+        self.max_bytes = max_bytes
+        self.spool = spool
+        self.total_bytes = 0
+        self._clips = OrderedDict()  # clip id -> AudioClip, oldest first
+        self._by_party = {}          # party code -> set of clip ids
+        self._streams = {}           # clip id -> StreamingClip still being synthesized
+        self._spool_refs = {}        # (party code, round) -> spool references taken by put()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._clips)
+
+    def put(self, party_code: str, data: bytes, round_number: int = 0) -> str:
+        '''
+        Stores a clip for a party's round. The round stays referenced until release_round().
+        Returns: str: The clip's opaque ID, used in the audio URL.
+        '''
+        clip = AudioClip(secrets.token_urlsafe(12), party_code, round_number, data)
+        self._add(clip)
+        return clip.clip_id
+
+    def open_stream(self, party_code: str, round_number: int = 0) -> StreamingClip:
+        '''
+        Registers a clip that is about to be synthesized; get_stream() finds it by ID meanwhile.
+        Call finish_stream() once its last chunk is in.
+        '''
+        stream = StreamingClip(secrets.token_urlsafe(12), party_code, round_number)
+        with self._lock:
+            self._streams[stream.clip_id] = stream
+        return stream
+
+    def get_stream(self, clip_id: str):
+        '''Returns the StreamingClip for an ID while it is being synthesized, or None.'''
+        return self._streams.get(clip_id)
+
+    def finish_stream(self, stream: StreamingClip):
+        '''
+        Moves a finished stream into the store under its ID, unless synthesis failed or its round
+        was released meanwhile (then the ID just stops resolving).
+        '''
+        if stream.failed:
+            with self._lock:
+                self._streams.pop(stream.clip_id, None)
+            return
+        self._add(AudioClip(stream.clip_id, stream.party_code, stream.round_number, stream.data()),
+                  stream)
+
+    def get(self, clip_id: str):
+        '''Returns the AudioClip for an ID (marking it recently used), or None.'''
+        with self._lock:
+            clip = self._clips.get(clip_id)
+            if clip is not None:
+                self._clips.move_to_end(clip_id)
+                return clip
+        if self.spool is None:
+            return None
+
+        # Memory miss: load the clip back from the spool
+        spooled = self.spool.read(clip_id)
+        if spooled is None:
+            return None
+        data, party_code, round_number = spooled
+        clip = AudioClip(clip_id, party_code, round_number, data)
+        with self._lock:
+            self._insert(clip)
+            evicted = self._evict()
+        self.spool.discard(clip_id)
+        self._spill(evicted)
+        return clip
+
+    def discard(self, clip_id: str, party_code: str, round_number: int):
+        '''Forgets one clip that won't be played (e.g. a prefetched round that was superseded).'''
+        with self._lock:
+            self._streams.pop(clip_id, None)
+            if clip_id in self._clips:
+                self._remove(clip_id)
+            key = (party_code, round_number)
+            refs = self._spool_refs.get(key, 0)
+            if refs > 1:
+                self._spool_refs[key] = refs - 1
+            elif refs:
+                del self._spool_refs[key]
+        if self.spool is not None:
+            self.spool.discard(clip_id)
+            if refs:
+                self.spool.release(party_code, round_number)
+
+    def release_round(self, party_code: str, round_number: int):
+        '''Forgets a finished round's clips, in memory and in the spool.'''
+        with self._lock:
+            refs = self._spool_refs.pop((party_code, round_number), 0)
+            self._drop_streams(party_code, round_number)
+            for clip_id in list(self._by_party.get(party_code, ())):
+                clip = self._clips.get(clip_id)
+                if clip is not None and clip.round_number == round_number:
+                    self._remove(clip_id)
+        if refs and self.spool is not None:
+            self.spool.release(party_code, round_number, refs)
+
+    def drop_party(self, party_code: str):
+        '''Removes every clip belonging to a party.'''
+        if self.spool is not None:
+            self.spool.release_party(party_code)
+        with self._lock:
+            self._drop_streams(party_code)
+            for key in [key for key in self._spool_refs if key[0] == party_code]:
+                del self._spool_refs[key]
+            for clip_id in list(self._by_party.get(party_code, ())):
+                self._remove(clip_id)
+
+    def _add(self, clip: AudioClip, stream: StreamingClip = None):
+        with self._lock:
+            # A stream is only stored if it is still registered (its round wasn't released)
+            if stream is not None and self._streams.pop(clip.clip_id, None) is not stream:
+                return
+            # Referenced only once the clip is really stored, so release_round() can reap it
+            if self.spool is not None:
+                self.spool.acquire(clip.party_code, clip.round_number)
+                key = (clip.party_code, clip.round_number)
+                self._spool_refs[key] = self._spool_refs.get(key, 0) + 1
+            self._insert(clip)
+            evicted = self._evict()
+        self._spill(evicted)
+
+    def _drop_streams(self, party_code: str, round_number: int = None):
+        for clip_id, stream in list(self._streams.items()):
+            if stream.party_code == party_code and round_number in (None, stream.round_number):
+                del self._streams[clip_id]
+
+    def _insert(self, clip: AudioClip):
+        self._clips[clip.clip_id] = clip
+        self._by_party.setdefault(clip.party_code, set()).add(clip.clip_id)
+        self.total_bytes += len(clip.data)
+
+    def _remove(self, clip_id: str):
+        clip = self._clips.pop(clip_id)
+        self.total_bytes -= len(clip.data)
+        ids = self._by_party.get(clip.party_code)
+        if ids is not None:
+            ids.discard(clip_id)
+            if not ids:
+                del self._by_party[clip.party_code]
+        return clip
+
+    def _evict(self):
+        # Always keep the newest clip, even if it alone exceeds the budget
+        evicted = []
+        while self.total_bytes > self.max_bytes and len(self._clips) > 1:
+            evicted.append(self._remove(next(iter(self._clips))))
+        return evicted
+
+    def _spill(self, evicted):
+        # Disk writes happen outside the lock
+        if self.spool is None:
+            return
+        for clip in evicted:
+            if self.spool.is_referenced(clip.party_code, clip.round_number):
+                self.spool.write(clip.clip_id, clip.party_code, clip.round_number, clip.data)
+
+
+def serve(clip: AudioClip, request, mimetype: str = 'audio/mpeg') -> Response:
+    '''
+    Builds the HTTP response for a clip, honouring If-None-Match and Range headers.
+    clip (AudioClip): The clip to send.
+    request: The current Flask request.
+    Returns: Response: 200 with the whole clip, 206 with a byte range, 304 or 416.
+    '''
+    length = len(clip.data)
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, max-age=3600, immutable',
+    }
+
+    if request.if_none_match.contains(clip.etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(clip.etag)
+        return response
+
+    start, stop, status = 0, length, 200
+    byte_range = request.range
+    # If-Range: only honour the range if the client's copy is still this clip
+    if byte_range is not None and request.if_range.etag in (None, clip.etag):
+        bounds = byte_range.range_for_length(length)
+        if bounds is None:
+            headers['Content-Range'] = f'bytes */{length}'
+            return Response(status=416, headers=headers)
+        start, stop = bounds
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+
+    if status == 200:
+        # The stored bytes object itself is the body, nothing is copied
+        body = clip.data
+    else:
+        # Slice without copying the whole clip; WSGI servers (werkzeug's included) require bytes,
+        # so only the requested span is materialized
+        body = memoryview(clip.data)[start:stop].tobytes()
+    headers['Content-Length'] = str(stop - start)
+    response = Response([body], status=status, mimetype=mimetype, headers=headers)
+    response.set_etag(clip.etag)
+    return response
+
+
+def serve_stream(stream: StreamingClip, mimetype: str = 'audio/mpeg', count=None) -> Response:
+    '''
+    Streams a clip that is still being synthesized, chunk by chunk as it arrives. There is no
+    Content-Length, so HTTP/1.1 servers send it chunked. Range requests get the whole stream
+    (200): the length isn't known yet.
+    count (callable): Optional count(n) called with the size of every chunk sent.
+    '''
+    def body():
+        for chunk in stream.chunks():
+            if count is not None:
+                count(len(chunk))
+            yield chunk
+    # Not cacheable: a later request is answered from the finished clip, with its ETag
+    return Response(body(), mimetype=mimetype, headers={'Cache-Control': 'no-store'},
+                    direct_passthrough=True)
@@ -0,0 +1,148 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from difflib import SequenceMatcher
+
+from fact_index import FactIndex, extract_keywords
+from fact_round import FactCorpus
+
+'''
+Compares fact_index.FactIndex with check_fact_answer, the fuzzy matcher it replaces.
+
+Every filler fact is used as a player's fact and checked against a fixed-seed mix of answers:
+the fact itself, paraphrases (dropped words), keyword-only answers, answers with typos, and
+unrelated facts. Reports how often the two agree, where they disagree, and the time per answer.
+
+Run: python3 benchmarks/bench_fact_index.py
+'''
+
+SEED = 1234
+
+
+def check_fact_answer(answer, fact):
+    """
+    Return True if the player's answer is close enough to the stored fact.
+    The original app._check_fact_answer, kept here as the reference FactIndex is compared with.
+
+    Uses multiple signals so paraphrases like "king triton" → "he was king
+    triton" or "triton" still match:
+      1. SequenceMatcher ratio on the full strings
+      2. Keyword overlap (Jaccard-style)
+      3. Whether all important fact keywords appear somewhere in the answer
+      4. Whether the answer is a substring of the fact or vice versa
+    """
+    if not answer or not fact:
+        return False
+
+    a = answer.lower().strip()
+    f = fact.lower().strip()
+
+    # 1. Direct SequenceMatcher on full strings
+    seq_ratio = SequenceMatcher(None, a, f).ratio()
+    if seq_ratio >= 0.50:
+        return True
+
+    # 2. Substring containment (either direction)
+    if a in f or f in a:
+        return True
+
+    # 3. Keyword-based scoring
+    a_kw = set(extract_keywords(answer))
+    f_kw = set(extract_keywords(fact))
+
+    if not f_kw:
+        return seq_ratio >= 0.40
+
+    # How many fact keywords did the answer mention?
+    overlap = a_kw & f_kw
+    recall = len(overlap) / len(f_kw)  # what fraction of fact words were hit?
+
+    # If the answer nails most of the fact's keywords, accept it
+    if recall >= 0.50:
+        return True
+
+    # 4. Fuzzy per-word matching (catches typos/partial words)
+    #    For each fact keyword, check if any answer keyword is close
+    fuzzy_hits = 0
+    for fword in f_kw:
+        for aword in a_kw:
+            word_sim = SequenceMatcher(None, aword, fword).ratio()
+            if word_sim >= 0.70:
+                fuzzy_hits += 1
+                break
+    fuzzy_recall = fuzzy_hits / len(f_kw)
+    if fuzzy_recall >= 0.50:
+        return True
+
+    return False
+
+
+def _typo(word, rng):
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+
+
+def build_cases(facts, rng):
+    '''Returns (fact index, answer) pairs covering accept and reject cases.'''
+    cases = []
+    for i, fact in enumerate(facts):
+        words = fact.split()
+        cases.append((i, fact))
+        kept = [w for w in words if rng.random() > 0.4] or words[:1]
+        cases.append((i, ' '.join(kept)))
+        cases.append((i, ' '.join(rng.sample(words, min(3, len(words))))))
+        cases.append((i, ' '.join(_typo(w, rng) for w in words)))
+        cases.append((i, ' '.join(_typo(w, rng) for w in rng.sample(words, min(2, len(words))))))
+        cases.append((i, facts[rng.randrange(len(facts))]))
+        cases.append((i, facts[rng.randrange(len(facts))][:30]))
+    return cases
+
+
+def main():
+    rng = random.Random(SEED)
+    facts = FactCorpus.load().facts
+    cases = build_cases(facts, rng)
+
+    index = FactIndex()
+    for i, fact in enumerate(facts):
+        index.update(i, fact)
+
+    start = time.perf_counter()
+    expected = [check_fact_answer(answer, facts[i]) for i, answer in cases]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [index.check(i, answer) for i, answer in cases]
+    index_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = index.score_round(cases)
+    batch_time = time.perf_counter() - start
+
+    assert single == batch
+    false_accepts = sum(1 for e, r in zip(expected, single) if r and not e)
+    false_rejects = sum(1 for e, r in zip(expected, single) if e and not r)
+    agreement = 1 - (false_accepts + false_rejects) / len(cases)
+
+    print(f"{len(cases)} answers against {len(facts)} facts "
+          f"({sum(expected)} accepted by check_fact_answer)")
+    print(f"  agreement:            {agreement:.2%}")
+    print(f"  accepted only by index: {false_accepts}")
+    print(f"  rejected only by index: {false_rejects}")
+    print(f"  check_fact_answer:    {legacy_time / len(cases) * 1e6:8.1f} us/answer")
+    print(f"  FactIndex.check:      {index_time / len(cases) * 1e6:8.1f} us/answer")
+    print(f"  FactIndex.score_round:{batch_time / len(cases) * 1e6:8.1f} us/answer")
+    if '-v' in sys.argv:
+        for (i, answer), e, r in zip(cases, expected, single):
+            if e != r:
+                print(f"    {'+' if r else '-'} {answer!r} vs {facts[i]!r}")
+
+
+if __name__ == "__main__":
+    main()
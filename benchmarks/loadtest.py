@@ -0,0 +1,442 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import socketio
+
+'''
+Load generator: simulated parties playing against a real server over Socket.IO.
+
+Each party is one host plus helpers, each a python-socketio client, driving the same event
+sequence as game.js: create_party / join_party, start_game, then per round request_round,
+sync_input (answer typing, acked like the browser does), audio download, submit_answer and
+next_round. Latency is measured from the emit to the event that answers it:
+
+    create_party -> party_created       request_round -> round_data (every player)
+    join_party   -> party_joined        sync_input    -> sync_input_batch (every other player)
+    start_game   -> game_started        submit_answer -> round_results (last answer to arrival)
+    GET audio    -> response body       next_round    -> sync_next_round (every player)
+
+By default a server is started on a free port with TTS_BACKEND=stub (no gTTS calls), and its
+RSS is sampled from /proc while the test runs. --url targets a running server instead (start it
+with TTS_BACKEND=stub; pass --server-pid to sample its RSS).
+
+Run: python3 benchmarks/loadtest.py --parties 20 --players 4 --rounds 8
+'''
+
+ROOT = Path(__file__).resolve().parent.parent
+EVENT_TIMEOUT = 15.0
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def round_settings(round_number):
+    '''Difficulty and time limit game.js requests for a round (see app.predict_round_settings).'''
+    return min(-(-round_number // 2), 5), max(45 - round_number * 2, 25)
+
+
+class Stats:
+    '''Latencies per measured event, plus sent and received event counts, shared by all clients.'''
+
+    def __init__(self):
+        self.latencies = {}
+        self.sent = {}
+        self.received = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def _add(self, table, key, amount=1):
+        with self._lock:
+            table[key] = table.get(key, 0) + amount
+
+    def latency(self, name, seconds):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+
+    def count_sent(self, event):
+        self._add(self.sent, event)
+
+    def count_received(self, event):
+        self._add(self.received, event)
+
+    def error(self, what):
+        self._add(self.errors, what)
+
+    def report(self, elapsed) -> dict:
+        with self._lock:
+            events = {}
+            for name, values in sorted(self.latencies.items()):
+                values = sorted(values)
+                events[name] = {
+                    'count': len(values),
+                    'p50_ms': _percentile(values, 0.50) * 1000,
+                    'p95_ms': _percentile(values, 0.95) * 1000,
+                    'p99_ms': _percentile(values, 0.99) * 1000,
+                    'max_ms': values[-1] * 1000,
+                }
+            return {
+                'elapsed_s': elapsed,
+                'events': events,
+                'sent_per_s': {k: v / elapsed for k, v in sorted(self.sent.items())},
+                'received_per_s': {k: v / elapsed for k, v in sorted(self.received.items())},
+                'errors': dict(self.errors),
+            }
+
+
+class SimPlayer:
+    '''One simulated browser. Received events are queued per name until the party script waits on them.'''
+
+    def __init__(self, url, name, stats, transports=None):
+        self.url = url
+        self.name = name
+        self.stats = stats
+        self.transports = transports
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('*', self._on_event)
+        self._inbox = {}
+        self._cond = threading.Condition()
+        self.on_sync_change = None
+
+    def connect(self, party_hint):
+        # Same routing hint as game.js, so a load balancer keeps the party on one worker
+        self.sio.connect(f'{self.url}?party={party_hint}', transports=self.transports,
+                         wait_timeout=EVENT_TIMEOUT)
+
+    def disconnect(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+    def emit(self, event, data=None):
+        self.stats.count_sent(event)
+        sent = time.perf_counter()
+        if data is None:
+            self.sio.emit(event)
+        else:
+            self.sio.emit(event, data)
+        return sent
+
+    def _on_event(self, event, data=None):
+        now = time.perf_counter()
+        self.stats.count_received(event)
+        if event == 'sync_input_batch':
+            # Acked like the browser, otherwise the server holds back the next batch
+            self.emit('sync_input_ack', {'version': data['version']})
+            if self.on_sync_change:
+                for change in data.get('changes', ()):
+                    self.on_sync_change(change, now)
+            return
+        with self._cond:
+            self._inbox.setdefault(event, []).append((now, data))
+            self._cond.notify_all()
+
+    def wait(self, event, match=None, timeout=EVENT_TIMEOUT):
+        '''Removes and returns (arrival time, data) of the first queued event that matches.'''
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                queue = self._inbox.get(event, [])
+                for i, (arrived, data) in enumerate(queue):
+                    if match is None or match(data):
+                        del queue[i]
+                        return arrived, data
+                errors = self._inbox.get('error')
+                if errors:
+                    raise RuntimeError(f"{self.name}: server error {errors.pop(0)[1]}")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{self.name}: no {event} within {timeout:.0f}s")
+                self._cond.wait(remaining)
+
+
+class SimParty:
+    '''A host and helpers playing a fixed number of rounds.'''
+
+    def __init__(self, index, url, players, rounds, stats, transports=None, think=0.0):
+        self.index = index
+        self.url = url
+        self.rounds = rounds
+        self.stats = stats
+        self.think = think
+        self.rng = random.Random(index)
+        self.players = [
+            SimPlayer(url, f'Player {index}-{i}', stats, transports) for i in range(players)
+        ]
+        self._sync_sent = {}
+        self._sync_lock = threading.Lock()
+
+    def _on_sync_change(self, change, arrived):
+        with self._sync_lock:
+            sent = self._sync_sent.get(change.get('value'))
+        if sent is not None:
+            self.stats.latency('sync_input', arrived - sent)
+
+    def _pause(self):
+        if self.think:
+            time.sleep(self.rng.uniform(0, self.think))
+
+    def _fetch_audio(self, audio_url):
+        start = time.perf_counter()
+        with urllib.request.urlopen(self.url + audio_url, timeout=EVENT_TIMEOUT) as response:
+            response.read()
+        self.stats.latency('audio_download', time.perf_counter() - start)
+
+    def run(self):
+        host, helpers = self.players[0], self.players[1:]
+        try:
+            for player in self.players:
+                player.on_sync_change = self._on_sync_change
+                player.connect(f'LOAD{self.index}')
+
+            sent = host.emit('create_party', {'name': host.name, 'fact': f'I have {self.index} cats at home'})
+            arrived, created = host.wait('party_created')
+            self.stats.latency('create_party', arrived - sent)
+            code = created['code']
+            for i, helper in enumerate(helpers):
+                sent = helper.emit('join_party', {'code': code, 'name': helper.name,
+                                                  'fact': f'I once climbed {i + 2} mountains'})
+                arrived, _ = helper.wait('party_joined')
+                self.stats.latency('join_party', arrived - sent)
+
+            sent = host.emit('start_game')
+            for player in self.players:
+                arrived, _ = player.wait('game_started')
+                self.stats.latency('start_game', arrived - sent)
+
+            for round_number in range(1, self.rounds + 1):
+                self._play_round(host, round_number)
+        except Exception as e:
+            self.stats.error(type(e).__name__)
+            print(f"[loadtest] Party {self.index}: {e}")
+        finally:
+            for player in self.players:
+                player.disconnect()
+
+    def _play_round(self, host, round_number):
+        level, time_limit = round_settings(round_number)
+        sent = host.emit('request_round', {'difficulty': level, 'time_limit': time_limit, 'round': round_number})
+        tasks = {}
+        for player in self.players:
+            arrived, data = player.wait('round_data', lambda d: d.get('round') == round_number)
+            self.stats.latency('request_round', arrived - sent)
+            tasks[player] = data
+
+        is_fact = tasks[host].get('round_type') == 'fact'
+        if not is_fact:
+            # Answer typing, mirrored to teammates; values are unique so arrivals can be timed
+            for player in self.players:
+                for keystroke in range(3):
+                    value = f'{player.name}:{round_number}:{keystroke}'
+                    with self._sync_lock:
+                        self._sync_sent[value] = time.perf_counter()
+                    player.emit('sync_input', {'type': 'audio', 'value': value})
+            audio = tasks[host].get('audio_task')
+            if audio:
+                for _ in self.players:
+                    self._fetch_audio(audio['audio_url'])
+        self._pause()
+
+        # Every player answers (as the page does when its timer runs out); the round closes on the
+        # last answer the server waits for and everyone gets one round_results
+        for player in self.players:
+            task = tasks[player]
+            if is_fact:
+                answer = {'fact_answer': self.rng.choice(task['fact_question']['choices'])}
+            else:
+                visual = task['visual_task']
+                answer = {
+                    'visual_answer': [] if visual['display_type'] == 'clickable' else self.rng.randint(0, 10),
+                    'audio_answer': self.rng.randint(0, 10),
+                }
+            sent = player.emit('submit_answer', answer)
+        for player in self.players:
+            arrived, _ = player.wait('round_results', lambda d: d.get('round') == round_number)
+            self.stats.latency('submit_answer', arrived - sent)
+
+        sent = host.emit('next_round', {})
+        for player in self.players:
+            arrived, _ = player.wait('sync_next_round')
+            self.stats.latency('next_round', arrived - sent)
+        # Answer ticks aren't waited on; drop them before the next round
+        for player in self.players:
+            with player._cond:
+                player._inbox.pop('player_answered', None)
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    '''Samples a process's resident set size from /proc (Linux only).'''
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = _rss_bytes(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join()
+        if not self.samples:
+            return {}
+        mb = 1024 * 1024
+        return {'start_mb': self.samples[0] / mb, 'peak_mb': max(self.samples) / mb,
+                'end_mb': self.samples[-1] / mb}
+
+
+def start_server(port, extra_env=None, log_path=None):
+    '''Starts app.py with the stub TTS backend and waits until it answers HTTP.'''
+    env = dict(os.environ, PORT=str(port), TTS_BACKEND='stub', PYTHONUNBUFFERED='1')
+    env.update(extra_env or {})
+    log = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=ROOT, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Server did not start within 30s')
+
+
+def _transports(forced):
+    if forced:
+        return [forced]
+    try:
+        import websocket  # noqa: F401  (websocket-client, needed for the websocket upgrade)
+        return None
+    except ImportError:
+        return ['polling']
+
+
+def _free_port():
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_load(url, parties, players, rounds, ramp=0.0, transports=None, think=0.0) -> dict:
+    '''
+    Plays the given number of parties concurrently against a server.
+    ramp (float): Seconds over which party starts are spread.
+    Returns: dict: Stats.report() for the run.
+    '''
+    stats = Stats()
+    sims = [SimParty(i, url, players, rounds, stats, transports, think) for i in range(parties)]
+    threads = [threading.Thread(target=sim.run, daemon=True) for sim in sims]
+    start = time.perf_counter()
+    for i, thread in enumerate(threads):
+        thread.start()
+        if ramp and parties > 1:
+            time.sleep(ramp / (parties - 1))
+    for thread in threads:
+        thread.join()
+    return stats.report(time.perf_counter() - start)
+
+
+def print_report(report, config):
+    print(f"\n{config['parties']} parties x {config['players']} players, {config['rounds']} rounds "
+          f"in {report['elapsed_s']:.1f}s")
+    print(f"{'event':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in report['events'].items():
+        print(f"{name:<16}{row['count']:>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    sent = sum(report['sent_per_s'].values())
+    received = sum(report['received_per_s'].values())
+    print(f"Emit rate: {sent:.0f}/s from clients, {received:.0f}/s from the server")
+    for name, rate in report['received_per_s'].items():
+        print(f"  {name:<20}{rate:>10.1f}/s")
+    rss = report.get('server_rss')
+    if rss:
+        print(f"Server RSS: {rss['start_mb']:.1f} MB at start, {rss['peak_mb']:.1f} MB peak, "
+              f"{rss['end_mb']:.1f} MB at end")
+    if report['errors']:
+        print(f"Errors: {report['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO load test with simulated parties')
+    parser.add_argument('--parties', type=int, default=10)
+    parser.add_argument('--players', type=int, default=4, help='Players per party, host included')
+    parser.add_argument('--rounds', type=int, default=8)
+    parser.add_argument('--ramp', type=float, default=2.0, help='Seconds over which parties start')
+    parser.add_argument('--think', type=float, default=0.0, help='Max random pause before answering (s)')
+    parser.add_argument('--url', help='Target a running server instead of starting one')
+    parser.add_argument('--server-pid', type=int, help='PID of the --url server, to sample its RSS')
+    parser.add_argument('--transport', choices=['polling', 'websocket'],
+                        help='Force one Engine.IO transport (default: polling, upgrading to '
+                             'websocket when websocket-client is installed)')
+    parser.add_argument('--server-log', help='Write the started server\'s output to this file')
+    parser.add_argument('--json', help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url, pid = args.url.rstrip('/'), args.server_pid
+    else:
+        port = _free_port()
+        process = start_server(port, log_path=args.server_log)
+        url, pid = f'http://127.0.0.1:{port}', process.pid
+    sampler = RssSampler(pid) if pid else None
+    if sampler:
+        sampler.start()
+    try:
+        report = run_load(url, args.parties, args.players, args.rounds, args.ramp,
+                          _transports(args.transport), args.think)
+    finally:
+        if sampler:
+            rss = sampler.stop()
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+    if sampler:
+        report['server_rss'] = rss
+    config = {'parties': args.parties, 'players': args.players, 'rounds': args.rounds}
+    print_report(report, config)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': config, **report}, f, indent=2)
+    sys.exit(1 if report['errors'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import argparse
+import itertools
+import json
+import platform
+import random
+import statistics
+import string
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app
+import difficulty
+import image_catalog
+import timer_wheel
+import word_generator
+from bench_fact_index import check_fact_answer
+from fact_index import FactIndex
+from fact_round import FactCorpus
+
+'''
+Microbenchmarks for task generation and grading, checked against stored baselines.
+
+Every benchmark builds its inputs from a fixed seed and reseeds the global random module before
+it is timed, so runs are repeatable. Timing follows timeit: the call count is calibrated to
+about 0.2s per repeat and the fastest of --repeat runs is kept, as time per call.
+
+Results are compared with benchmarks/baselines.json. Every run first times a fixed pure-Python
+workload (reference_workload); results are scaled by how much faster or slower it ran than when
+the baselines were recorded, so a busier or slower machine doesn't read as a regression. A benchmark
+whose scaled time is more than --threshold (default 25%) over its baseline is measured again, up
+to --retries more times, keeping its best time; if it is still too slow, it fails the run with
+exit code 1. Benchmarks whose baseline is under MICRO_BENCHMARK_US take only a few microseconds
+per call and jitter more, so they are allowed --micro-threshold (default 50%) instead. On a
+different machine than the baselines were recorded on, regressions are only reported, never
+fatal. --update records the median of 1 + --retries measurements, so one lucky run doesn't set
+the bar:
+
+    python3 benchmarks/run_benchmarks.py                    # compare with the baselines
+    python3 benchmarks/run_benchmarks.py --update           # record new baselines
+    python3 benchmarks/run_benchmarks.py -k clipart         # only benchmarks whose name contains "clipart"
+'''
+
+SEED = 2024
+BASELINES = Path(__file__).resolve().parent / 'baselines.json'
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MICRO_THRESHOLD = 0.5
+MICRO_BENCHMARK_US = 100
+DEFAULT_RETRIES = 2
+
+BENCHMARKS = []
+
+
+def benchmark(name):
+    '''
+    Registers a benchmark. The decorated generator gets a seeded Random, does its setup, yields the
+    zero-argument callable to time (or a (callable, reset) pair, where reset() restores the state
+    the callable works on before each repeat), then undoes any setup after the yield.
+    '''
+    def register(make):
+        BENCHMARKS.append((name, make))
+        return make
+    return register
+
+
+def large_catalog(rng, clipart=5000, colors=20, per_color=50):
+    '''A synthetic image catalog far bigger than static/images, with a skewed letter distribution.'''
+    letters = string.ascii_lowercase
+    weights = [rng.random() ** 2 for _ in letters]
+    files = [f'{rng.choices(letters, weights)[0]}item{i}.png' for i in range(clipart)]
+    aliases = {Path(f).stem: [rng.choice(letters)] for f in files[::50]}
+    color_names = [f'color{chr(97 + i)}' for i in range(colors)]
+    color_files = [f'{c}{j}.png' for c in color_names for j in range(per_color)]
+    return image_catalog.ImageCatalog(files, aliases, color_files)
+
+
+def long_facts(rng, count=200):
+    '''Player facts padded into run-on sentences, the worst case for fuzzy matching.'''
+    facts = FactCorpus.load().facts
+    out = []
+    for _ in range(count):
+        parts = rng.sample(facts, 3)
+        out.append(' and also '.join(parts))
+    return out
+
+
+def reference_workload():
+    '''Sorting, string and dict work that doesn't touch the game, to gauge the machine's speed.'''
+    words = [f'word{i * 7919 % 10007}' for i in range(5000)]
+    counts = {}
+    for word in sorted(words):
+        counts[word[-1]] = counts.get(word[-1], 0) + len(word)
+    return counts
+
+
+# ── Visual tasks ────────────────────────────────────────────────
+
+@benchmark('generate_visual_task/difficulty_1')
+def _(rng):
+    yield lambda: app.generate_visual_task(1)
+
+
+@benchmark('generate_visual_task/difficulty_5')
+def _(rng):
+    yield lambda: app.generate_visual_task(5)
+
+
+@benchmark('generate_visual_task/scripted_rounds')
+def _(rng):
+    rounds = [1, 2, 3, 4, 5]
+    yield lambda: [app.generate_visual_task(app.predict_round_settings(r)[0], r) for r in rounds]
+
+
+@benchmark('generate_clipart_task/catalog')
+def _(rng):
+    yield lambda: app.generate_clipart_task(5, 16)
+
+
+@benchmark('generate_clipart_task/large_catalog')
+def _(rng):
+    real = app.images.catalog
+    app.images.catalog = large_catalog(rng)
+    yield lambda: app.generate_clipart_task(5, 16)
+    app.images.catalog = real
+
+
+@benchmark('color_count_task/large_catalog')
+def _(rng):
+    real = app.images.catalog
+    app.images.catalog = large_catalog(rng)
+    yield lambda: app.build_visual_task(5, 'color_count')
+    app.images.catalog = real
+
+
+@benchmark('load_color_images')
+def _(rng):
+    yield app.load_color_images
+
+
+# ── Audio tasks ─────────────────────────────────────────────────
+
+@benchmark('audio_output_by_difficulty/all_levels')
+def _(rng):
+    settings = [app.predict_round_settings(r) + (r,) for r in range(1, 13)]
+    yield lambda: [difficulty.audio_output_by_difficulty(level, limit, current_round=r)
+                   for level, limit, r in settings]
+
+
+@benchmark('calculate_audio_answer')
+def _(rng):
+    random.seed(SEED)
+    rounds = []
+    for r in range(1, 13):
+        level, limit = app.predict_round_settings(r)
+        content = difficulty.audio_output_by_difficulty(level, limit, current_round=r)
+        rounds.append((content, content[0]))
+    yield lambda: [app.calculate_audio_answer(content, task) for content, task in rounds]
+
+
+@benchmark('load_words')
+def _(rng):
+    levels = ('easy', 'medium', 'hard', 'emergency')
+    yield lambda: [word_generator.load_words(level) for level in levels]
+
+
+# ── Fact answers ────────────────────────────────────────────────
+
+@benchmark('check_fact_answer/long_facts')
+def _(rng):
+    facts = long_facts(rng)
+    answers = [(fact, ' '.join(w for w in fact.split() if rng.random() > 0.3)) for fact in facts[:50]]
+    answers += [(fact, facts[rng.randrange(len(facts))]) for fact in facts[50:100]]
+    yield lambda: [check_fact_answer(answer, fact) for fact, answer in answers]
+
+
+@benchmark('fact_index_check/long_facts')
+def _(rng):
+    facts = long_facts(rng)
+    index = FactIndex()
+    for i, fact in enumerate(facts):
+        index.update(i, fact)
+    answers = [(i, ' '.join(w for w in facts[i].split() if rng.random() > 0.3)) for i in range(50)]
+    answers += [(i, facts[rng.randrange(len(facts))]) for i in range(50, 100)]
+    yield lambda: [index.check(i, answer) for i, answer in answers]
+
+
+# ── Round deadlines ─────────────────────────────────────────────
+
+@benchmark('timer_wheel/10k_rounds_one_tick')
+def _(rng):
+    # One tick of a wheel holding 10k pending round deadlines, with a round opening per tick.
+    # A deadline that fires schedules the next round's, so the wheel stays at 10k however many
+    # ticks a repeat runs; reset() starts each repeat from the same wheel.
+    delays = [rng.uniform(25, 60) for _ in range(10000)]
+    state = {}
+
+    def reset():
+        now = state['now'] = [0.0]
+        wheel = state['wheel'] = timer_wheel.TimerWheel(clock=lambda: now[0])
+        upcoming = itertools.cycle(delays)
+
+        def next_round():
+            wheel.schedule(next(upcoming), next_round)
+        for delay in delays:
+            wheel.schedule(delay, next_round)
+
+    def tick():
+        wheel = state['wheel']
+        wheel.schedule(45, lambda: None).cancel()
+        state['now'][0] += wheel.tick
+        wheel.advance()
+    reset()
+    yield tick, reset
+
+
+def benchmark_of(fn):
+    '''Wraps a plain callable as a benchmark generator (for timing it outside BENCHMARKS).'''
+    def make(rng):
+        yield fn
+    return make
+
+
+def time_benchmark(make, repeat: int) -> float:
+    '''
+    Runs one benchmark.
+    Returns: float: Best time per call in microseconds.
+    '''
+    steps = make(random.Random(SEED))
+    fn = next(steps)
+    reset = None
+    if isinstance(fn, tuple):
+        fn, reset = fn
+    try:
+        random.seed(SEED)
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        best = float('inf')
+        for _ in range(repeat):
+            random.seed(SEED)
+            if reset is not None:
+                reset()
+            best = min(best, timer.timeit(number) / number)
+    finally:
+        next(steps, None)
+    return best * 1e6
+
+
+def _machine() -> dict:
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'processor': platform.processor() or platform.node()}
+
+
+def load_baselines(path: Path) -> dict:
+    if not path.exists():
+        return {'machine': None, 'results': {}}
+    return json.loads(path.read_text())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Task generation and grading microbenchmarks')
+    parser.add_argument('-k', dest='pattern', default='', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed slowdown over the baseline, as a fraction (0.25 = 25%%)')
+    parser.add_argument('--micro-threshold', type=float, default=DEFAULT_MICRO_THRESHOLD,
+                        help=f'Allowed slowdown for benchmarks with a baseline under {MICRO_BENCHMARK_US} us')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help='Extra measurements of a benchmark over the threshold (best time is kept)')
+    parser.add_argument('--baselines', type=Path, default=BASELINES)
+    parser.add_argument('--update', action='store_true', help='Store these results as the new baselines')
+    args = parser.parse_args()
+
+    stored = load_baselines(args.baselines)
+    baselines = stored.get('results', {})
+    other_machine = bool(stored.get('machine')) and stored['machine'] != _machine()
+    if other_machine and not args.update:
+        print(f"Note: baselines were recorded on {stored['machine']}, this is {_machine()}; "
+              f"regressions are reported but don't fail the run")
+
+    make_reference = benchmark_of(reference_workload)
+    reference = statistics.median(time_benchmark(make_reference, args.repeat) for _ in range(1 + args.retries))
+    # Times are compared as if this run were on the machine, and under the load, of the baselines
+    scale = 1.0
+    if stored.get('reference') and not args.update:
+        scale = stored['reference'] / reference
+        print(f"Reference workload: {reference:.1f} us (baseline {stored['reference']:.1f} us), "
+              f"times scaled by {scale:.2f}")
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<42}{'us/call':>12}{'baseline':>12}{'change':>9}")
+    for name, make in BENCHMARKS:
+        if args.pattern not in name:
+            continue
+        if args.update:
+            current = statistics.median(time_benchmark(make, args.repeat) for _ in range(1 + args.retries))
+        else:
+            baseline = baselines.get(name)
+            allowed = args.threshold
+            if baseline is not None and baseline < MICRO_BENCHMARK_US:
+                allowed = max(allowed, args.micro_threshold)
+            current = time_benchmark(make, args.repeat) * scale
+            for _ in range(args.retries):
+                # A slow measurement is often noise: measure again and keep the best
+                if baseline is None or current / baseline - 1 <= allowed:
+                    break
+                current = min(current, time_benchmark(make, args.repeat) * scale)
+        results[name] = current
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name:<42}{current:>12.1f}{'-':>12}{'new':>9}")
+            continue
+        change = current / baseline - 1
+        flag = ''
+        if not args.update and change > allowed:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<42}{current:>12.1f}{baseline:>12.1f}{change:>+9.0%}{flag}")
+
+    if args.update:
+        baselines.update(results)
+        args.baselines.write_text(json.dumps(
+            {'machine': _machine(), 'reference': reference, 'results': dict(sorted(baselines.items()))},
+            indent=2) + '\n')
+        print(f"Baselines written to {args.baselines}")
+        return
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline beyond the threshold: "
+              f"{', '.join(regressions)}")
+        if not other_machine:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,11 @@ Difficulty can be measured using a constant. We can thus tweak difficulty by cha
 Levels should be within a range of 1-5
 '''
 
+REALISTIC_PRIME_NUMBERS = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+EASY_TASKS = ["Count all numbers", "Count all even numbers", "Count all odd numbers"]
+MEDIUM_TASKS = ["Count all prime numbers", "Add all even numbers", "Add all odd numbers"]
+HARD_TASKS = ["Add even numbers and subtract odd numbers", "Add odd numbers and subtract even numbers", "Count even numbers and add prime numbers"]
+
 
 def audio_difficulty_settings(difficulty: int) -> tuple[bool, bool, list[str], str]:
     '''
@@ -58,10 +63,10 @@ def audio_output_by_difficulty(difficulty: int, time_limit: int = 45, current_ro
     current_round (int, optional): Current game round. Rounds 4-5 restrict to counting-only tasks.
     Returns: str: The name of the output audio file.
     '''
-    realistic_prime_numbers = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
-    easy_tasks = ["Count all numbers", "Count all even numbers", "Count all odd numbers"]
-    medium_tasks = ["Count all prime numbers", "Add all even numbers", "Add all odd numbers"]
-    hard_tasks = ["Add even numbers and subtract odd numbers", "Add odd numbers and subtract even numbers", "Count even numbers and add prime numbers"]
+    realistic_prime_numbers = REALISTIC_PRIME_NUMBERS
+    easy_tasks = EASY_TASKS
+    medium_tasks = MEDIUM_TASKS
+    hard_tasks = HARD_TASKS
 
     # Rounds 4-5: restrict to counting-only tasks regardless of difficulty
     if current_round and current_round <= 5:
@@ -83,9 +88,9 @@ def audio_output_by_difficulty(difficulty: int, time_limit: int = 45, current_ro
     
     # Reduce word count significantly - just 2-4 words per difficulty level
     # But never exceed what time allows
-    words = word_generator.load_words('easy' if difficulty <= 2 else 'medium' if difficulty == 3 else 'hard')
+    word_level = 'easy' if difficulty <= 2 else 'medium' if difficulty == 3 else 'hard'
     num_words = min(2 + difficulty, 6, max_items // 2)  # Half of max items for words
-    selected_words = random.sample(words, num_words)
+    selected_words = word_generator.WORD_BANK.sample(word_level, num_words)
     
     # Significantly reduce number count and use smaller ranges for early levels
     # Level 1-2: 3-4 numbers from 1-10
@@ -131,6 +136,21 @@ def audio_output_by_difficulty(difficulty: int, time_limit: int = 45, current_ro
     return output_audio
 
 
+def audio_vocabulary() -> list[str]:
+    '''
+    Lists every token audio_output_by_difficulty can put into a round.
+    Used to warm the per-token TTS clip cache so rounds never wait on gTTS.
+    Returns: list[str]: Task strings, words from every difficulty file, and the numbers 1-30.
+    '''
+    vocabulary = EASY_TASKS + MEDIUM_TASKS + HARD_TASKS
+    for level in ('easy', 'medium', 'hard'):
+        vocabulary += word_generator.WORD_BANK.words(level)
+    vocabulary += [str(num) for num in range(1, 31)]
+    vocabulary += [str(num) for num in REALISTIC_PRIME_NUMBERS]
+    # Preserve order (tasks first) but drop duplicates
+    return list(dict.fromkeys(token for token in vocabulary if token))
+
+
 if __name__ == "__main__":
     for level in range(1, 6):
         slow = speech_rate_by_difficulty(level)
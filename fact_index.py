@@ -0,0 +1,222 @@
+import math
+import threading
+from collections import Counter
+from difflib import SequenceMatcher
+
+'''
+Precompiled fuzzy matching of answers against players' fun facts.
+
+Fact rounds are multiple choice and graded by exact comparison with the options a player was shown;
+this index is for free-form answers. The fuzzy matcher it replaces (kept as the reference in
+benchmarks/bench_fact_index.py) recomputed everything from scratch for every answer, including a
+SequenceMatcher for every (answer keyword, fact keyword) pair. FactIndex compiles each fact once,
+when it is set, into:
+    - the lowercased fact, its character counts and a SequenceMatcher primed with it; the counts
+      give an exact upper bound on the ratio, so the full-string comparison (now the last check)
+      only runs when it could pass
+    - its keyword set, for the keyword recall check
+    - a bigram -> keyword postings index over padded keywords ('^word$'), used as a q-gram filter
+      before a bounded Levenshtein check of each remaining candidate
+
+Keyword similarity is edit-distance based (at most 30% of the longer word's length may differ)
+rather than SequenceMatcher's ratio, so results can differ from the reference on borderline typos.
+Unlike the reference, an answer contained in the fact (or the other way round) is not accepted on
+that alone: "a" is in almost every fact, so containment has to pass the same keyword and full-string
+checks as any other answer. benchmarks/bench_fact_index.py measures the agreement and the speedup.
+'''
+
+_STOP_WORDS = frozenset(
+    'i me my he she his her they their them a an the is am are was were '
+    'be been being do does did have has had that this it its of in to for '
+    'on at by with about as just also very really and or but so if then '
+    'than too not no'.split()
+)
+
+# Same acceptance thresholds as the reference matcher
+FULL_RATIO = 0.50
+FULL_RATIO_NO_KEYWORDS = 0.40
+RECALL = 0.50
+WORD_SIMILARITY = 0.70
+
+
+def extract_keywords(text: str) -> list[str]:
+    '''Pull meaningful words out of a sentence, lowercased, stop-words removed.'''
+    cleaned = [''.join(ch for ch in w if ch.isalnum()) for w in text.lower().split()]
+    return [w for w in cleaned if w and w not in _STOP_WORDS]
+
+
+def _bigrams(word: str) -> set:
+    padded = f'^{word}$'
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def _max_distance(len_a: int, len_b: int) -> int:
+    '''Largest edit distance that still counts as a fuzzy keyword match.'''
+    return int(max(len_a, len_b) * (1 - WORD_SIMILARITY) + 1e-9)
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> bool:
+    '''True if the edit distance between a and b is at most limit (stops as soon as it can't be).'''
+    if abs(len(a) - len(b)) > limit:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for j, cb in enumerate(b, 1):
+        current = [j]
+        row_min = j
+        for i, ca in enumerate(a, 1):
+            cost = previous[i - 1] + (ca != cb)
+            cost = min(cost, previous[i] + 1, current[i - 1] + 1)
+            current.append(cost)
+            if cost < row_min:
+                row_min = cost
+        if row_min > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+def _ratio_bound(a_counts: Counter, a_len: int, f_counts: Counter, f_len: int) -> float:
+    '''Upper bound on SequenceMatcher(None, a, f).ratio() (same idea as quick_ratio).'''
+    total = a_len + f_len
+    if not total:
+        return 1.0
+    if 2 * min(a_len, f_len) / total < FULL_RATIO_NO_KEYWORDS:
+        return 0.0
+    matches = sum(min(count, f_counts[ch]) for ch, count in a_counts.items())
+    return 2 * matches / total
+
+
+class CompiledAnswer:
+    '''An answer prepared once so it can be scored against several facts.'''
+    __slots__ = ('text', 'counts', 'keywords')
+
+    def __init__(self, answer: str):
+        self.text = answer.lower().strip()
+        self.counts = Counter(self.text)
+        self.keywords = frozenset(extract_keywords(answer))
+
+
+class CompiledFact:
+    '''A fact with its matching signatures precomputed.'''
+    __slots__ = ('text', 'counts', 'matcher', 'lock', 'keywords', 'keyword_list', 'postings',
+                 'bigram_counts', 'needed_hits')
+
+    def __init__(self, fact: str):
+        self.text = fact.lower().strip()
+        self.counts = Counter(self.text)
+        # seq2's lookup table is built once here; set_seq1 per answer reuses it
+        self.matcher = SequenceMatcher(None, '', self.text)
+        self.lock = threading.Lock()
+        self.keywords = frozenset(extract_keywords(fact))
+        self.keyword_list = tuple(self.keywords)
+        self.postings = {}
+        self.bigram_counts = []
+        for index, word in enumerate(self.keyword_list):
+            grams = _bigrams(word)
+            self.bigram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(index)
+        # Fuzzy keyword hits needed to reach the recall threshold
+        self.needed_hits = math.ceil(len(self.keyword_list) * RECALL)
+
+    def matches(self, answer: CompiledAnswer) -> bool:
+        '''Returns True if the answer is close enough to this fact.'''
+        a, f = answer.text, self.text
+        if not a or not f:
+            return False
+        if a == f:
+            return True
+        if not self.keywords:
+            return self._full_ratio_at_least(answer, FULL_RATIO_NO_KEYWORDS)
+
+        # Keyword recall
+        if len(answer.keywords & self.keywords) >= self.needed_hits:
+            return True
+        if self._fuzzy_keyword_hits(answer):
+            return True
+        return self._full_ratio_at_least(answer, FULL_RATIO)
+
+    def _full_ratio_at_least(self, answer: CompiledAnswer, threshold: float) -> bool:
+        # Full-string similarity, only computed when the cheap upper bound allows a pass
+        if _ratio_bound(answer.counts, len(answer.text), self.counts, len(self.text)) < threshold:
+            return False
+        with self.lock:
+            self.matcher.set_seq1(answer.text)
+            return self.matcher.ratio() >= threshold
+
+    def _fuzzy_keyword_hits(self, answer: CompiledAnswer) -> bool:
+        # Fuzzy keyword recall: q-gram filter, then bounded edit distance
+        exact = answer.keywords & self.keywords
+        remaining = [i for i, word in enumerate(self.keyword_list) if word not in exact]
+        hits = len(self.keyword_list) - len(remaining)
+        if not remaining:
+            return hits >= self.needed_hits
+        for aword in answer.keywords - self.keywords:
+            grams = _bigrams(aword)
+            shared = Counter()
+            for gram in grams:
+                for index in self.postings.get(gram, ()):
+                    shared[index] += 1
+            a_grams = len(grams)
+            for index in list(remaining):
+                fword = self.keyword_list[index]
+                limit = _max_distance(len(aword), len(fword))
+                # Each edit removes at most 2 distinct bigrams from either word
+                if shared[index] < max(a_grams, self.bigram_counts[index]) - 2 * limit:
+                    continue
+                if bounded_levenshtein(aword, fword, limit):
+                    remaining.remove(index)
+                    hits += 1
+                    if hits >= self.needed_hits:
+                        return True
+        return hits >= self.needed_hits
+
+
+class FactIndex:
+    '''
+    Compiled facts for one party, keyed by player sid.
+    Call update() whenever a player's fact changes and remove() when they leave.
+    '''
+
+    def __init__(self):
+        self._facts = {}
+
+    def __len__(self):
+        return len(self._facts)
+
+    def update(self, sid: str, fact: str):
+        if fact and fact.strip():
+            self._facts[sid] = CompiledFact(fact)
+        else:
+            self._facts.pop(sid, None)
+
+    def remove(self, sid: str):
+        self._facts.pop(sid, None)
+
+    def check(self, sid: str, answer: str) -> bool:
+        '''Returns True if the answer matches the fact of the player with this sid.'''
+        compiled = self._facts.get(sid)
+        if compiled is None or not answer:
+            return False
+        return compiled.matches(CompiledAnswer(answer))
+
+    def score_round(self, answers) -> list[bool]:
+        '''
+        Scores a whole round in one call.
+        answers (iterable): (target sid, answer) pairs.
+        Returns: list[bool]: One result per pair, in order. Identical answers are compiled once.
+        '''
+        compiled_answers = {}
+        results = []
+        for sid, answer in answers:
+            compiled = self._facts.get(sid)
+            if compiled is None or not answer:
+                results.append(False)
+                continue
+            prepared = compiled_answers.get(answer)
+            if prepared is None:
+                prepared = compiled_answers[answer] = CompiledAnswer(answer)
+            results.append(compiled.matches(prepared))
+        return results
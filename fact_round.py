@@ -0,0 +1,114 @@
+import random
+from collections import Counter
+from pathlib import Path
+
+'''
+Teammate fact quiz rounds.
+
+Every player is asked about a teammate's fun fact, multiple choice, with distractors from
+static/filler_facts.txt. The corpus is loaded once; each round then costs O(players):
+    - assign_targets() gives every player with a fact another player's fact via a random
+      cyclic permutation (Sattolo's algorithm), which is a derangement built in one pass,
+      and gives players without a fact a random fact owner.
+    - FactCorpus.sample_distractors() draws random corpus indices and rejects the correct
+      answer or repeats, instead of building a filtered copy of the corpus per player.
+'''
+
+FILLER_FACTS_FILE = Path(__file__).parent / 'static' / 'filler_facts.txt'
+NUM_DISTRACTORS = 3
+
+
+class FactCorpus:
+    '''
+    Filler facts used as multiple choice distractors.
+    facts (tuple[str]): The facts, in file order.
+    '''
+
+    def __init__(self, facts):
+        self.facts = tuple(facts)
+        self.lowered = tuple(fact.lower() for fact in self.facts)
+        # Lowercased fact -> how many times it appears (also serves as the lookup set)
+        self.lookup = Counter(self.lowered)
+
+    @classmethod
+    def load(cls, path: Path = FILLER_FACTS_FILE):
+        '''Reads the corpus, or returns an empty one if the file can't be read.'''
+        try:
+            with open(path, 'r') as f:
+                return cls(line.strip() for line in f if line.strip())
+        except Exception as e:
+            print(f"[facts] Could not load {Path(path).name}: {e}")
+            return cls(())
+
+    def sample_distractors(self, correct_fact: str, k: int = NUM_DISTRACTORS) -> list[str]:
+        '''
+        Picks up to k distinct filler facts that differ from the correct answer.
+        correct_fact (str): The real fact, excluded case-insensitively.
+        Returns: list[str]: The distractors.
+        '''
+        n = len(self.facts)
+        correct_lower = correct_fact.lower()
+        excluded = correct_lower in self.lookup
+        available = n - self.lookup[correct_lower] if excluded else n
+        k = min(k, available)
+        if k * 2 > available:
+            # Tiny corpus: rejection would spin, just filter
+            pool = [fact for fact, low in zip(self.facts, self.lowered) if low != correct_lower]
+            return random.sample(pool, k)
+
+        chosen = []
+        seen = set()
+        while len(chosen) < k:
+            i = random.randrange(n)
+            if i in seen or (excluded and self.lowered[i] == correct_lower):
+                continue
+            seen.add(i)
+            chosen.append(self.facts[i])
+        return chosen
+
+
+def assign_targets(all_sids, sids_with_facts) -> dict:
+    '''
+    Decides whose fact each player is quizzed on.
+    all_sids (list): Every player in the party.
+    sids_with_facts (list): Players who shared a fact (at least 2).
+    Returns: dict: sid -> sid of the player whose fact they are asked about. Nobody gets their own.
+    '''
+    # Sattolo's algorithm: a uniformly random single cycle, so no fixed points
+    targets = list(sids_with_facts)
+    for i in range(len(targets) - 1, 0, -1):
+        j = random.randrange(i)
+        targets[i], targets[j] = targets[j], targets[i]
+    assignments = dict(zip(sids_with_facts, targets))
+
+    # Players without a fact can be asked about anyone who has one
+    for sid in all_sids:
+        if sid not in assignments:
+            assignments[sid] = sids_with_facts[random.randrange(len(sids_with_facts))]
+    return assignments
+
+
+def build_question(about_name: str, correct_fact: str, corpus: FactCorpus) -> dict:
+    '''Builds one player's multiple choice question (the correct fact plus distractors, shuffled).'''
+    choices = corpus.sample_distractors(correct_fact)
+    choices.append(correct_fact)
+    random.shuffle(choices)
+    return {
+        'about_player': about_name,
+        'question': f"What fun fact did {about_name} share about themselves?",
+        'choices': choices,
+        'correct_answer': correct_fact,
+    }
+
+
+if __name__ == "__main__":
+    import time
+
+    corpus = FactCorpus.load()
+    sids = [f'sid{i}' for i in range(60)]
+    start = time.perf_counter()
+    assignments = assign_targets(sids, sids)
+    questions = [build_question(sid, f'fact of {assignments[sid]}', corpus) for sid in sids]
+    elapsed = (time.perf_counter() - start) * 1000
+    assert all(sid != target for sid, target in assignments.items())
+    print(f"{len(corpus.facts)} filler facts, 60-player round built in {elapsed:.2f} ms")
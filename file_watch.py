@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+
+'''
+Polls a few files or directories for mtime changes from a single background thread.
+
+Modules that cache data loaded from disk (the image catalog, the word bank) register a reload
+callback here instead of stat()-ing on every request, so the round path never touches the disk.
+'''
+
+POLL_INTERVAL_SECONDS = 2.0
+
+
+def snapshot_mtimes(paths) -> tuple:
+    '''Returns the mtime of each path (None for paths that don't exist).'''
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+class MtimeWatcher:
+    '''
+    Calls reload() whenever the mtime of any watched path changes.
+    paths (list): Files or directories to watch.
+    reload (callable): Invoked with no arguments from the watcher thread.
+    '''
+
+    def __init__(self, paths, reload, interval: float = POLL_INTERVAL_SECONDS):
+        self.paths = list(paths)
+        self.reload = reload
+        self.interval = interval
+        self._mtimes = snapshot_mtimes(self.paths)
+        self._thread = None
+
+    def check(self) -> bool:
+        '''Reloads if anything changed since the last check. Returns True if it reloaded.'''
+        mtimes = snapshot_mtimes(self.paths)
+        if mtimes == self._mtimes:
+            return False
+        self._mtimes = mtimes
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"[watch] Reload failed: {e}")
+        return True
+
+    def start(self):
+        '''Starts polling in a daemon thread (idempotent).'''
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name='mtime-watcher', daemon=True)
+            self._thread.start()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
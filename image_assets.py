@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import workers
+
+'''
+Resized WebP/AVIF variants of the visual task images.
+
+The originals in static/images are multi-megapixel PNGs, but they are shown as ~90px tiles. This
+module produces small variants for 1x/2x/3x display densities with content-hashed names (so they
+can be cached forever) plus a manifest mapping each original to its variants:
+
+    python image_assets.py          # offline build of the WebP variants, run as part of deployment
+    python image_assets.py --avif   # also build AVIF (much slower to encode)
+
+If no up-to-date manifest exists when the server starts, ensure_assets() builds one in a background
+thread, and refresh() does the same whenever the image catalog reloads. Until a build finishes (or
+when Pillow, an optional dependency, isn't installed) tasks simply reference the originals.
+
+Tasks carry a srcset per image (see variants_for), so each browser picks the variant matching its
+own devicePixelRatio, and AVIF is only used by browsers that support it.
+'''
+
+SOURCE_DIR = Path(__file__).parent / 'static' / 'images'
+BUILD_DIR = Path(__file__).parent / 'static' / 'build' / 'images'
+BUILD_URL = '/static/build/images'
+MANIFEST_FILE = 'manifest.json'
+
+# Tile width in CSS pixels (see .content-grid in game.html) and the densities we build for
+TILE_WIDTH = 96
+DENSITIES = (1, 2, 3)
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+
+
+def _source_files(source_dir: Path) -> list[str]:
+    '''Image paths relative to source_dir, including the colored/ subfolder.'''
+    files = []
+    for root, _, names in os.walk(source_dir):
+        for name in names:
+            if name.endswith(SOURCE_EXTENSIONS):
+                files.append(Path(root, name).relative_to(source_dir).as_posix())
+    return sorted(files)
+
+
+def _content_hash(path: Path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:10]
+
+
+def available_formats(avif: bool = False) -> list[str]:
+    '''
+    Output formats to build that the installed Pillow can write (empty if Pillow is missing).
+    avif (bool): Include AVIF when supported. It is opt-in because encoding is slow.
+    '''
+    try:
+        from PIL import features
+    except ImportError:
+        return []
+    formats = []
+    if features.check_module('webp'):
+        formats.append('webp')
+    try:
+        if avif and features.check_module('avif'):
+            formats.append('avif')
+    except ValueError:
+        # Pillow versions before 11.2 don't know about AVIF at all
+        pass
+    return formats
+
+
+def build_assets(source_dir: Path = SOURCE_DIR, build_dir: Path = BUILD_DIR, formats=None) -> dict:
+    '''
+    Builds every missing variant and writes the manifest.
+    Existing content-hashed files are reused, so rebuilding after adding one image is cheap.
+    Returns: dict: The manifest, {original: {'hash': ..., 'webp': {'1x': file, ...}, ...}}.
+    '''
+    from PIL import Image
+
+    # The sources are our own assets, some of which exceed Pillow's decompression bomb limit
+    Image.MAX_IMAGE_PIXELS = None
+    formats = available_formats() if formats is None else formats
+    build_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for relative in _source_files(source_dir):
+        source = source_dir / relative
+        digest = _content_hash(source)
+        stem = relative.rsplit('.', 1)[0].replace('/', '_')
+        entry = {'hash': digest}
+        image = None
+        for fmt in formats:
+            entry[fmt] = {}
+            for density in DENSITIES:
+                width = TILE_WIDTH * density
+                name = f'{stem}.{digest}.{width}w.{fmt}'
+                if not (build_dir / name).exists():
+                    if image is None:
+                        image = Image.open(source).convert('RGBA')
+                    variant = image.copy()
+                    variant.thumbnail((width, width), Image.LANCZOS)
+                    quality = WEBP_QUALITY if fmt == 'webp' else AVIF_QUALITY
+                    variant.save(build_dir / name, fmt.upper(), quality=quality)
+                entry[fmt][f'{density}x'] = name
+        manifest[relative] = entry
+
+    tmp_path = build_dir / (MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, build_dir / MANIFEST_FILE)
+    return manifest
+
+
+def load_manifest(build_dir: Path = BUILD_DIR) -> dict:
+    '''Reads the manifest, or returns {} if it doesn't exist yet.'''
+    try:
+        with open(build_dir / MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def manifest_is_current(manifest: dict, source_dir: Path = SOURCE_DIR) -> bool:
+    '''True if the manifest covers every source image with its current content.'''
+    sources = _source_files(source_dir)
+    if set(sources) != set(manifest):
+        return False
+    return all(manifest[relative]['hash'] == _content_hash(source_dir / relative) for relative in sources)
+
+
+class AssetManifest:
+    '''
+    Holds the manifest used to build image srcsets; replaced atomically after a rebuild.
+    '''
+
+    def __init__(self, build_dir: Path = BUILD_DIR, source_dir: Path = SOURCE_DIR, avif: bool = False):
+        self.build_dir = build_dir
+        self.source_dir = source_dir
+        self.avif = avif
+        self.manifest = load_manifest(build_dir)
+        self._lock = threading.Lock()
+        self._building = False
+        self._stale = False
+
+    def ensure_assets(self):
+        '''Startup fallback: rebuilds the variants in a background thread if the manifest is stale.'''
+        if not available_formats(self.avif):
+            print("[images] Pillow with WebP support not installed; serving original images")
+            return
+        self.refresh()
+
+    def refresh(self):
+        '''
+        Catalog change listener: builds the variants of new or changed images in a background
+        thread. Changes that arrive during a build are picked up by one more pass after it.
+        '''
+        if not available_formats(self.avif):
+            return
+        with self._lock:
+            self._stale = True
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._rebuild_while_stale, name='image-assets', daemon=True).start()
+
+    def _rebuild_while_stale(self):
+        while True:
+            with self._lock:
+                if not self._stale:
+                    self._building = False
+                    return
+                self._stale = False
+            self._rebuild_if_stale()
+
+    def _rebuild_if_stale(self):
+        try:
+            if self.manifest and manifest_is_current(self.manifest, self.source_dir):
+                return
+            # Encoding is CPU bound; on green threads it must not run on the event loop
+            self.manifest = workers.run_blocking(
+                build_assets, self.source_dir, self.build_dir, available_formats(self.avif)
+            )
+            print(f"[images] Built variants for {len(self.manifest)} images")
+        except Exception as e:
+            print(f"[images] Variant build failed: {e}")
+
+    def variants_for(self, filename: str):
+        '''
+        Responsive sources for one image, e.g. 'apple.png' or 'colored/red.png'.
+        Returns: dict | None: {'webp': srcset, 'avif': srcset}, or None if there are no variants.
+        '''
+        entry = self.manifest.get(filename)
+        if not entry:
+            return None
+        sources = {}
+        for fmt in ('avif', 'webp'):
+            if fmt in entry:
+                sources[fmt] = ', '.join(
+                    f'{BUILD_URL}/{name} {density}' for density, name in sorted(entry[fmt].items())
+                )
+        return sources or None
+
+
+if __name__ == "__main__":
+    import sys
+    formats = available_formats(avif='--avif' in sys.argv)
+    if not formats:
+        raise SystemExit("Pillow with WebP support is required: pip3 install Pillow")
+    built = build_assets(formats=formats)
+    print(f"Built {', '.join(formats)} variants for {len(built)} images into {BUILD_DIR}")
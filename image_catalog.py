@@ -0,0 +1,203 @@
+import math
+import os
+import random
+from pathlib import Path
+from types import MappingProxyType
+
+from file_watch import MtimeWatcher
+
+'''
+Immutable index of the clipart and colored images used by the visual tasks.
+
+The catalog is built once at startup and swapped for a new one (a single reference assignment, so
+readers never see a half-built index) when the image directories' mtimes change. Task generation
+only reads from it and does no filesystem I/O.
+
+Indexes:
+    - stems / filename_by_stem: clipart items and their file names
+    - by_letter: uppercase first letter -> stems starting with it
+    - alias_by_letter: uppercase letter -> stems that only match it through IMAGE_ALIASES
+    - color_groups: color name -> files in static/images/colored
+    - assets / asset_ids: every image path (clipart, then 'colored/<file>') and its integer ID; round
+      payloads send these IDs, and clients resolve them with the catalog from /api/catalog
+
+The visual tasks are drawn constructively from these tables (sample_letter_items and
+sample_color_items): a letter or color is picked among those that can produce a valid task, then
+matching and non-matching items are drawn directly. Both take O(items) and succeed on the first
+pass, instead of guessing letters and rescanning samples until one happens to fit.
+'''
+
+IMAGE_DIR = Path(__file__).parent / 'static' / 'images'
+COLOR_DIR = IMAGE_DIR / 'colored'
+CLIPART_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.svg')
+COLOR_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+class ImageCatalog:
+    __slots__ = ('files', 'stems', 'filename_by_stem', 'by_letter', 'alias_by_letter', 'color_groups',
+                 'assets', 'asset_ids', '_letter_pools', '_letter_tables')
+
+    def __init__(self, files, aliases, color_files):
+        files = tuple(sorted(files))
+        filename_by_stem = {}
+        for filename in files:
+            filename_by_stem.setdefault(Path(filename).stem, filename)
+        stems = tuple(filename_by_stem)
+
+        by_letter = {}
+        alias_by_letter = {}
+        for stem in stems:
+            first = stem[:1].upper()
+            by_letter.setdefault(first, []).append(stem)
+            for alias in aliases.get(stem.lower(), ()):
+                letter = alias.upper()
+                if letter != first:
+                    alias_by_letter.setdefault(letter, []).append(stem)
+
+        color_groups = {}
+        for filename in sorted(color_files):
+            # "red.png" -> "red", "red1.png" -> "red"
+            color = ''.join(c for c in Path(filename).stem if not c.isdigit())
+            if color:
+                color_groups.setdefault(color, []).append(filename)
+
+        self.files = files
+        self.stems = stems
+        self.filename_by_stem = MappingProxyType(filename_by_stem)
+        self.by_letter = MappingProxyType({k: frozenset(v) for k, v in by_letter.items()})
+        self.alias_by_letter = MappingProxyType({k: frozenset(v) for k, v in alias_by_letter.items()})
+        self.color_groups = MappingProxyType({k: tuple(v) for k, v in color_groups.items()})
+        self.assets = tuple(filename_by_stem.values()) + tuple(
+            f'colored/{f}' for files_of_color in color_groups.values() for f in files_of_color
+        )
+        self.asset_ids = MappingProxyType({path: i for i, path in enumerate(self.assets)})
+        # letter -> (stems starting with it, all other stems), as tuples to sample from
+        self._letter_pools = {
+            letter: (tuple(matching), tuple(s for s in stems if s[:1].upper() != letter))
+            for letter, matching in by_letter.items()
+        }
+        self._letter_tables = {}    # item count -> _letter_table(count), filled on first use
+
+    def _letter_table(self, count: int):
+        # Under uniform sampling of `count` stems, a letter with c matches out of n stems yields k
+        # matches with hypergeometric weight C(c, k) * C(n - c, count - k). Keep only the letters
+        # and k values giving a valid task (1 <= k <= count - 1), weighted exactly that way.
+        table = self._letter_tables.get(count)
+        if table is not None:
+            return table
+        letters, letter_weights = [], []
+        total = len(self.stems)
+        for letter, (matching, others) in sorted(self._letter_pools.items()):
+            c = len(matching)
+            ks = range(max(1, count - len(others)), min(c, count - 1) + 1)
+            weights = [math.comb(c, k) * math.comb(total - c, count - k) for k in ks]
+            if ks and sum(weights):
+                letters.append((letter, tuple(ks), tuple(weights)))
+                letter_weights.append(sum(weights))
+        table = self._letter_tables[count] = (tuple(letters), tuple(letter_weights))
+        return table
+
+    def sample_letter_items(self, num_items: int, rng=random):
+        '''
+        Draws clipart for a "starts with letter X" task: at least one item matches, and not all do.
+        num_items (int): Items wanted (capped at the number of clipart images).
+        Returns: tuple: (letter, selected stems in random order, matching stems, alias-only stems),
+            or None if there are no images.
+        '''
+        count = min(num_items, len(self.stems))
+        if not count:
+            return None
+        letters, letter_weights = self._letter_table(count)
+        if letters:
+            letter, ks, weights = rng.choices(letters, weights=letter_weights)[0]
+            k = rng.choices(ks, weights=weights)[0]
+            matching, others = self._letter_pools[letter]
+            correct = rng.sample(matching, k)
+            selected = correct + rng.sample(others, count - k)
+            rng.shuffle(selected)
+        else:
+            # Every image starts with the same letter (or there is only one): no valid split exists
+            selected = rng.sample(self.stems, count)
+            letter = selected[0][:1].upper()
+            correct = [stem for stem in selected if stem[:1].upper() == letter]
+        aliased = self.alias_by_letter.get(letter, frozenset())
+        return letter, selected, correct, [stem for stem in selected if stem in aliased]
+
+    def sample_color_items(self, num_items: int, rng=random):
+        '''
+        Draws colored images for a "count the X images" task.
+        Between a third of num_items and num_items - 1 images are of the target color (fewer if the
+        color doesn't have that many); the rest are drawn from the other colors, a random color
+        per slot.
+        Returns: tuple: (color, target color files, other files), or None if there are no images.
+        '''
+        if not self.color_groups:
+            return None
+        wanted = max(1, num_items // 3)
+        colors = sorted(self.color_groups)
+        # Prefer colors with enough images for the usual minimum; otherwise take what there is
+        eligible = [c for c in colors if len(self.color_groups[c]) >= wanted] or colors
+        color = rng.choice(eligible)
+        files = self.color_groups[color]
+        most = max(1, min(len(files), num_items - 1))
+        targets = rng.sample(files, rng.randint(min(wanted, most), most))
+        other_colors = [c for c in colors if c != color]
+        others = []
+        if other_colors:
+            for _ in range(num_items - len(targets)):
+                others.append(rng.choice(self.color_groups[rng.choice(other_colors)]))
+        return color, targets, others
+
+
+def _list_images(directory: Path, extensions) -> list[str]:
+    if not directory.is_dir():
+        return []
+    return [f for f in os.listdir(directory) if f.endswith(extensions)]
+
+
+def build_catalog(aliases, image_dir: Path = IMAGE_DIR, color_dir: Path = COLOR_DIR) -> ImageCatalog:
+    '''
+    Scans the image directories and builds a new catalog.
+    aliases (dict): Stem -> accepted starting letters (app.IMAGE_ALIASES).
+    Returns: ImageCatalog: The new immutable catalog.
+    '''
+    return ImageCatalog(
+        _list_images(image_dir, CLIPART_EXTENSIONS),
+        aliases,
+        _list_images(color_dir, COLOR_EXTENSIONS),
+    )
+
+
+class CatalogHolder:
+    '''
+    Holds the current catalog and rebuilds it when the image directories change.
+    Read .catalog for the current snapshot; keep a local reference for the duration of a task.
+    '''
+
+    def __init__(self, aliases, image_dir: Path = IMAGE_DIR, color_dir: Path = COLOR_DIR):
+        self.aliases = aliases
+        self.image_dir = image_dir
+        self.color_dir = color_dir
+        self.catalog = build_catalog(aliases, image_dir, color_dir)
+        self.listeners = []     # called with no arguments after each reload
+        self.watcher = MtimeWatcher([image_dir, color_dir], self.reload)
+
+    def reload(self):
+        self.catalog = build_catalog(self.aliases, self.image_dir, self.color_dir)
+        print(f"[images] Catalog reloaded ({len(self.catalog.stems)} clipart images)")
+        for listener in self.listeners:
+            listener()
+
+    def start_watching(self):
+        self.watcher.start()
+
+
+if __name__ == "__main__":
+    catalog = build_catalog({})
+    print(f"{len(catalog.stems)} clipart images, letters: {''.join(sorted(catalog.by_letter))}")
+    print(f"Colors: {dict((c, len(f)) for c, f in catalog.color_groups.items())}")
+    for num_items in (8, 16):
+        letter, selected, correct, _ = catalog.sample_letter_items(num_items)
+        color, targets, others = catalog.sample_color_items(num_items)
+        print(f"{num_items} items: letter {letter} matches {len(correct)}/{len(selected)}, "
+              f"color {color} matches {len(targets)}/{len(targets) + len(others)}")
@@ -0,0 +1,195 @@
+import threading
+import time
+
+'''
+Coalesced fan-out of live answer inputs (typed text and image selections) within a party.
+
+handle_sync_input used to relay every keystroke to the whole room, so traffic grew with
+keystrokes x players and slow clients fell further and further behind. Instead, each party
+keeps a buffer holding only the latest value per (player, field). A single background task
+flushes all parties every FLUSH_INTERVAL_SECONDS:
+    - every update bumps the party's version; each buffered value remembers the version
+      that last changed it
+    - a client is sent, in one sync_input_batch, the values from other players that
+      changed since the last version it acknowledged (sync_input_ack)
+    - a client with a batch still unacknowledged is skipped until it acks (or the batch
+      times out), so a slow client gets fewer, bigger-but-current batches instead of a backlog
+
+However fast people type, each client receives at most one batch per tick, and each batch
+carries at most one value per (player, field).
+'''
+
+FLUSH_INTERVAL_SECONDS = 0.05
+ACK_TIMEOUT_SECONDS = 1.0
+FIELDS = ('visual', 'audio', 'selection')
+MAX_TEXT_LENGTH = 200
+MAX_SELECTION = 100
+
+
+class _Room:
+    __slots__ = ('round', 'version', 'values', 'acked', 'in_flight', 'dirty')
+
+    def __init__(self):
+        self.round = None
+        self.version = 0
+        self.values = {}      # (sid, field) -> (version, value)
+        self.acked = {}       # sid -> last version the client acknowledged
+        self.in_flight = {}   # sid -> (version sent, monotonic time sent)
+        self.dirty = False
+
+
+def clean_value(field: str, value):
+    '''Validates a client value for a field. Returns: the value to buffer, or None if invalid.'''
+    if field == 'selection':
+        if not isinstance(value, list):
+            return None
+        # Selections are catalog IDs of the round's images (round_payloads.visual_payload)
+        return [item for item in value[:MAX_SELECTION] if isinstance(item, int) and not isinstance(item, bool)]
+    if value is None:
+        return ''
+    return str(value)[:MAX_TEXT_LENGTH]
+
+
+class InputCoalescer:
+    '''
+    Latest-value input buffers for every party, flushed on a fixed tick.
+    emit (callable): emit(sid, payload) sends one sync_input_batch to one client.
+    members (callable): members(code) returns the sids currently in the party.
+    '''
+
+    def __init__(self, emit, members, interval: float = FLUSH_INTERVAL_SECONDS,
+                 ack_timeout: float = ACK_TIMEOUT_SECONDS):
+        self._emit = emit
+        self._members = members
+        self.interval = interval
+        self.ack_timeout = ack_timeout
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def update(self, code: str, sid: str, field: str, value) -> bool:
+        '''Buffers a player's latest value for a field. Returns False if it was rejected.'''
+        if field not in FIELDS:
+            return False
+        value = clean_value(field, value)
+        if value is None:
+            return False
+        with self._lock:
+            room = self._rooms.setdefault(code, _Room())
+            current = room.values.get((sid, field))
+            if current is not None and current[1] == value:
+                return True
+            room.version += 1
+            room.values[(sid, field)] = (room.version, value)
+            room.dirty = True
+        return True
+
+    def ack(self, code: str, sid: str, version: int):
+        '''Records that a client has applied every change up to version.'''
+        with self._lock:
+            room = self._rooms.get(code)
+            if room is None or not isinstance(version, int):
+                return
+            if version > room.acked.get(sid, 0):
+                room.acked[sid] = min(version, room.version)
+            sent = room.in_flight.get(sid)
+            if sent is not None and version >= sent[0]:
+                del room.in_flight[sid]
+
+    def reset(self, code: str, current_round):
+        '''Starts a new round: buffered values belong to the previous round's task.'''
+        with self._lock:
+            room = self._rooms.setdefault(code, _Room())
+            room.round = current_round
+            room.values.clear()
+            # Versions keep increasing, so nothing from before the reset is ever resent
+            room.acked = dict.fromkeys(room.acked, room.version)
+            room.in_flight.clear()
+            room.dirty = False
+
+    def remove_player(self, code: str, sid: str):
+        with self._lock:
+            room = self._rooms.get(code)
+            if room is None:
+                return
+            room.acked.pop(sid, None)
+            room.in_flight.pop(sid, None)
+            for key in [key for key in room.values if key[0] == sid]:
+                del room.values[key]
+
+    def drop(self, code: str):
+        with self._lock:
+            self._rooms.pop(code, None)
+
+    def _batches(self, now: float) -> list:
+        '''Builds (sid, payload) pairs for every client that is behind and not waiting on an ack.'''
+        batches = []
+        with self._lock:
+            rooms = list(self._rooms.items())
+        for code, room in rooms:
+            if not room.dirty and not room.in_flight:
+                continue
+            members = list(self._members(code))
+            with self._lock:
+                room.dirty = False
+                for sid in members:
+                    sent = room.in_flight.get(sid)
+                    if sent is not None:
+                        if now - sent[1] < self.ack_timeout:
+                            room.dirty = True  # flush again once the client catches up
+                            continue
+                        del room.in_flight[sid]
+                    since = room.acked.get(sid, 0)
+                    if since >= room.version:
+                        continue
+                    changes = sorted(
+                        (version, owner, field, value)
+                        for (owner, field), (version, value) in room.values.items()
+                        if version > since and owner != sid
+                    )
+                    if not changes:
+                        # Only their own edits are new; nothing to send, treat as caught up
+                        room.acked[sid] = room.version
+                        continue
+                    room.in_flight[sid] = (room.version, now)
+                    batches.append((sid, {
+                        'round': room.round,
+                        'version': room.version,
+                        'changes': [
+                            {'type': field, 'value': value} for _, _, field, value in changes
+                        ],
+                    }))
+        return batches
+
+    def flush(self) -> int:
+        '''Sends one batch to every client that has unseen changes. Returns: int: Batches sent.'''
+        batches = self._batches(time.monotonic())
+        for sid, payload in batches:
+            try:
+                self._emit(sid, payload)
+            except Exception as e:
+                print(f"[sync] Could not send input batch: {e}")
+        return len(batches)
+
+    def run(self, sleep=time.sleep):
+        '''Flush loop for a background task. sleep (callable): e.g. socketio.sleep.'''
+        while True:
+            sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[sync] Flush failed: {e}")
+
+
+if __name__ == "__main__":
+    sent = []
+    coalescer = InputCoalescer(lambda sid, payload: sent.append((sid, payload)), lambda code: ['a', 'b', 'c'])
+    coalescer.reset('ROOM', 1)
+    for i in range(1, 201):
+        coalescer.update('ROOM', 'a', 'visual', 'x' * i)   # 200 keystrokes in one tick
+    coalescer.update('ROOM', 'b', 'selection', [3, 17])
+    print(f"tick 1: {coalescer.flush()} batches")
+    print(f"tick 2 (no acks yet): {coalescer.flush()} batches")
+    for sid, payload in sent:
+        coalescer.ack('ROOM', sid, payload['version'])
+    coalescer.update('ROOM', 'a', 'visual', 'done')
+    print(f"tick 3: {coalescer.flush()} batches, {sum(len(p['changes']) for _, p in sent)} changes total")
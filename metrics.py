@@ -0,0 +1,342 @@
+import abc
+import bisect
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+'''
+Counters, histograms and gauges exposed in the Prometheus text format (GET /metrics in app.py).
+
+Recording never takes a lock: an observation is one append of (series, value) to a deque, which
+is atomic in CPython, so handlers on any thread (or green thread) never wait on each other. The
+pending observations are folded into the totals when /metrics is scraped, or by the recording
+thread once MAX_PENDING of them have piled up, so memory stays bounded between scrapes.
+
+    ROUNDS = metrics.counter('rounds_total', 'Rounds started', ['type'])
+    ROUNDS.labels('fact').inc()
+
+    @socketio.on('request_round')
+    @metrics.instrument('request_round')    # duration histogram and error count per event
+    def handle_request_round(data): ...
+
+count_emits(socketio) also records how many sockets each emit reached (its fan-out).
+'''
+
+# Seconds; handler and synthesis latencies range from well under a millisecond to gTTS timeouts
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FANOUT_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+MAX_PENDING = 10000
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    '''Holds metric families and the queue of observations not yet folded into them.'''
+
+    def __init__(self):
+        self._families = []
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def register(self, family):
+        with self._lock:
+            self._families.append(family)
+        return family
+
+    def record(self, series, value):
+        self._pending.append((series, value))
+        if len(self._pending) > MAX_PENDING:
+            self.drain()
+
+    def drain(self):
+        '''Folds pending observations into the series totals.'''
+        with self._lock:
+            pop = self._pending.popleft
+            while True:
+                try:
+                    series, value = pop()
+                except IndexError:
+                    return
+                series.apply(value)
+
+    def render(self) -> str:
+        '''Returns every metric in the Prometheus text exposition format.'''
+        self.drain()
+        lines = []
+        with self._lock:
+            for family in self._families:
+                lines.append(f'# HELP {family.name} {family.help}')
+                lines.append(f'# TYPE {family.name} {family.kind}')
+                lines.extend(family.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Family(abc.ABC):
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames=(), registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        self._series = {}
+        self._create_lock = threading.Lock()
+        registry.register(self)
+
+    def labels(self, *values):
+        '''The series for these label values (created on first use).'''
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._create_lock:
+                series = self._series.setdefault(values, self._new_series(values))
+        return series
+
+    @abc.abstractmethod
+    def _new_series(self, values):
+        '''Creates the series for one set of label values.'''
+
+    def samples(self):
+        for series in list(self._series.values()):
+            yield from series.samples()
+
+
+class _CounterSeries:
+    __slots__ = ('family', 'values', 'total')
+
+    def __init__(self, family, values):
+        self.family = family
+        self.values = values
+        self.total = 0
+
+    def inc(self, amount=1):
+        self.family.registry.record(self, amount)
+
+    def apply(self, amount):
+        self.total += amount
+
+    def samples(self):
+        labels = _format_labels(self.family.labelnames, self.values)
+        yield f'{self.family.name}{labels} {_format_number(self.total)}'
+
+
+class Counter(_Family):
+    '''A monotonically increasing count (name it *_total).'''
+    kind = 'counter'
+
+    def _new_series(self, values):
+        return _CounterSeries(self, values)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class _HistogramSeries:
+    __slots__ = ('family', 'values', 'counts', 'sum', 'count')
+
+    def __init__(self, family, values):
+        self.family = family
+        self.values = values
+        self.counts = [0] * (len(family.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.family.registry.record(self, value)
+
+    @contextmanager
+    def time(self):
+        '''Observes the duration of the with-block in seconds (also when it raises).'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def apply(self, value):
+        self.counts[bisect.bisect_left(self.family.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        names, name = self.family.labelnames, self.family.name
+        cumulative = 0
+        for bound, bucket in zip(self.family.buckets + (float('inf'),), self.counts):
+            cumulative += bucket
+            le = _format_number(float(bound))
+            yield f'{name}_bucket{_format_labels(names, self.values, ("le", le))} {cumulative}'
+        labels = _format_labels(names, self.values)
+        yield f'{name}_sum{labels} {_format_number(self.sum)}'
+        yield f'{name}_count{labels} {self.count}'
+
+
+class Histogram(_Family):
+    '''Distribution of observed values (usually seconds) over fixed upper bounds.'''
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_series(self, values):
+        return _HistogramSeries(self, values)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+class Gauge(_Family):
+    '''A value read when scraped. read (callable): Returns the current value.'''
+    kind = 'gauge'
+
+    def __init__(self, name, help, read, registry=REGISTRY):
+        self.read = read
+        super().__init__(name, help, (), registry)
+
+    def _new_series(self, values):
+        raise TypeError(f"{self.name} is read when scraped and has no label series")
+
+    def samples(self):
+        try:
+            value = self.read()
+        except Exception:
+            return
+        yield f'{self.name} {_format_number(value)}'
+
+
+def counter(name, help, labelnames=()) -> Counter:
+    return Counter(name, help, labelnames)
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return Histogram(name, help, labelnames, buckets)
+
+
+def gauge(name, help, read) -> Gauge:
+    return Gauge(name, help, read)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ── Socket.IO instrumentation ───────────────────────────────────
+
+HANDLER_SECONDS = histogram('socketio_handler_seconds', 'Time spent in Socket.IO event handlers', ['event'])
+HANDLER_ERRORS = counter('socketio_handler_errors_total', 'Socket.IO event handlers that raised', ['event'])
+EMIT_RECIPIENTS = histogram('socketio_emit_recipients', 'Sockets reached per emit on this worker', ['event'],
+                            buckets=FANOUT_BUCKETS)
+
+# Optional object with enter(event) -> token and exit(token), called around every instrumented
+# handler while set (the sampling profiler, see profiler.py)
+_tracer = None
+
+
+def set_tracer(tracer):
+    global _tracer
+    _tracer = tracer
+
+
+def instrument(event: str):
+    '''
+    Decorator for a Socket.IO handler: records its duration and counts the calls that raise.
+    Place it below @socketio.on so the registered handler is the instrumented one.
+    '''
+    seconds = HANDLER_SECONDS.labels(event)
+    errors = HANDLER_ERRORS.labels(event)
+
+    def decorate(handler):
+        @functools.wraps(handler)
+        def instrumented(*args):
+            tracer = _tracer
+            token = tracer.enter(event) if tracer is not None else None
+            start = time.perf_counter()
+            try:
+                return handler(*args)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - start)
+                if tracer is not None:
+                    tracer.exit(token)
+        return instrumented
+    return decorate
+
+
+def count_emits(socketio):
+    '''
+    Wraps socketio.emit (which flask_socketio.emit also goes through) to record each emit's fan-out:
+    the number of this worker's sockets in the target room, or all connected sockets for a broadcast.
+    '''
+    emit = socketio.emit
+
+    def counted(event, *args, **kwargs):
+        room = kwargs.get('to') or kwargs.get('room')
+        recipients = _room_size(socketio, kwargs.get('namespace') or '/', room)
+        if recipients is not None:
+            EMIT_RECIPIENTS.labels(event).observe(recipients)
+        return emit(event, *args, **kwargs)
+
+    socketio.emit = counted
+    return socketio
+
+
+def _room_size(socketio, namespace: str, room):
+    '''
+    Sockets of this worker in a room (room None: all connected sockets), read from python-socketio's
+    manager.rooms, {namespace: {room: {sid: eio sid}}}. That is not a public API, so this returns
+    None when it isn't there or has another shape, and the emit just goes unrecorded.
+    '''
+    manager = getattr(getattr(socketio, 'server', None), 'manager', None)
+    rooms = getattr(manager, 'rooms', None)
+    members = rooms.get(namespace, {}) if isinstance(rooms, dict) else None
+    if not isinstance(members, dict):
+        return None
+    return len(members.get(room) or ())
+
+
+if __name__ == "__main__":
+    requests = counter('demo_requests_total', 'Demo requests', ['path'])
+    latency = histogram('demo_latency_seconds', 'Demo latency')
+
+    def work(n):
+        for i in range(n):
+            requests.labels('/a' if i % 3 else '/b').inc()
+            latency.observe(i / n)
+
+    threads = [threading.Thread(target=work, args=(50000,)) for _ in range(4)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    text = render()
+    print('\n'.join(line for line in text.splitlines() if line.startswith('demo_')
+                    and ('_bucket' not in line or 'le="+Inf"' in line)))
+    print(f"{8 * 50000 / elapsed / 1e6:.2f}M observations/s on 4 threads")
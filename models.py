@@ -0,0 +1,268 @@
+import sys
+import time
+
+'''
+Party, player and round state.
+
+Parties used to be loose nested dicts (players, a parallel scores dict, round_data holding the
+full task payloads). These classes use __slots__, so an object costs a fixed, small amount of
+memory with no per-instance __dict__, and the fields a party can have are written down in one
+place. to_dict()/from_dict() turn them into JSON-ready dicts (sets become lists), which is how the
+shared party stores (party_store.py) hold them.
+
+IdleSweeper bounds what abandoned parties can hold on to:
+    - a party idle for ROUND_IDLE_SECONDS drops its round state (task payloads, assignments)
+    - a party idle for PARTY_IDLE_SECONDS is closed, even if its sockets never disconnected
+approx_size() estimates a party's footprint, so memory per thousand parties can be measured
+(see the demo at the bottom of this file).
+'''
+
+ROUND_IDLE_SECONDS = 15 * 60
+PARTY_IDLE_SECONDS = 2 * 60 * 60
+SWEEP_INTERVAL_SECONDS = 60
+
+
+class Player:
+    __slots__ = ('name', 'role', 'fact', 'score')
+
+    def __init__(self, name: str, role: str = 'helper', fact: str = '', score: int = 0):
+        self.name = name
+        self.role = role    # 'host' | 'helper'
+        self.fact = fact
+        self.score = score
+
+    def lobby_entry(self) -> dict:
+        return {'name': self.name, 'role': self.role, 'fact': self.fact}
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data['name'], data['role'], data['fact'], data['score'])
+
+
+class RoundState:
+    '''
+    What the server needs to grade one round.
+    Normal rounds: visual_task, audio_task, has_audio and permissioned (names allowed to answer).
+    Fact rounds: assignments (sid -> sid whose fact they are asked about) and choices
+    (sid -> lowercased multiple choice options).
+    Both: answers (sid -> graded answer), deadline (time.time() at which the round closes),
+    closed, and advance (once closed: whether the party moves on or replays the round), kept by
+    round_results.RoundCollector.
+    '''
+    __slots__ = ('number', 'round_type', 'visual_task', 'audio_task', 'has_audio', 'permissioned',
+                 'assignments', 'choices', 'answers', 'deadline', 'closed', 'advance')
+
+    def __init__(self, number: int, round_type: str = 'normal', visual_task=None, audio_task=None,
+                 has_audio: bool = False, permissioned=None, assignments=None, choices=None):
+        self.number = number
+        self.round_type = round_type
+        self.visual_task = visual_task
+        self.audio_task = audio_task
+        self.has_audio = has_audio
+        self.permissioned = permissioned
+        self.assignments = assignments
+        self.choices = choices
+        self.answers = {}
+        self.deadline = None
+        self.closed = False
+        self.advance = None
+
+    @classmethod
+    def fact(cls, number: int, assignments: dict, choices: dict):
+        return cls(number, 'fact', assignments=assignments, choices=choices)
+
+    def to_dict(self) -> dict:
+        data = {slot: getattr(self, slot) for slot in self.__slots__}
+        if self.permissioned is not None:
+            data['permissioned'] = sorted(self.permissioned)
+        if self.choices is not None:
+            data['choices'] = {sid: sorted(options) for sid, options in self.choices.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        state = cls(data['number'])
+        for slot in cls.__slots__:
+            setattr(state, slot, data[slot])
+        if state.permissioned is not None:
+            state.permissioned = set(state.permissioned)
+        if state.choices is not None:
+            state.choices = {sid: frozenset(options) for sid, options in state.choices.items()}
+        return state
+
+    @property
+    def is_fact(self) -> bool:
+        return self.round_type == 'fact'
+
+    @property
+    def next_number(self) -> int:
+        '''The round the party plays after this one has closed.'''
+        return self.number + 1 if self.advance else self.number
+
+
+class Party:
+    __slots__ = ('code', 'host_sid', 'players', 'state', 'round', 'round_data', 'fact_rounds_done',
+                 'created_at', 'last_active')
+
+    def __init__(self, code: str, host_sid: str, host: Player):
+        self.code = code
+        self.host_sid = host_sid
+        self.players = {host_sid: host}   # sid -> Player, in join order
+        self.state = 'lobby'              # 'lobby' | 'playing'
+        self.round = 0
+        self.round_data = None            # RoundState of the current round, if any
+        self.fact_rounds_done = 0
+        self.created_at = self.last_active = time.time()
+
+    def to_dict(self) -> dict:
+        '''The party as nested dicts; players and round_data stay objects with their own to_dict().'''
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        '''Inverse of to_dict(); players and round_data must already be Player/RoundState objects.'''
+        party = cls.__new__(cls)
+        for slot in cls.__slots__:
+            setattr(party, slot, data[slot])
+        return party
+
+    def touch(self):
+        '''Marks the party as active (it won't be swept as idle).'''
+        self.last_active = time.time()
+
+    def host(self) -> Player:
+        return self.players[self.host_sid]
+
+    def lobby_list(self) -> list[dict]:
+        return [p.lobby_entry() for p in self.players.values()]
+
+    def approx_bytes(self) -> int:
+        '''Estimated memory held by this party, round payloads included (see approx_size).'''
+        return approx_size(self)
+
+    def reset_progress(self):
+        '''Back to the lobby: no round, scores cleared.'''
+        self.state = 'lobby'
+        self.round = 0
+        self.round_data = None
+        self.fact_rounds_done = 0
+        for player in self.players.values():
+            player.score = 0
+
+
+def approx_size(obj, _seen=None) -> int:
+    '''
+    Approximate bytes held by an object graph (sys.getsizeof summed over containers and slots).
+    Interned strings and small ints shared with the rest of the process are counted too, so this
+    is an upper bound, but it is consistent between parties and cheap enough to sample.
+    '''
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += approx_size(key, seen) + approx_size(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += approx_size(item, seen)
+    elif hasattr(type(obj), '__slots__'):
+        for slot in type(obj).__slots__:
+            size += approx_size(getattr(obj, slot, None), seen)
+    return size
+
+
+class IdleSweeper:
+    '''
+    Periodically trims or closes idle parties.
+    parties: Mapping of code -> Party (a party_store.StateMap); iterated with list().
+    close (callable): close(code) fully removes a party (sockets, caches, code release).
+    owns (callable): Optional owns(code) -> bool; only this worker's parties are swept.
+    '''
+
+    def __init__(self, parties, close, owns=None, round_idle: float = ROUND_IDLE_SECONDS,
+                 party_idle: float = PARTY_IDLE_SECONDS, interval: float = SWEEP_INTERVAL_SECONDS):
+        self.parties = parties
+        self.close = close
+        self.owns = owns
+        self.round_idle = round_idle
+        self.party_idle = party_idle
+        self.interval = interval
+
+    def sweep(self, now: float = None) -> dict:
+        '''
+        One pass over every party.
+        Returns: dict: {'parties', 'rounds_dropped', 'parties_closed', 'approx_bytes'} for this pass.
+        '''
+        now = time.time() if now is None else now
+        stats = {'parties': 0, 'rounds_dropped': 0, 'parties_closed': 0, 'approx_bytes': 0}
+        for code in list(self.parties):
+            if self.owns is not None and not self.owns(code):
+                continue
+            party = self.parties.get(code)
+            if party is None:
+                continue
+            idle = now - party.last_active
+            if idle >= self.party_idle:
+                self.close(code)
+                stats['parties_closed'] += 1
+                continue
+            if party.round_data is not None and idle >= self.round_idle:
+                party.round_data = None
+                self.parties.save(code)
+                stats['rounds_dropped'] += 1
+            stats['parties'] += 1
+            stats['approx_bytes'] += party.approx_bytes()
+        return stats
+
+    def run(self, sleep=time.sleep):
+        '''Sweep loop for a background task. sleep (callable): e.g. socketio.sleep.'''
+        while True:
+            sleep(self.interval)
+            try:
+                stats = self.sweep()
+            except Exception as e:
+                print(f"[parties] Sweep failed: {e}")
+                continue
+            if stats['rounds_dropped'] or stats['parties_closed']:
+                print(f"[parties] Closed {stats['parties_closed']} idle parties, dropped "
+                      f"{stats['rounds_dropped']} stale rounds; {stats['parties']} parties "
+                      f"use ~{stats['approx_bytes'] / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    import tracemalloc
+
+    def sample_party(i):
+        party = Party(f'P{i:03d}', 'sid0', Player('Host', 'host', 'I once ate an entire cake alone'))
+        for j in range(1, 4):
+            party.players[f'sid{j}'] = Player(f'Helper {j}', fact='I have two cats at home')
+        items = [{'id': k, 'name': f'item{k}', 'filename': f'item{k}.png'} for k in range(12)]
+        visual = {'type': 'clipart_images', 'instruction': 'Click all items starting with B',
+                  'items': items, 'correct_answer': [f'item{k}.png' for k in range(4)],
+                  'display_type': 'clickable'}
+        audio = {'instruction': 'Count all EVEN numbers', 'audio_id': 'x' * 22, 'correct_answer': 4}
+        party.round_data = RoundState(5, visual_task=visual, audio_task=audio, has_audio=True,
+                                      permissioned={'Host'})
+        return party
+
+    tracemalloc.start()
+    parties = {f'P{i:03d}': sample_party(i) for i in range(1000)}
+    traced = tracemalloc.get_traced_memory()[0]
+    estimated = sum(approx_size(p) for p in parties.values())
+    print(f"1000 parties (4 players, one round each): {traced / 1024:.0f} KiB traced, "
+          f"~{estimated / 1024:.0f} KiB estimated")
+
+    class _Parties(dict):
+        def save(self, code):
+            pass
+
+    swept = _Parties(parties)
+    stats = IdleSweeper(swept, close=swept.pop).sweep(now=time.time() + ROUND_IDLE_SECONDS)
+    after = sum(approx_size(p) for p in swept.values())
+    print(f"After a sweep {ROUND_IDLE_SECONDS // 60} min later: {stats['rounds_dropped']} rounds dropped, "
+          f"~{after / 1024:.0f} KiB estimated")
@@ -0,0 +1,214 @@
+import re
+
+'''
+Server-side matching of voice transcripts to teammate names.
+
+Each party gets a NameIndex, rebuilt whenever its lobby changes. Every player's name is indexed
+under several keys, so resolving a transcript is a handful of dict lookups per spoken word
+instead of scoring every teammate:
+    - exact: the normalized name, without a possessive/plural suffix, and without spaces
+      (speech recognition often splits names: "and drew" -> "andrew")
+    - phonetic: the code from game.js' phoneticCode ("sara"/"sarah", "filip"/"phillip"), which
+      also drops an 'h' that doesn't start a syllable ("jon"/"john")
+    - soundex: a coarse bucket; candidates in it must also be within one edit of the name's
+      phonetic code ("andru" -> "andrew")
+
+Each kind of match has a confidence, on the scale game.js' nameSimilarity used, and a transcript
+only resolves if it reaches the same thresholds the client had: 0.95 for interim transcripts and
+0.92 for final ones. Interim transcripts change while the speaker is still talking, so they only
+resolve on an exact name; the phonetic keys are tried on final transcripts only, and only on
+single spoken words, never on words joined together or with a suffix stripped. Common words never
+match phonetically, only exactly, so "i need some help" doesn't summon "Sam".
+'''
+
+# Words the speech API puts around a name; they only match a player literally named that
+_COMMON_WORDS = frozenset(
+    'hey yo ok okay um uh like so the a an and i me you can could please help need '
+    'come here over get go now is it to for with my your '
+    'am are was were be been being have has had do does did done will would should '
+    'some any all one two no not yes but if of on in at by up out from about this that '
+    'there then than them they we us our he him his she her what who how why when where '
+    'want wants just still more many much very too also'.split()
+)
+
+# Confidence of each kind of match (game.js nameSimilarity's scale) and the thresholds
+EXACT_CONFIDENCE = 1.0
+STRIPPED_CONFIDENCE = 0.97
+JOINED_CONFIDENCE = 0.95
+PHONETIC_CONFIDENCE = 0.92
+INTERIM_THRESHOLD = 0.95
+FINAL_THRESHOLD = 0.92
+
+_PHONETIC_RULES = (
+    (r'^[^a-z]+|[^a-z]+$', ''),
+    (r'ph', 'f'), (r'ck', 'k'), (r'sh', 'S'), (r'ch', 'C'), (r'th', 'T'), (r'gh', ''),
+    (r'kn', 'n'), (r'wr', 'r'), (r'wh', 'w'), (r'gn', 'n'), (r'mb$', 'm'),
+    (r'ce', 'se'), (r'ci', 'si'), (r'cy', 'sy'), (r'ge', 'je'), (r'gi', 'ji'),
+    (r'x', 'ks'), (r'qu', 'kw'),
+    (r'[aeiou]', 'a'),
+    (r'h(?!a)', ''),
+    (r'aa+', 'a'),
+    (r'([^a])\1+', r'\1'),
+)
+_PHONETIC_RULES = tuple((re.compile(pattern), repl) for pattern, repl in _PHONETIC_RULES)
+
+_SOUNDEX_DIGITS = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def normalize(text: str) -> str:
+    '''Lowercase, letters/digits/apostrophes only, single spaces.'''
+    return ' '.join(re.sub(r"[^a-z0-9' ]+", ' ', text.lower()).split())
+
+
+def strip_suffix(word: str) -> str:
+    '''Drops the possessive/plural/verb endings speech-to-text tends to add ("sarah's" -> "sarah").'''
+    for suffix in ("'s", 's', 'ing', 'ed'):
+        if word.endswith(suffix) and len(word) > len(suffix) + 1:
+            return word[:-len(suffix)]
+    return word
+
+
+def phonetic_code(text: str) -> str:
+    '''Port of phoneticCode in static/game.js, plus silent-h removal.'''
+    code = text.lower().strip()
+    for pattern, repl in _PHONETIC_RULES:
+        code = pattern.sub(repl, code)
+    return code
+
+
+def soundex(word: str) -> str:
+    '''Classic four-character American Soundex ("" for words without letters).'''
+    letters = [c for c in word.lower() if 'a' <= c <= 'z']
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = _SOUNDEX_DIGITS.get(letters[0], '')
+    for c in letters[1:]:
+        digit = _SOUNDEX_DIGITS.get(c, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # 'h' and 'w' don't separate letters with the same code; vowels do
+        if c not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    # substitution, or insertion into the shorter string
+    return a[i + 1:] == b[i + 1:] if len(a) == len(b) else a[i:] == b[i + 1:]
+
+
+def candidate_phrases(transcript: str) -> list[tuple[str, float, bool]]:
+    '''
+    Spoken forms that could be a name, in transcript order: each word, its suffix-stripped form,
+    and adjacent words joined with and without a space (up to three words; a letter shared at the
+    seam is kept once).
+    Returns: list[tuple[str, float, bool]]: (phrase, confidence of an exact hit, whether it is a
+        single word as spoken).
+    '''
+    words = normalize(transcript).split()
+
+    def join(*parts):
+        # A letter said at the end of one word and the start of the next is one sound: "and drew"
+        joined = parts[0]
+        for part in parts[1:]:
+            joined += part[1:] if joined[-1:] == part[:1] else part
+        return joined
+
+    phrases = []
+    for i, word in enumerate(words):
+        phrases.append((word, EXACT_CONFIDENCE, True))
+        phrases.append((strip_suffix(word), STRIPPED_CONFIDENCE, False))
+        if i + 1 < len(words):
+            phrases.append((join(word, words[i + 1]), JOINED_CONFIDENCE, False))
+            phrases.append((f'{word} {words[i + 1]}', EXACT_CONFIDENCE, False))
+        if i + 2 < len(words):
+            phrases.append((join(word, words[i + 1], words[i + 2]), JOINED_CONFIDENCE, False))
+    seen = set()
+    return [p for p in phrases if p[0] and not (p[0] in seen or seen.add(p[0]))]
+
+
+class NameIndex:
+    '''
+    Lookup tables from spoken forms to the players' names (as shown in the lobby).
+    names (iterable): The party's player names.
+    '''
+
+    def __init__(self, names=()):
+        self.names = tuple(dict.fromkeys(names))
+        self._by_normalized = {}
+        self._exact = {}
+        self._phonetic = {}
+        self._soundex = {}
+        for name in self.names:
+            normalized = normalize(name)
+            if not normalized:
+                continue
+            self._by_normalized.setdefault(normalized, set()).add(name)
+            joined = normalized.replace(' ', '')
+            for key in (normalized, joined, strip_suffix(joined)):
+                self._exact.setdefault(key, set()).add(name)
+            code = phonetic_code(joined)
+            if code:
+                self._phonetic.setdefault(code, set()).add(name)
+                self._soundex.setdefault(soundex(joined), []).append((code, name))
+
+    def canonical(self, name: str):
+        '''The player's name as indexed, matched case-insensitively, or None.'''
+        found = self._by_normalized.get(normalize(name or ''), ())
+        return next(iter(found)) if len(found) == 1 else None
+
+    def resolve(self, transcript: str, exclude=(), final: bool = True):
+        '''
+        Finds the player a transcript calls for.
+        transcript (str): Raw speech recognition text, e.g. "hey sara can you help".
+        exclude (set): Names that can't be the answer (the speaker, players who already have help).
+        final (bool): Whether the speech API marked the transcript final; interim ones need
+            INTERIM_THRESHOLD, final ones FINAL_THRESHOLD.
+        Returns: str | None: The matched name, or None if nothing matches confidently and unambiguously.
+        '''
+        threshold = FINAL_THRESHOLD if final else INTERIM_THRESHOLD
+        phrases = candidate_phrases(transcript)
+        if not phrases:
+            return None
+
+        def unique(found):
+            found = [name for name in found if name not in exclude]
+            return found[0] if len(found) == 1 else None
+
+        for phrase, confidence, _ in phrases:
+            if confidence < threshold:
+                continue
+            match = unique(self._exact.get(phrase, ()))
+            if match:
+                return match
+
+        if PHONETIC_CONFIDENCE < threshold:
+            return None
+        words = [p for p, _, single in phrases if single and p not in _COMMON_WORDS and len(p) >= 3]
+        codes = [(word, phonetic_code(word)) for word in words]
+        for _, code in codes:
+            match = unique(self._phonetic.get(code, ()))
+            if match:
+                return match
+        for word, code in codes:
+            bucket = self._soundex.get(soundex(word), ())
+            match = unique({name for name_code, name in bucket if _within_one_edit(code, name_code)})
+            if match:
+                return match
+        return None
+
@@ -0,0 +1,131 @@
+import random
+import string
+import threading
+import time
+from collections import deque
+
+'''
+Party code allocation in O(1) per code, with cooled-down reuse.
+
+Retrying random codes until one is free gets slower as the code space fills up. Instead the
+allocator draws from a free pool that is shuffled lazily: a Fisher-Yates shuffle of every index
+in the code space, performed one step per allocation, with only the swapped positions stored
+(a dict that stays as small as the number of codes handed out).
+
+Released codes wait in a cooldown queue before they go back into the pool, so a player holding
+an old code can't land in a stranger's new party. An optional prefix reserves part of the code
+(e.g. one character per worker or deployment), so separate allocators never collide.
+'''
+
+ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 4
+COOLDOWN_SECONDS = 600
+# A pool draw that the accept() predicate keeps rejecting means the space is effectively full
+MAX_REJECTIONS = 10000
+
+
+class CodeAllocator:
+    '''
+    Hands out unique party codes.
+    prefix (str): Fixed leading characters; the rest of the code is drawn from the pool.
+    accept (callable): Optional accept(code) -> bool. Rejected codes (e.g. routed to another
+        worker, or still used by a party in a shared store) go back into the cooldown queue, so a
+        code that frees up elsewhere can be handed out later.
+    '''
+
+    def __init__(self, prefix: str = '', length: int = CODE_LENGTH, alphabet: str = ALPHABET,
+                 cooldown: float = COOLDOWN_SECONDS, accept=None, rng=None):
+        if len(prefix) >= length:
+            raise ValueError('The prefix must leave room for random characters')
+        self.prefix = prefix
+        self.alphabet = alphabet
+        self.suffix_length = length - len(prefix)
+        self.cooldown = cooldown
+        self.accept = accept
+        self._rng = rng or random.Random()
+        self._size = len(alphabet) ** self.suffix_length
+        self._remaining = self._size     # indices [0, remaining) are still in the pool
+        self._swapped = {}               # sparse Fisher-Yates state: position -> index
+        self._cooling = deque()          # (time it may be reused, index)
+        self._allocated = set()
+        self._lock = threading.Lock()
+
+    def _encode(self, index: int) -> str:
+        chars = []
+        base = len(self.alphabet)
+        for _ in range(self.suffix_length):
+            index, digit = divmod(index, base)
+            chars.append(self.alphabet[digit])
+        return self.prefix + ''.join(reversed(chars))
+
+    def _decode(self, code: str):
+        if len(code) != len(self.prefix) + self.suffix_length or not code.startswith(self.prefix):
+            return None
+        index = 0
+        base = len(self.alphabet)
+        for char in code[len(self.prefix):]:
+            digit = self.alphabet.find(char)
+            if digit < 0:
+                return None
+            index = index * base + digit
+        return index
+
+    def _draw(self) -> int:
+        # One step of Fisher-Yates: pick a random pool position, move the last one into its place
+        position = self._rng.randrange(self._remaining)
+        last = self._remaining - 1
+        index = self._swapped.pop(position, position)
+        if position != last:
+            self._swapped[position] = self._swapped.pop(last, last)
+        self._remaining = last
+        return index
+
+    def _return(self, index: int):
+        # Append to the end of the pool; the next draws pick it with uniform probability
+        if index != self._remaining:
+            self._swapped[self._remaining] = index
+        self._remaining += 1
+
+    def _reclaim(self, now: float, force: bool = False):
+        while self._cooling and (force or self._cooling[0][0] <= now):
+            self._return(self._cooling.popleft()[1])
+            force = False
+
+    def allocate(self) -> str:
+        '''Returns a code that is not in use. Raises RuntimeError when every code is taken.'''
+        with self._lock:
+            now = time.monotonic()
+            self._reclaim(now)
+            rejected = []
+            try:
+                for _ in range(MAX_REJECTIONS):
+                    if not self._remaining:
+                        if not self._cooling:
+                            break
+                        # Out of fresh codes: reuse the one that has cooled down the longest
+                        self._reclaim(now, force=True)
+                    index = self._draw()
+                    code = self._encode(index)
+                    if self.accept is None or self.accept(code):
+                        self._allocated.add(code)
+                        return code
+                    rejected.append(index)
+            finally:
+                # Queued after this call's draws, so one allocation doesn't retry them
+                self._cooling.extend((now + self.cooldown, index) for index in rejected)
+        raise RuntimeError('No party codes left')
+
+    def release(self, code: str):
+        '''Returns a code to the pool after the cooldown. Unknown or foreign codes are ignored.'''
+        with self._lock:
+            if code not in self._allocated:
+                return
+            self._allocated.discard(code)
+            index = self._decode(code)
+            if index is not None:
+                self._cooling.append((time.monotonic() + self.cooldown, index))
+
+    def available(self) -> int:
+        '''Codes left in the pool (not counting ones cooling down).'''
+        return self._remaining
+
@@ -0,0 +1,303 @@
+import abc
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+import models
+
+'''
+Where party and session state lives, so the game can run as several worker processes.
+
+A PartyStore keeps two namespaces, 'party' (code -> party dict) and 'session' (socket sid ->
+session dict), behind a small interface with three backends:
+    - MemoryPartyStore: plain dicts in this process (the default, one worker)
+    - SQLitePartyStore: one database file shared by the workers on a single host
+    - RedisPartyStore: any Redis-protocol server (redis-py client, or fakeredis for tests)
+
+Shared backends hold JSON: models objects are stored through their to_dict()/from_dict() under a
+"__type__" tag and sets as lists, so nothing read back from a shared Redis can run code (as
+unpickling could).
+
+app.py uses StateMap, a dict-like write-through cache in front of a store: handlers read and
+mutate the cached objects as before and call save(key) after changing one, which persists it.
+A cached entry this process hasn't saved for CACHE_TTL_SECONDS is loaded again on its next read,
+so changes other workers made to it show up.
+
+Scaling out is three pieces together:
+    1. a shared store (PARTY_STORE=sqlite:///path or redis://host), so every worker can see
+       every party (e.g. to tell a joining player where their party lives)
+    2. a Socket.IO message queue (SOCKETIO_MESSAGE_QUEUE=redis://host), so emits reach sockets
+       connected to other workers
+    3. sticky routing by party code: all of a party's sockets and audio requests go to one
+       worker (worker_for_party), so per-process caches such as audio clips stay local
+'''
+
+PREFIXES = {'party': 'party:', 'session': 'session:'}
+CACHE_TTL_SECONDS = 30
+
+# Classes stored as {"__type__": name, **obj.to_dict()}
+_TYPES = {cls.__name__: cls for cls in (models.Player, models.RoundState, models.Party)}
+
+
+def _encode(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    name = type(value).__name__
+    if _TYPES.get(name) is type(value):
+        return {'__type__': name, **value.to_dict()}
+    raise TypeError(f"Can't store a {name} in the party store")
+
+
+def _decode(data: dict):
+    name = data.pop('__type__', None)
+    return data if name is None else _TYPES[name].from_dict(data)
+
+
+def _dump(value) -> bytes:
+    return json.dumps(value, default=_encode, separators=(',', ':')).encode()
+
+
+def _load(data):
+    return None if data is None else json.loads(data, object_hook=_decode)
+
+
+class PartyStore(abc.ABC):
+    '''
+    Interface for party/session storage. kind is 'party' or 'session'.
+    load() returns a fresh copy for shared backends; changes are only visible after save().
+    '''
+
+    @abc.abstractmethod
+    def load(self, kind: str, key: str):
+        '''Returns the stored value, or None.'''
+
+    @abc.abstractmethod
+    def save(self, kind: str, key: str, value):
+        '''Stores value under key, replacing any previous value.'''
+
+    @abc.abstractmethod
+    def delete(self, kind: str, key: str):
+        '''Removes key if present.'''
+
+    def exists(self, kind: str, key: str) -> bool:
+        return self.load(kind, key) is not None
+
+    @abc.abstractmethod
+    def keys(self, kind: str) -> list:
+        '''Every key stored in the namespace.'''
+
+
+class MemoryPartyStore(PartyStore):
+    '''Today's behavior: the dicts themselves, shared by reference within one process.'''
+
+    def __init__(self):
+        self._data = {kind: {} for kind in PREFIXES}
+
+    def load(self, kind, key):
+        return self._data[kind].get(key)
+
+    def save(self, kind, key, value):
+        self._data[kind][key] = value
+
+    def delete(self, kind, key):
+        self._data[kind].pop(key, None)
+
+    def exists(self, kind, key):
+        return key in self._data[kind]
+
+    def keys(self, kind):
+        return list(self._data[kind])
+
+
+class SQLitePartyStore(PartyStore):
+    '''
+    JSON values in one SQLite file (WAL mode), shared by all workers on the host.
+    path (str): Database file; ':memory:' only works within one process.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS state '
+                       '(kind TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+                       'PRIMARY KEY (kind, key))')
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            if self.path != ':memory:':
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def load(self, kind, key):
+        row = self._connection().execute(
+            'SELECT value FROM state WHERE kind = ? AND key = ?', (kind, key)
+        ).fetchone()
+        return _load(row[0]) if row else None
+
+    def save(self, kind, key, value):
+        with self._connection() as db:
+            db.execute('INSERT OR REPLACE INTO state (kind, key, value) VALUES (?, ?, ?)',
+                       (kind, key, _dump(value)))
+
+    def delete(self, kind, key):
+        with self._connection() as db:
+            db.execute('DELETE FROM state WHERE kind = ? AND key = ?', (kind, key))
+
+    def exists(self, kind, key):
+        return self._connection().execute(
+            'SELECT 1 FROM state WHERE kind = ? AND key = ?', (kind, key)
+        ).fetchone() is not None
+
+    def keys(self, kind):
+        return [row[0] for row in self._connection().execute(
+            'SELECT key FROM state WHERE kind = ?', (kind,)
+        )]
+
+
+class RedisPartyStore(PartyStore):
+    '''
+    JSON values under "<namespace>party:<code>" / "<namespace>session:<sid>" keys.
+    client: A redis-py compatible client (redis.Redis, fakeredis.FakeRedis, ...).
+    '''
+
+    def __init__(self, client, namespace: str = 'cogoverload:'):
+        self.client = client
+        self.namespace = namespace
+
+    def _key(self, kind, key):
+        return f'{self.namespace}{PREFIXES[kind]}{key}'
+
+    def load(self, kind, key):
+        return _load(self.client.get(self._key(kind, key)))
+
+    def save(self, kind, key, value):
+        self.client.set(self._key(kind, key), _dump(value))
+
+    def delete(self, kind, key):
+        self.client.delete(self._key(kind, key))
+
+    def exists(self, kind, key):
+        return bool(self.client.exists(self._key(kind, key)))
+
+    def keys(self, kind):
+        prefix = self._key(kind, '')
+        return [
+            (k.decode() if isinstance(k, bytes) else k)[len(prefix):]
+            for k in self.client.scan_iter(match=prefix + '*')
+        ]
+
+
+def open_store(url: str = 'memory') -> PartyStore:
+    '''
+    Creates a store from a URL: 'memory', 'sqlite:///path/to/parties.db' or 'redis://host:6379/0'.
+    The Redis backend needs redis-py (pip3 install redis).
+    '''
+    if not url or url == 'memory':
+        return MemoryPartyStore()
+    if url.startswith('sqlite://'):
+        # sqlite:///relative.db, sqlite:////absolute/path.db, or sqlite:// for an in-memory database
+        path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else ''
+        return SQLitePartyStore(path or ':memory:')
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisPartyStore(redis.Redis.from_url(url))
+    raise ValueError(f"Unsupported PARTY_STORE {url!r}")
+
+
+class StateMap:
+    '''
+    Dict-like write-through cache of one namespace of a store.
+    Values are cached in this process after the first read; call save(key) after mutating one.
+    len() and iteration cover the entries this process holds, without asking the store.
+    ttl (float): Seconds after its last load or save in this process that an entry is read from
+        the store again. Not used for MemoryPartyStore, whose values are the cached objects.
+    '''
+
+    def __init__(self, store: PartyStore, kind: str, ttl: float = CACHE_TTL_SECONDS):
+        self.store = store
+        self.kind = kind
+        self.ttl = None if isinstance(store, MemoryPartyStore) else ttl
+        self._cache = {}
+        self._loaded = {}  # key -> time.monotonic() of the last load or save
+
+    def get(self, key, default=None):
+        value = self._cache.get(key)
+        if value is not None and (self.ttl is None or time.monotonic() - self._loaded[key] < self.ttl):
+            return value
+        value = self.store.load(self.kind, key)
+        if value is None:
+            self.forget(key)
+            return default
+        self._cache[key] = value
+        self._loaded[key] = time.monotonic()
+        return value
+
+    def cached(self, key, default=None):
+        '''The local copy, without going to the store (for hot paths that only need this process's view).'''
+        return self._cache.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._cache[key] = value
+        self._loaded[key] = time.monotonic()
+        self.store.save(self.kind, key, value)
+
+    def save(self, key):
+        '''Persists the cached value after in-place changes.'''
+        value = self._cache.get(key)
+        if value is not None:
+            self._loaded[key] = time.monotonic()
+            self.store.save(self.kind, key, value)
+
+    def __delitem__(self, key):
+        self.forget(key)
+        self.store.delete(self.kind, key)
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        self.forget(key)
+        self.store.delete(self.kind, key)
+        return value
+
+    def __contains__(self, key):
+        return key in self._cache or self.store.exists(self.kind, key)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __iter__(self):
+        return iter(list(self._cache))
+
+    def all_keys(self) -> list:
+        '''Every key in the store, including entries only other workers hold (scans the store).'''
+        return self.store.keys(self.kind)
+
+    def forget(self, key):
+        '''Drops the local copy only (the next read reloads it from the store).'''
+        self._cache.pop(key, None)
+        self._loaded.pop(key, None)
+
+
+def worker_for_party(code: str, workers: int) -> int:
+    '''
+    Index of the worker that owns a party code.
+    Mirrors nginx's (non-consistent) `hash $arg_party;` for equal-weight upstream servers listed
+    in worker order, so the load balancer and the workers agree on where each party lives.
+    '''
+    if workers <= 1:
+        return 0
+    digest = (zlib.crc32(code.encode()) >> 16) & 0x7fff
+    return digest % workers
+
@@ -0,0 +1,189 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import metrics
+
+'''
+On-demand sampling profiler for Socket.IO handlers, written as collapsed stacks.
+
+An admin starts a session for N seconds, optionally limited to one event name (e.g.
+request_round) and/or one party code. While it runs, metrics.instrument tags each OS thread that
+is inside a matching handler. A sampler thread reads the tagged threads' stacks every INTERVAL
+seconds via sys._current_frames. When the session ends, identical stacks are counted and written
+one per line ("event;outer frame;...;inner frame count"). flamegraph.pl, speedscope and inferno
+read this format directly.
+
+Switched off, the profiler costs one global lookup per handler call: metrics.instrument only calls
+into it while a session is running.
+
+On green threads (ASYNC_MODE=eventlet/gevent) every handler shares one OS thread, so a sample is
+taken while a matching handler is in progress, even if it is waiting on I/O and another green
+thread is running. Stacks from other handlers can then appear in the profile.
+'''
+
+DEFAULT_INTERVAL = 0.005
+MAX_SECONDS = 300
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', Path(__file__).parent / 'profiles'))
+
+
+def _os_thread_primitives(mode):
+    # (get_ident, Thread) of real OS threads, also when the standard library is monkey patched
+    if mode == 'eventlet':
+        from eventlet import patcher
+        return patcher.original('_thread').get_ident, patcher.original('threading').Thread
+    if mode == 'gevent':
+        from gevent import monkey
+        return monkey.get_original('_thread', 'get_ident'), monkey.get_original('threading', 'Thread')
+    return threading.get_ident, threading.Thread
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse(frame, root: str) -> str:
+    '''One stack in collapsed form: root;outermost;...;innermost.'''
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    return ';'.join(reversed(labels))
+
+
+class ProfileSession:
+    __slots__ = ('name', 'event', 'party', 'interval', 'started', 'deadline', 'samples', 'path')
+
+    def __init__(self, name, event, party, interval, seconds, path):
+        self.name = name
+        self.event = event
+        self.party = party
+        self.interval = interval
+        self.started = time.time()
+        self.deadline = time.monotonic() + seconds
+        self.samples = Counter()
+        self.path = path
+
+    def describe(self) -> dict:
+        return {
+            'name': self.name, 'event': self.event, 'party': self.party, 'interval': self.interval,
+            'started': self.started, 'samples': sum(self.samples.values()), 'file': self.path.name,
+        }
+
+
+class SamplingProfiler:
+    '''
+    One profiling session at a time.
+    party_of (callable): Returns the party code of the handler being called (read only when a
+        session filters by party).
+    '''
+
+    def __init__(self, party_of=None, out_dir: Path = PROFILE_DIR, mode: str = 'threading'):
+        self.party_of = party_of
+        self.out_dir = Path(out_dir)
+        self._ident, self._thread_class = _os_thread_primitives(mode)
+        self._session = None
+        self._tagged = {}      # OS thread ident -> event name of the matching handler it runs
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # ── Called by metrics.instrument while a session runs ──
+
+    def enter(self, event):
+        session = self._session
+        if session is None or (session.event and session.event != event):
+            return None
+        if session.party and (self.party_of is None or self.party_of() != session.party):
+            return None
+        ident = self._ident()
+        self._tagged[ident] = event
+        return ident
+
+    def exit(self, token):
+        if token is not None:
+            self._tagged.pop(token, None)
+
+    # ── Control ──
+
+    def start(self, seconds: float, event: str = None, party: str = None,
+              interval: float = DEFAULT_INTERVAL) -> dict:
+        '''
+        Profiles matching handlers for the given number of seconds (at most MAX_SECONDS).
+        Raises RuntimeError if a session is already running.
+        Returns: dict: The session's description (its file is written when it ends).
+        '''
+        seconds = min(max(float(seconds), 0.1), MAX_SECONDS)
+        interval = max(float(interval), 0.001)
+        with self._lock:
+            if self._session is not None:
+                raise RuntimeError('A profiling session is already running')
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            name = time.strftime('%Y%m%d-%H%M%S') + ''.join(f'-{p}' for p in (event, party) if p)
+            session = ProfileSession(name, event or None, (party or '').upper() or None, interval,
+                                     seconds, self.out_dir / f'{name}.collapsed')
+            self._session = session
+            self._stop.clear()
+            metrics.set_tracer(self)
+        self._thread_class(target=self._run, args=(session,), daemon=True, name='profiler').start()
+        print(f"[profiler] Sampling {event or 'all events'}{f' in party {party}' if party else ''} "
+              f"for {seconds:g}s")
+        return session.describe()
+
+    def stop(self):
+        '''Ends the running session early (its samples are still written).'''
+        self._stop.set()
+
+    def status(self) -> dict:
+        session = self._session
+        return {
+            'running': session.describe() if session else None,
+            'profiles': sorted(p.name for p in self.out_dir.glob('*.collapsed')) if self.out_dir.is_dir() else [],
+        }
+
+    def _run(self, session):
+        own = self._ident()
+        try:
+            while time.monotonic() < session.deadline and not self._stop.is_set():
+                frames = sys._current_frames()
+                for ident, event in list(self._tagged.items()):
+                    frame = frames.get(ident)
+                    if frame is not None and ident != own:
+                        session.samples[collapse(frame, event)] += 1
+                time.sleep(session.interval)
+        finally:
+            with self._lock:
+                metrics.set_tracer(None)
+                self._tagged.clear()
+                self._session = None
+            self._write(session)
+
+    def _write(self, session):
+        lines = [f'{stack} {count}' for stack, count in session.samples.most_common()]
+        session.path.write_text('\n'.join(lines) + ('\n' if lines else ''))
+        print(f"[profiler] Wrote {sum(session.samples.values())} samples to {session.path}")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    @metrics.instrument('busy')
+    def busy(n):
+        return sum(i * i for i in range(n))
+
+    profiler = SamplingProfiler(out_dir=Path(tempfile.mkdtemp()))
+    start = time.perf_counter()
+    for _ in range(2000):
+        busy(10)
+    off = (time.perf_counter() - start) / 2000
+    profiler.start(1.0, event='busy', interval=0.001)
+    while profiler.status()['running']:
+        busy(200000)
+    time.sleep(0.1)
+    written = sorted(profiler.out_dir.glob('*.collapsed'))[0]
+    print(f"Handler overhead while off: {off * 1e6:.1f} us/call (including the work)")
+    print(written.read_text().splitlines()[0])
@@ -0,0 +1,109 @@
+import hashlib
+import json
+
+'''
+What clients receive for a round, built per recipient and stripped to what they render.
+
+Rounds used to broadcast the server's full task: full image file names for every item, the
+correct and ambiguous answers, and a srcset map repeated in every round. Now:
+    - images are sent as integer IDs into the catalog (ImageCatalog.assets), which the client
+      fetches once from /api/catalog together with the image srcsets
+    - answers stay on the server; round_result reveals the expected answer after grading
+    - fact questions go to each player without the correct fact
+
+The catalog document carries a version; every visual payload names the version its IDs refer to,
+so a client fetches the catalog again after the images change.
+'''
+
+
+def catalog_document(catalog, variants) -> dict:
+    '''
+    The image catalog clients resolve IDs against.
+    catalog (ImageCatalog): The current catalog.
+    variants (AssetManifest): Responsive image sources, keyed by image path.
+    Returns: dict: {'version', 'images': [path per ID], 'variants': {ID: srcsets}}
+    '''
+    sources = {}
+    for asset_id, path in enumerate(catalog.assets):
+        srcsets = variants.variants_for(path)
+        if srcsets:
+            sources[asset_id] = srcsets
+    body = json.dumps([catalog.assets, sources], sort_keys=True).encode()
+    return {
+        'version': hashlib.sha1(body).hexdigest()[:12],
+        'images': list(catalog.assets),
+        'variants': sources,
+    }
+
+
+def visual_payload(task: dict, asset_ids, catalog_version: str) -> dict:
+    '''
+    A visual task as clients need it: instruction, display type and compact items, no answers.
+    Items are catalog IDs ('kind': 'image'), numbers ('number') or CSS colors ('color').
+    '''
+    payload = {
+        'type': task['type'],
+        'instruction': task['instruction'],
+        'display_type': task['display_type'],
+    }
+    items = task['items']
+    if task['display_type'] == 'clickable':
+        payload['kind'] = 'image'
+        payload['items'] = [asset_ids[filename] for filename in items]
+    elif items and items[0]['type'] == 'image':
+        payload['kind'] = 'image'
+        payload['items'] = [asset_ids[item['filename']] for item in items]
+    elif items and items[0]['type'] == 'colored_box':
+        payload['kind'] = 'color'
+        payload['items'] = [item['color'] for item in items]
+    else:
+        payload['kind'] = 'number'
+        payload['items'] = [item['value'] for item in items]
+    if payload['kind'] == 'image':
+        payload['catalog'] = catalog_version
+    return payload
+
+
+def fact_question_payload(question: dict) -> dict:
+    '''A player's fact question without the correct fact.'''
+    return {key: value for key, value in question.items() if key != 'correct_answer'}
+
+
+def selected_filenames(task: dict, answer) -> set:
+    '''Maps a clickable answer (catalog IDs sent by the client) back to the task's file names.'''
+    by_id = dict(zip(task.get('item_ids', ()), task['items']))
+    if not isinstance(answer, list):
+        return set()
+    return {by_id[i] for i in answer if isinstance(i, int) and i in by_id}
+
+
+def expected_visual_answer(task: dict):
+    '''The visual answer revealed in round_result: catalog IDs for clickable tasks, else the count.'''
+    if task['display_type'] != 'clickable':
+        return task['correct_answer']
+    id_by_file = dict(zip(task['items'], task.get('item_ids', ())))
+    return [id_by_file[f] for f in task['correct_answer'] if f in id_by_file]
+
+
+if __name__ == "__main__":
+    import image_catalog
+
+    class _NoVariants:
+        def variants_for(self, path):
+            return None
+
+    catalog = image_catalog.build_catalog({})
+    letter, selected, correct, ambiguous = catalog.sample_letter_items(16)
+    task = {
+        'type': 'clipart_images', 'instruction': f'Click on all images that start with the letter {letter}',
+        'items': [catalog.filename_by_stem[s] for s in selected],
+        'correct_answer': [catalog.filename_by_stem[s] for s in correct],
+        'ambiguous_answer': [catalog.filename_by_stem[s] for s in ambiguous],
+        'display_type': 'clickable', 'letter': letter,
+    }
+    document = catalog_document(catalog, _NoVariants())
+    payload = visual_payload(task, catalog.asset_ids, document['version'])
+    task['item_ids'] = payload['items']
+    before, after = len(json.dumps(task)), len(json.dumps(payload))
+    print(f"Clickable task: {before} bytes as a full task, {after} bytes compact ({before / after:.1f}x)")
+    assert selected_filenames(task, expected_visual_answer(task)) == set(task['correct_answer'])
@@ -0,0 +1,86 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Look-ahead generation of audio tasks.
+
+Building an audio task blocks on gTTS whenever the clip cache can't cover the round, which used to
+stall every player in the party before round_data arrived. While round N is being played we build
+round N+1's task on a small worker pool, so request_round can usually hand over a finished task.
+
+Each party holds at most one prefetched task. It is tagged with the settings it was built for
+(round, difficulty, time limit); a request with different settings treats it as stale. A task that
+is replaced or discarded before it is taken is cancelled if it hasn't started, else handed to the
+release callback once built, so its clip doesn't linger until the round is released.
+'''
+
+PREFETCH_WORKERS = 2
+
+
+class AudioPrefetcher:
+    '''
+    Builds one audio task ahead per party on a shared thread pool.
+    build (callable): Called as build(difficulty_level, time_limit, current_round, party_code=...) on a worker thread.
+    release (callable): Optional release(party_code, current_round, task) for built tasks nobody took.
+    '''
+
+    def __init__(self, build, max_workers: int = PREFETCH_WORKERS, release=None):
+        self._build = build
+        self._release = release
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='audio-prefetch')
+        self._pending = {}  # party code -> (settings tuple, future)
+        self._lock = threading.Lock()
+
+    def schedule(self, party_code: str, difficulty_level: int, time_limit: int, current_round: int):
+        '''Starts building the task for the given round unless it is already being built.'''
+        settings = (current_round, difficulty_level, time_limit)
+        with self._lock:
+            existing = self._pending.get(party_code)
+            if existing and existing[0] == settings:
+                return
+            future = self._executor.submit(
+                self._build, difficulty_level, time_limit, current_round, party_code=party_code
+            )
+            self._pending[party_code] = (settings, future)
+        if existing:
+            self._abandon(party_code, existing)
+
+    def take(self, party_code: str, difficulty_level: int, time_limit: int, current_round: int):
+        '''
+        Hands over the prefetched task if it matches the requested settings.
+        A build that is still running is waited on, since it is already further along than a fresh one.
+        Returns: dict | None: The audio task, or None if it was missing, stale or failed.
+        '''
+        settings = (current_round, difficulty_level, time_limit)
+        with self._lock:
+            entry = self._pending.get(party_code)
+            if not entry or entry[0] != settings:
+                return None
+            del self._pending[party_code]
+        try:
+            return entry[1].result()
+        except Exception as e:
+            print(f"[audio] Prefetch failed for round {current_round}: {e}")
+            return None
+
+    def discard(self, party_code: str):
+        '''Forgets the party's prefetched task (lobby reset or party closed).'''
+        with self._lock:
+            entry = self._pending.pop(party_code, None)
+        if entry:
+            self._abandon(party_code, entry)
+
+    def _abandon(self, party_code, entry):
+        settings, future = entry
+        if future.cancel() or self._release is None:
+            return
+
+        def release(done):
+            if done.cancelled() or done.exception() is not None:
+                return
+            try:
+                self._release(party_code, settings[0], done.result())
+            except Exception as e:
+                print(f"[audio] Releasing an unused prefetch failed: {e}")
+        # Runs now if the build is done, else on the worker thread when it finishes
+        future.add_done_callback(release)
@@ -0,0 +1,212 @@
+import threading
+import time
+
+import round_payloads
+
+'''
+Collects a round's answers on the server and sends the results once per round.
+
+handle_submit_answer used to send a round_result to the whole room for every answer, so a round
+cost players x players messages and whichever answer arrived first ended the round for everyone.
+Now each answer is graded and stored on the RoundState, and the round closes exactly once:
+    - when every player expected to answer has answered (normal rounds: the players with
+      permission; fact rounds: the host, the only player the page lets answer)
+    - or when its deadline passes: the round's time limit plus DEADLINE_GRACE_SECONDS, so the
+      answers clients submit automatically when their timer runs out still count
+While the round is open, each answer sends the room a small player_answered tick
+({round, player, answered, expected}); closing it sends one round_results message.
+
+Closing also decides what comes next: the party advances if the deciding answer was fully
+correct (fact rounds always advance), else it replays the round. next_round only moves a party on
+from a closed round, to the round the server decided.
+
+Deadlines are timers on the shared timer wheel (timer_wheel.py); a round that closes early
+cancels its timer.
+'''
+
+DEADLINE_GRACE_SECONDS = 5
+MIN_TIME_LIMIT = 5
+MAX_TIME_LIMIT = 300
+
+
+def expected_sids(party, round_data) -> set:
+    '''The players a round waits for, as sids of players still in the party.'''
+    if round_data.is_fact:
+        return {party.host_sid}
+    names = round_data.permissioned or ()
+    return {sid for sid, player in party.players.items() if player.name in names}
+
+
+def _missing_answer(party, round_data, sid) -> dict:
+    # The result of an expected player who never answered
+    player = party.players[sid]
+    entry = {'player': player.name, 'answered': False, 'visual_correct': False,
+             'audio_correct': False, 'both_correct': False, 'total_correct': player.score}
+    if round_data.is_fact:
+        about = party.players.get((round_data.assignments or {}).get(sid))
+        entry['fact_expected'] = about.fact if about else ''
+    return entry
+
+
+def round_results(party, round_data, reason: str) -> dict:
+    '''
+    Decides whether the party advances and builds the round_results message for a closing round.
+    reason (str): 'answered' (everyone expected answered) or 'deadline'.
+    Returns: dict: Every player's result under 'results', and at the top level the result that
+        decides the round (the first fully correct answer, else the host's, else the first)
+        plus the expected answers.
+    '''
+    entries = list(round_data.answers.values())
+    answered = {entry['player'] for entry in entries}
+    for sid in expected_sids(party, round_data):
+        if party.players[sid].name not in answered:
+            entries.append(_missing_answer(party, round_data, sid))
+
+    host = party.host().name
+    deciding = (next((e for e in entries if e['both_correct']), None)
+                or next((e for e in entries if e['player'] == host), None)
+                or (entries[0] if entries else {'visual_correct': False, 'audio_correct': False,
+                                                'both_correct': False}))
+    round_data.advance = round_data.is_fact or deciding['both_correct']
+    message = {
+        'round': round_data.number,
+        'round_type': round_data.round_type,
+        'reason': reason,
+        'advance': round_data.advance,
+        'next_round': round_data.next_number,
+        'both_correct': deciding['both_correct'],
+        'visual_correct': deciding['visual_correct'],
+        'audio_correct': deciding['audio_correct'],
+        'results': entries,
+    }
+    if round_data.is_fact:
+        message['fact_expected'] = deciding.get('fact_expected', '')
+    else:
+        vt, at = round_data.visual_task, round_data.audio_task
+        message['visual_expected'] = round_payloads.expected_visual_answer(vt) if vt else None
+        message['audio_expected'] = at['correct_answer'] if at and not at.get('dropped') else 'N/A'
+    return message
+
+
+class RoundCollector:
+    '''
+    Open rounds of every party on this worker.
+    parties: Mapping of code -> Party (a party_store.StateMap).
+    emit (callable): emit(event, payload, room) sends to a party's room.
+    timers (TimerWheel): Runs the deadlines.
+    on_close (callable): Optional on_close(code, round_data), called after a round closed.
+    ticks (bool): Send player_answered ticks while a round is open.
+    '''
+
+    def __init__(self, parties, emit, timers, on_close=None, ticks: bool = True):
+        self.parties = parties
+        self.emit = emit
+        self.timers = timers
+        self.on_close = on_close
+        self.ticks = ticks
+        self._deadlines = {}    # party code -> (deadline, Timer) of its latest round
+        self._lock = threading.Lock()
+
+    def open(self, code: str, round_data, time_limit) -> float:
+        '''
+        Starts collecting answers for the party's new round and schedules its deadline.
+        Returns: float: Seconds until the round closes on its own.
+        '''
+        try:
+            time_limit = float(time_limit)
+        except (TypeError, ValueError):
+            time_limit = MAX_TIME_LIMIT
+        delay = min(max(time_limit, MIN_TIME_LIMIT), MAX_TIME_LIMIT) + DEADLINE_GRACE_SECONDS
+        deadline = round_data.deadline = time.time() + delay
+        timer = self.timers.schedule(delay, lambda: self.expire(code, deadline))
+        with self._lock:
+            previous = self._deadlines.get(code)
+            self._deadlines[code] = (deadline, timer)
+        if previous is not None:
+            previous[1].cancel()
+        return delay
+
+    def discard(self, code: str):
+        '''Cancels the party's deadline (party closed).'''
+        with self._lock:
+            entry = self._deadlines.pop(code, None)
+        if entry is not None:
+            entry[1].cancel()
+
+    def submit(self, code: str, sid: str, entry: dict) -> bool:
+        '''
+        Records a graded answer (a player's first answer only), credits the player's score if it
+        was fully correct, and closes the round if it was the last one expected. Only recorded
+        answers score, so a duplicate or late answer never changes the score.
+        entry (dict): {'player', 'visual_correct', 'audio_correct', 'both_correct', ...}
+        Returns: bool: True if the answer was recorded.
+        '''
+        with self._lock:
+            party = self.parties.get(code)
+            rd = party.round_data if party else None
+            player = party.players.get(sid) if party else None
+            if rd is None or player is None or rd.closed or sid in rd.answers:
+                return False
+            if entry['both_correct']:
+                player.score += 1
+            rd.answers[sid] = dict(entry, answered=True, total_correct=player.score)
+            expected = expected_sids(party, rd)
+            tick = {'round': rd.number, 'player': entry['player'],
+                    'answered': len(expected & rd.answers.keys()), 'expected': len(expected)}
+            results = self._close_if_done(party, rd, expected)
+            self.parties.save(code)
+        if results is None:
+            if self.ticks:
+                self.emit('player_answered', tick, code)
+        else:
+            self._closed(code, rd, results)
+        return True
+
+    def players_changed(self, code: str):
+        '''Closes the party's round if the players still awaited have all left.'''
+        with self._lock:
+            party = self.parties.get(code)
+            rd = party.round_data if party else None
+            if rd is None or rd.closed:
+                return
+            results = self._close_if_done(party, rd, expected_sids(party, rd))
+            if results is not None:
+                self.parties.save(code)
+        if results is not None:
+            self._closed(code, rd, results)
+
+    def expire(self, code: str, deadline: float):
+        '''
+        Closes the party's round if it is still open and is the one this deadline was set for (a
+        replayed round keeps its number but gets a new deadline).
+        '''
+        with self._lock:
+            party = self.parties.get(code)
+            rd = party.round_data if party else None
+            if rd is None or rd.closed or rd.deadline != deadline:
+                return
+            rd.closed = True
+            results = round_results(party, rd, 'deadline')
+            self.parties.save(code)
+        self._closed(code, rd, results)
+
+    def _close_if_done(self, party, rd, expected):
+        if not expected <= rd.answers.keys():
+            return None
+        rd.closed = True
+        return round_results(party, rd, 'answered')
+
+    def _closed(self, code, rd, results):
+        # Drop the round's deadline timer (unless a newer round has replaced it already)
+        with self._lock:
+            entry = self._deadlines.get(code)
+            if entry is not None and entry[0] == rd.deadline:
+                del self._deadlines[code]
+            else:
+                entry = None
+        if entry is not None:
+            entry[1].cancel()
+        self.emit('round_results', results, code)
+        if self.on_close is not None:
+            self.on_close(code, rd)
+
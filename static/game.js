@@ -4,7 +4,13 @@
    =================================================================== */
 
 // ── Socket connection ──────────────────────────────────────────
-const socket = io();
+// With several server workers, the load balancer routes by the `party` query parameter.
+// Until we are in a party any worker will do, so start with a random key.
+// With SOCKETIO_SERIALIZER=msgpack the page loads a matching parser first (templates/game.html).
+const socket = io({
+    query: {party: Math.random().toString(36).slice(2, 6).toUpperCase()},
+    ...(window.socketIoParser ? {parser: window.socketIoParser} : {}),
+});
 
 // ── Game state ─────────────────────────────────────────────────
 let myRole = null;           // 'host' | 'helper'
@@ -19,9 +25,11 @@ let gameActive = false;
 let timerInterval;
 let currentVisualTask = null;
 let currentAudioTask = null;
-let selectedItems = [];
+let selectedItems = [];      // catalog IDs of the selected images
 let audioElement = null;
+let droppedAudioUrl = null;    // audio that broke off while streaming (audio_dropped)
 let lastRoundSuccess = false;
+let answerSubmitted = false;   // this player's answer for the current round has been sent
 
 // Team / voice
 let teamMembers = [];
@@ -35,148 +43,7 @@ let helpEnabled = false;      // helper input enable flag (for local UI state)
 let isSolo = false;           // single player mode
 let currentRoundType = 'normal'; // 'normal' | 'fact'
 
-// ── Levenshtein distance for fuzzy name matching ───────────────
-function levenshtein(a, b) {
-    const m = a.length, n = b.length;
-    const dp = Array.from({length: m + 1}, () => Array(n + 1).fill(0));
-    for (let i = 0; i <= m; i++) dp[i][0] = i;
-    for (let j = 0; j <= n; j++) dp[0][j] = j;
-    for (let i = 1; i <= m; i++)
-        for (let j = 1; j <= n; j++)
-            dp[i][j] = a[i-1] === b[j-1]
-                ? dp[i-1][j-1]
-                : 1 + Math.min(dp[i-1][j], dp[i][j-1], dp[i-1][j-1]);
-    return dp[m][n];
-}
-
-// Phonetic code to handle pronunciation discrepancies
-function phoneticCode(str) {
-    str = str.toLowerCase().trim();
-    if (!str) return '';
-    let s = str
-        .replace(/^[^a-z]+|[^a-z]+$/g, '')
-        .replace(/ph/g, 'f')
-        .replace(/ck/g, 'k')
-        .replace(/sh/g, 'S')
-        .replace(/ch/g, 'C')
-        .replace(/th/g, 'T')
-        .replace(/gh/g, '')
-        .replace(/kn/g, 'n')
-        .replace(/wr/g, 'r')
-        .replace(/wh/g, 'w')
-        .replace(/gn/g, 'n')
-        .replace(/mb$/g, 'm')
-        .replace(/ce/g, 'se')
-        .replace(/ci/g, 'si')
-        .replace(/cy/g, 'sy')
-        .replace(/ge/g, 'je')
-        .replace(/gi/g, 'ji')
-        .replace(/x/g, 'ks')
-        .replace(/qu/g, 'kw')
-        .replace(/[aeiou]/g, 'a')  // collapse vowels
-        .replace(/aa+/g, 'a')
-        .replace(/([^a])\1+/g, '$1');  // collapse repeated consonants
-    return s;
-}
-
-// Strip common suffixes/possessives that speech-to-text adds
-function stripSuffix(word) {
-    return word
-        .replace(/'s$/, '')
-        .replace(/s$/, '')
-        .replace(/ing$/, '')
-        .replace(/ed$/, '');
-}
-
-function nameSimilarity(spoken, actualName) {
-    spoken = spoken.toLowerCase().trim();
-    actualName = actualName.toLowerCase().trim();
-    if (spoken === actualName) return 1.0;
-    if (spoken.includes(actualName) || actualName.includes(spoken)) return 0.95;
-
-    // Also try with suffix stripping (speech API often adds "'s", "s", etc.)
-    const spokenStripped = stripSuffix(spoken);
-    const nameStripped = stripSuffix(actualName);
-    if (spokenStripped === nameStripped) return 0.97;
-    if (spokenStripped.includes(nameStripped) || nameStripped.includes(spokenStripped)) return 0.93;
-
-    // Phonetic match — handles pronunciation discrepancies like Sean/Shawn, Sara/Sarah
-    const spokenPhonetic = phoneticCode(spoken);
-    const namePhonetic = phoneticCode(actualName);
-    if (spokenPhonetic && namePhonetic && spokenPhonetic === namePhonetic) return 0.92;
-
-    // Try matching individual words in the spoken phrase
-    const words = spoken.split(/\s+/);
-    let bestWordScore = 0;
-
-    const checkWord = (w) => {
-        if (w.length < 2) return;  // only skip single chars
-        // Try raw and suffix-stripped versions
-        for (const candidate of [w, stripSuffix(w)]) {
-            if (!candidate) continue;
-            // Direct Levenshtein
-            const dist = levenshtein(candidate, actualName);
-            const maxLen = Math.max(candidate.length, actualName.length);
-            const score = maxLen > 0 ? 1 - dist / maxLen : 0;
-            if (score > bestWordScore) bestWordScore = score;
-
-            // Also check against stripped name
-            if (nameStripped !== actualName) {
-                const dist2 = levenshtein(candidate, nameStripped);
-                const maxLen2 = Math.max(candidate.length, nameStripped.length);
-                const score2 = maxLen2 > 0 ? 1 - dist2 / maxLen2 : 0;
-                if (score2 > bestWordScore) bestWordScore = score2;
-            }
-
-            // Phonetic comparison per word
-            const wPhonetic = phoneticCode(candidate);
-            if (wPhonetic && namePhonetic && wPhonetic === namePhonetic) {
-                bestWordScore = Math.max(bestWordScore, 0.90);
-            }
-            // Partial phonetic: Levenshtein on phonetic codes
-            if (wPhonetic && namePhonetic) {
-                const pDist = levenshtein(wPhonetic, namePhonetic);
-                const pMax = Math.max(wPhonetic.length, namePhonetic.length);
-                const pScore = pMax > 0 ? 1 - pDist / pMax : 0;
-                if (pScore > 0.65) bestWordScore = Math.max(bestWordScore, pScore * 0.88);
-            }
-        }
-    };
-
-    // Check individual words
-    for (const w of words) {
-        checkWord(w);
-    }
-
-    // Try joining adjacent words — speech API often splits names
-    // e.g. "and drew" → "andrew", "serve a" → "sarah"
-    for (let i = 0; i < words.length - 1; i++) {
-        checkWord(words[i] + words[i + 1]);           // no space: "and"+"drew" → "andrew"
-        checkWord(words[i] + ' ' + words[i + 1]);     // with space for multi-word names
-    }
-    // Try 3-word joins for longer names
-    for (let i = 0; i < words.length - 2; i++) {
-        checkWord(words[i] + words[i + 1] + words[i + 2]);
-    }
-
-    if (bestWordScore >= 0.85) return bestWordScore;
-
-    // Prefix match (first 3-4 chars) — only if name is 4+ chars
-    const minLen = Math.min(spoken.length, actualName.length);
-    if (minLen >= 4) {
-        const p = Math.min(4, minLen);
-        if (spoken.substring(0, p) === actualName.substring(0, p)) return 0.8;
-    }
-    // Also check prefix on individual words
-    for (const w of words) {
-        if (w.length >= 3 && actualName.length >= 3) {
-            const p = Math.min(3, w.length, actualName.length);
-            if (w.substring(0, p) === actualName.substring(0, p)) return 0.7;
-        }
-    }
-
-    return 0;
-}
+// Teammate name matching for voice help requests happens on the server (name_index.py)
 
 // ── Party UI helpers ───────────────────────────────────────────
 
@@ -262,6 +129,18 @@ socket.on('party_created', data => {
     document.getElementById('startGameBtn').style.display = 'inline-block';
 });
 
+// The party is hosted by another server worker: reconnect routed by its code and join again
+socket.on('party_elsewhere', data => {
+    if (socket.io.opts.query.party === data.code) {
+        alert('Could not reach the server hosting this party. Try again in a moment.');
+        return;
+    }
+    socket.io.opts.query = {party: data.code};
+    socket.once('connect', () => window.joinParty());
+    socket.disconnect();
+    socket.connect();
+});
+
 socket.on('party_joined', data => {
     partyCode = data.code;
     myRole = data.role;
@@ -382,9 +261,40 @@ function setupInstructionPage4() {
     }
 }
 
+// ── Image catalog ─────────────────────────────────────────────
+// Rounds send images as IDs into the server's catalog (/api/catalog), fetched once and again
+// only when a round names a newer catalog version
+let imageCatalog = null;
+let catalogRequest = null;
+
+function loadCatalog(version) {
+    if (imageCatalog && imageCatalog.version === version) return Promise.resolve(imageCatalog);
+    if (!catalogRequest) {
+        catalogRequest = fetch('/api/catalog')
+            .then(res => res.json())
+            .then(doc => { imageCatalog = doc; return doc; })
+            .finally(() => { catalogRequest = null; });
+    }
+    return catalogRequest;
+}
+
+function imageName(id) {
+    return imageCatalog ? imageCatalog.images[id] : String(id);
+}
+
 socket.on('round_data', data => {
+    const needsCatalog = data.visual_task && data.visual_task.catalog;
+    const ready = needsCatalog ? loadCatalog(data.visual_task.catalog) : Promise.resolve();
+    ready.then(() => showRoundData(data)).catch(err => {
+        console.error('Could not load the image catalog:', err);
+        showRoundData(data);
+    });
+});
+
+function showRoundData(data) {
     // Reset UI for all players (helpers didn't call startRound directly)
     resetRoundUI();
+    inputSyncRound = data.round;
 
     // Sync server-provided permissions list
     if (data.permissioned_players) {
@@ -400,8 +310,10 @@ socket.on('round_data', data => {
     currentRoundType = 'normal';
 
     currentVisualTask = data.visual_task;
-    currentAudioTask = data.audio_task;
-    const hasAudio = data.has_audio;
+    // The audio may have broken off before this round was shown (see audio_dropped)
+    const audioDropped = !!data.audio_task && data.audio_task.audio_url === droppedAudioUrl;
+    currentAudioTask = audioDropped ? null : data.audio_task;
+    const hasAudio = data.has_audio && !audioDropped;
 
     // Update visual instruction
     let visualInstruction = 'VISUAL: ' + currentVisualTask.instruction;
@@ -427,11 +339,13 @@ socket.on('round_data', data => {
     generateContent(currentVisualTask);
     startTimer();
 
-    // Play audio after a delay
+    // Play audio after a delay; it starts downloading now, so it is buffered by then
     if (hasAudio && currentAudioTask) {
+        const audioTask = currentAudioTask;
+        loadAudio(audioTask.audio_url);
         const delay = 5000 + Math.random() * 3000;
         setTimeout(() => {
-            if (gameActive) playAudio(currentAudioTask.audio_url);
+            if (gameActive && currentAudioTask === audioTask) playAudio(audioTask.audio_url);
         }, delay);
     }
 
@@ -441,29 +355,57 @@ socket.on('round_data', data => {
 
     // Enable/disable input based on role
     updateInputAccess();
-});
+}
 
-socket.on('round_result', data => {
-    if (data.both_correct) {
-        correctAnswers = data.total_correct;
+// One message per round, once every player expected to answer has answered or time ran out
+socket.on('round_results', data => {
+    if (data.round !== inputSyncRound) return;
+    const mine = data.results.find(r => r.player === myName);
+    if (mine) {
+        correctAnswers = mine.total_correct;
         document.getElementById('correctCount').textContent = correctAnswers;
     }
     endRound(data);
 });
 
+// The server couldn't finish synthesizing this round's audio: the round is visual only, and the
+// audio answer no longer counts. It can arrive before round_data has been shown.
+socket.on('audio_dropped', data => {
+    droppedAudioUrl = data.audio_url;
+    if (!currentAudioTask || currentAudioTask.audio_url !== data.audio_url) return;
+    currentAudioTask = null;
+    if (audioElement) audioElement.pause();
+    const aiInst = document.getElementById('audioInstruction');
+    if (aiInst) aiInst.remove();
+    document.getElementById('audioAnswerInput').parentElement.style.display = 'none';
+    if (!answerSubmitted) document.getElementById('submitBtn').textContent = 'Submit Task';
+    showNotification('Audio is unavailable this round, only the visual task counts', '#FF9800');
+});
+
+// A teammate (or this player) answered; the round is still waiting on the others
+socket.on('player_answered', data => {
+    if (data.round !== inputSyncRound || !gameActive) return;
+    if (answerSubmitted) {
+        document.getElementById('submitBtn').textContent =
+            `⏳ Waiting for teammates (${data.answered}/${data.expected})`;
+    } else if (data.player !== myName) {
+        showNotification(`${data.player} has answered`, '#607D8B');
+    }
+});
+
 socket.on('help_requested', data => {
     const helperName = data.helper_name;
     const fromName = data.from;
+    if (fromName === myName) _lastHelpTime = Date.now();
 
     // Update server-provided permissions list
     if (data.permissioned_players) {
         permissionedPlayers = data.permissioned_players;
     }
 
-    // If I'm the one being called, enable me for input
+    // If I'm the one being called, enable me for input (the server sends the lobby name)
     if (!helpEnabled && myRole !== 'host') {
-        const similarity = nameSimilarity(helperName, myName);
-        if (similarity >= 0.65) {
+        if (helperName === myName) {
             helpEnabled = true;
             updateInputAccess();
             showNotification(`${fromName} asked for your help!`, '#FF9800');
@@ -498,7 +440,7 @@ socket.on('error', data => {
 function updateInputAccess() {
     // Host can always interact; helpers only when helpEnabled
     const canInteract = gameActive && (myRole === 'host' || helpEnabled);
-    document.getElementById('submitBtn').disabled = !canInteract;
+    document.getElementById('submitBtn').disabled = !canInteract || answerSubmitted;
     document.getElementById('visualAnswerInput').disabled = !canInteract;
     document.getElementById('audioAnswerInput').disabled = !canInteract;
 
@@ -553,11 +495,13 @@ function resetRoundUI() {
     clearInterval(timerInterval);
     gameActive = true;
     selectedItems = [];
+    answerSubmitted = false;
     helpEnabled = false;
     currentRoundType = 'normal';
     // Permissions are now provided by server in round_data
     // Initialize empty until server sends the list
     permissionedPlayers = [];
+    _lastHelpTranscripts = '';
 
     // Reset fact round UI
     const factArea = document.getElementById('factQuestionArea');
@@ -734,26 +678,30 @@ function gatherAnswers() {
 }
 
 function submitAnswer() {
-    if (!gameActive) return;
+    if (!gameActive || answerSubmitted) return;
+    // The server takes one answer per player and sends the results when the round closes
+    answerSubmitted = true;
     socket.emit('submit_answer', gatherAnswers());
+    const submitBtn = document.getElementById('submitBtn');
+    submitBtn.disabled = true;
+    submitBtn.textContent = '⏳ Waiting for teammates...';
 }
 window.submitAnswer = submitAnswer;
 
 function autoSubmitOnTimeout() {
-    if (!gameActive) return;
     // Submit whatever is currently filled in
-    socket.emit('submit_answer', gatherAnswers());
+    submitAnswer();
 }
 
 function nextRound() {
-    // Broadcast to all players in the party so everyone moves together
-    socket.emit('next_round', { advance: lastRoundSuccess });
+    // The server moves the whole party on together, to the round it decided when this one closed
+    socket.emit('next_round', {});
 }
 window.nextRound = nextRound;
 
 // All players receive this and move in sync
 socket.on('sync_next_round', data => {
-    if (data.advance) currentRound++;
+    currentRound = data.round;
     if (teamMembers.length > 0) startVoiceListening();
     startRound();
 });
@@ -772,7 +720,9 @@ function startTimer() {
         if (timeLeft <= 10) el.style.color = '#ff6600';
         if (timeLeft <= 5) el.style.color = '#ff0000';
         if (timeLeft <= 0) {
-            // Auto-submit whatever is in the fields instead of failing
+            // Auto-submit whatever is in the fields instead of failing; the server's deadline
+            // closes the round if teammates never answer
+            clearInterval(timerInterval);
             autoSubmitOnTimeout();
         }
     }, 1000);
@@ -785,7 +735,8 @@ function endRound(result) {
     clearInterval(timerInterval);
     stopVoiceListening();
     if (audioElement) audioElement.pause();
-    lastRoundSuccess = result.both_correct;
+    // The server decides whether the party moves on or replays the round
+    lastRoundSuccess = result.advance;
 
     const fb = document.getElementById('feedback');
     fb.style.display = 'block';
@@ -795,7 +746,6 @@ function endRound(result) {
     if (result.round_type === 'fact') {
         const factArea = document.getElementById('factQuestionArea');
         if (factArea) factArea.style.display = 'none';
-        lastRoundSuccess = true; // Fact rounds always advance
         if (result.both_correct) {
             fb.className = 'feedback correct';
             fb.innerHTML = '🎉 Correct! You really know your teammates!';
@@ -803,10 +753,6 @@ function endRound(result) {
             fb.className = 'feedback incorrect';
             fb.innerHTML = `<strong>Not quite!</strong><br>The answer was: "<em>${result.fact_expected || '...'}</em>"<br><br><em>Try to remember it for next time!</em>`;
         }
-        if (result.both_correct) {
-            correctAnswers = result.total_correct;
-            document.getElementById('correctCount').textContent = correctAnswers;
-        }
         document.getElementById('submitBtn').disabled = true;
         const nextBtn = document.getElementById('nextRoundBtn');
         nextBtn.style.display = 'inline-block';
@@ -832,8 +778,8 @@ function endRound(result) {
             // Format expected answer nicely
             let expected = result.visual_expected;
             if (Array.isArray(expected)) {
-                expected = expected.map(f => {
-                    const name = f.replace(/\.[^.]+$/, '').replace(/_/g, ' ');
+                expected = expected.map(id => {
+                    const name = imageName(id).replace(/^.*\//, '').replace(/\.[^.]+$/, '').replace(/_/g, ' ');
                     return name.charAt(0).toUpperCase() + name.slice(1);
                 }).join(', ');
             }
@@ -862,9 +808,16 @@ function endRound(result) {
 
 // ── Audio playback ────────────────────────────────────────────
 
-function playAudio(url) {
+// The server streams a clip that is still being synthesized, instruction first,
+// so loading can start as soon as round_data arrives
+function loadAudio(url) {
     if (audioElement) audioElement.pause();
     audioElement = new Audio(url);
+    audioElement.preload = 'auto';
+}
+
+function playAudio(url) {
+    if (!audioElement || audioElement.src !== new URL(url, location.href).href) loadAudio(url);
     audioElement.play().catch(err => {
         console.error('Audio playback failed:', err);
     });
@@ -872,37 +825,54 @@ function playAudio(url) {
 
 // ── Visual content generation ─────────────────────────────────
 
+// An <img> for a catalog image, wrapped in a <picture> with the server-built AVIF/WebP
+// srcsets (if any), so the browser downloads the variant sized for its own pixel density
+function taskImageElement(id, itemDiv) {
+    const filename = imageName(id);
+    const img = document.createElement('img');
+    img.src = '/static/images/' + filename;
+    img.alt = filename;
+    img.onerror = function () {
+        img.style.display = 'none';
+        const fb = document.createElement('div');
+        fb.textContent = '?';
+        fb.style.fontSize = '24px';
+        itemDiv.appendChild(fb);
+    };
+    const sources = imageCatalog && imageCatalog.variants[id];
+    if (!sources) return img;
+    const picture = document.createElement('picture');
+    [['avif', 'image/avif'], ['webp', 'image/webp']].forEach(([fmt, type]) => {
+        if (!sources[fmt]) return;
+        const source = document.createElement('source');
+        source.type = type;
+        source.srcset = sources[fmt];
+        picture.appendChild(source);
+    });
+    picture.appendChild(img);
+    return picture;
+}
+
 function generateContent(visualTask) {
     const grid = document.getElementById('contentGrid');
     grid.innerHTML = '';
 
     if (visualTask.display_type === 'clickable') {
-        visualTask.items.forEach((filename) => {
+        visualTask.items.forEach((id) => {
             const itemDiv = document.createElement('div');
             itemDiv.className = 'item clickable-item';
-            itemDiv.dataset.item = filename;
+            itemDiv.dataset.item = id;
             itemDiv.style.cursor = 'pointer';
-
-            const img = document.createElement('img');
-            img.src = '/static/images/' + filename;
-            img.alt = filename;
-            img.onerror = function () {
-                img.style.display = 'none';
-                const fb = document.createElement('div');
-                fb.textContent = '?';
-                fb.style.fontSize = '24px';
-                itemDiv.appendChild(fb);
-            };
-            itemDiv.appendChild(img);
+            itemDiv.appendChild(taskImageElement(id, itemDiv));
 
             itemDiv.onclick = function () {
                 if (!gameActive) return;
                 if (myRole === 'helper' && !helpEnabled) return;
-                if (selectedItems.includes(filename)) {
-                    selectedItems = selectedItems.filter(i => i !== filename);
+                if (selectedItems.includes(id)) {
+                    selectedItems = selectedItems.filter(i => i !== id);
                     itemDiv.classList.remove('selected');
                 } else {
-                    selectedItems.push(filename);
+                    selectedItems.push(id);
                     itemDiv.classList.add('selected');
                 }
                 // Sync image selections to all players
@@ -913,30 +883,21 @@ function generateContent(visualTask) {
         document.getElementById('visualAnswerInput').style.display = 'none';
         document.getElementById('visualAnswerInput').parentElement.style.display = 'none';
     } else if (visualTask.display_type === 'count') {
+        // Items are numbers, CSS colors or catalog image IDs, depending on the task's kind
         visualTask.items.forEach(item => {
             const itemDiv = document.createElement('div');
             itemDiv.className = 'item';
             itemDiv.style.cursor = 'default';
-            if (item.type === 'number') {
-                itemDiv.textContent = item.value;
+            if (visualTask.kind === 'number') {
+                itemDiv.textContent = item;
                 const colors = ['#ff6b6b','#4ecdc4','#45b7d1','#f9ca24','#6c5ce7','#fd79a8','#00b894'];
                 itemDiv.style.background = colors[Math.floor(Math.random()*colors.length)];
                 itemDiv.style.color = 'white';
-            } else if (item.type === 'colored_box') {
-                itemDiv.style.background = item.color;
+            } else if (visualTask.kind === 'color') {
+                itemDiv.style.background = item;
                 itemDiv.style.minHeight = '80px';
-            } else if (item.type === 'image') {
-                const img = document.createElement('img');
-                img.src = '/static/images/' + item.filename;
-                img.alt = item.filename;
-                img.onerror = function () {
-                    img.style.display = 'none';
-                    const fb = document.createElement('div');
-                    fb.textContent = '?';
-                    fb.style.fontSize = '24px';
-                    itemDiv.appendChild(fb);
-                };
-                itemDiv.appendChild(img);
+            } else if (visualTask.kind === 'image') {
+                itemDiv.appendChild(taskImageElement(item, itemDiv));
             }
             grid.appendChild(itemDiv);
         });
@@ -959,8 +920,18 @@ function generateContent(visualTask) {
 }
 
 // ── Receive synced inputs from other players ──────────────────
+// The server coalesces inputs and sends the latest values in batches, oldest change first;
+// acknowledging a batch lets it send the next one
 let _ignoreSyncInput = false;
-socket.on('sync_input_update', data => {
+let inputSyncRound = null;
+socket.on('sync_input_batch', batch => {
+    socket.emit('sync_input_ack', {version: batch.version});
+    // Ignore a batch from the previous round that arrives after the new round's data
+    if (batch.round !== inputSyncRound) return;
+    batch.changes.forEach(applySyncInput);
+});
+
+function applySyncInput(data) {
     _ignoreSyncInput = true;
     if (data.type === 'visual') {
         document.getElementById('visualAnswerInput').value = data.value;
@@ -968,9 +939,9 @@ socket.on('sync_input_update', data => {
         document.getElementById('audioAnswerInput').value = data.value;
     } else if (data.type === 'selection') {
         // Sync image selections
-        selectedItems = data.selectedItems || [];
+        selectedItems = data.value || [];
         document.querySelectorAll('.clickable-item').forEach(el => {
-            if (selectedItems.includes(el.dataset.item)) {
+            if (selectedItems.includes(Number(el.dataset.item))) {
                 el.classList.add('selected');
             } else {
                 el.classList.remove('selected');
@@ -978,57 +949,37 @@ socket.on('sync_input_update', data => {
         });
     }
     _ignoreSyncInput = false;
-});
+}
 
 // ── Voice recognition ─────────────────────────────────────────
 
-// Track last help request to debounce duplicate triggers
-let _lastHelpName = '';
+// Last transcripts sent, so repeated interim results don't resend the same text
+let _lastHelpTranscripts = '';
+// When the server last granted one of my help requests; the rest of that utterance is ignored
 let _lastHelpTime = 0;
+const HELP_DEBOUNCE_MS = 5000;
 
-function handleVoiceCommand(transcript, isFinal) {
+function handleVoiceCommand(transcripts, isFinal) {
     if (voiceAnswerMode) {
-        voiceAnswerText = transcript;
-        document.getElementById('voiceAnswerDisplay').textContent = `You said: "${transcript}"`;
+        voiceAnswerText = transcripts[0];
+        document.getElementById('voiceAnswerDisplay').textContent = `You said: "${transcripts[0]}"`;
         return;
     }
     if (!gameActive) return;
     // Only players who already have permission can prompt others
     // Host always has permission; helpers only after being prompted this round
     if (myRole !== 'host' && !helpEnabled) return;
-
-    // Strip filler words that speech API may prepend
-    const cleaned = transcript.toLowerCase()
-        .replace(/^(hey|yo|ok|okay|um|uh|like|so|the|a)\s+/i, '')
-        .trim();
-    // Use very strict thresholds to avoid false positives (final: 0.92, interim: 0.95)
-    const threshold = isFinal ? 0.92 : 0.95;
-    let bestMatch = null;
-    let bestScore = threshold;
-
-    for (const member of teamMembers) {
-        const memberLower = member.name.toLowerCase();
-        // Skip yourself
-        if (memberLower === myName.toLowerCase()) continue;
-        // Skip players who already have permission (from server-provided list)
-        if (permissionedPlayers.some(p => p.toLowerCase() === memberLower)) continue;
-
-        // nameSimilarity already handles word splitting, joins, suffix stripping, etc.
-        const score = nameSimilarity(cleaned, member.name);
-        if (score > bestScore) { bestScore = score; bestMatch = member.name; }
-    }
-
-    if (bestMatch) {
-        // Debounce: don't fire the same help request within 5 seconds
-        const now = Date.now();
-        if (bestMatch === _lastHelpName && now - _lastHelpTime < 5000) {
-            return;
-        }
-        _lastHelpName = bestMatch;
-        _lastHelpTime = now;
-        console.log(`Voice match: "${transcript}" → ${bestMatch} (score: ${bestScore.toFixed(2)})`);
-        socket.emit('request_help', {helper_name: bestMatch});
-    }
+    if (teamMembers.length < 2) return;
+    // Debounce: trailing results of the sentence that just asked for help don't ask again
+    if (Date.now() - _lastHelpTime < HELP_DEBOUNCE_MS) return;
+
+    const key = transcripts.join('|');
+    if (key === _lastHelpTranscripts) return;
+    _lastHelpTranscripts = key;
+    // The server resolves the transcript (and its alternatives) to a teammate, skipping
+    // the speaker and anyone who already has permission. Interim transcripts only count on an
+    // exact name (0.95 confidence), final ones also on a phonetic match (0.92), see name_index.py
+    socket.emit('request_help', {transcripts: transcripts, final: isFinal});
 }
 
 function showHelpRequest(playerName, confidence) {
@@ -1122,12 +1073,13 @@ if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
             const isFinal = e.results[i].isFinal;
             const t = e.results[i][0].transcript.toLowerCase().trim();
             console.log('Voice' + (isFinal ? ' (final)' : ' (interim)') + ':', t);
-            handleVoiceCommand(t, isFinal);
-            // Also check alternative transcriptions
+            // Send alternative transcriptions along with the best one
+            const transcripts = [t];
             for (let alt = 1; alt < e.results[i].length; alt++) {
                 const altText = e.results[i][alt].transcript.toLowerCase().trim();
-                if (altText !== t) handleVoiceCommand(altText, isFinal);
+                if (!transcripts.includes(altText)) transcripts.push(altText);
             }
+            handleVoiceCommand(transcripts, isFinal);
         }
     };
     recognition.onerror = function (e) {
@@ -1198,7 +1150,12 @@ function changeInstructionPage(dir) {
 window.changeInstructionPage = changeInstructionPage;
 
 // ── Enter-key submission ──────────────────────────────────────
-document.addEventListener('DOMContentLoaded', () => {
+// game.js may be loaded after DOMContentLoaded (the msgpack parser loads first), so check readyState
+function onDocumentReady(fn) {
+    if (document.readyState === 'loading') document.addEventListener('DOMContentLoaded', fn);
+    else fn();
+}
+onDocumentReady(() => {
     document.getElementById('visualAnswerInput')?.addEventListener('keypress', e => {
         if (e.key === 'Enter' && gameActive) submitAnswer();
     });
@@ -0,0 +1,295 @@
+// Socket.IO packet parser using msgpack, for SOCKETIO_SERIALIZER=msgpack (see templates/game.html).
+// Written for this game and served from our own origin.
+//
+// Follows the wire format of python-socketio's msgpack serializer: every packet {type, nsp, data,
+// id} is one msgpack map. The codec below covers what Socket.IO packets carry: nil, booleans,
+// integers, float64, strings, binary, arrays and maps (ext types decode to their raw bytes).
+// tests/test_msgpack_parser.py checks it against the Python msgpack package.
+
+export const protocol = 5;
+
+export const PacketType = {
+    CONNECT: 0,
+    DISCONNECT: 1,
+    EVENT: 2,
+    ACK: 3,
+    CONNECT_ERROR: 4,
+};
+
+// ── Encoding ────────────────────────────────────────────────────
+
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+class Writer {
+    constructor() {
+        this.bytes = new Uint8Array(256);
+        this.view = new DataView(this.bytes.buffer);
+        this.length = 0;
+    }
+
+    reserve(n) {
+        if (this.length + n <= this.bytes.length) return;
+        let size = this.bytes.length * 2;
+        while (size < this.length + n) size *= 2;
+        const bytes = new Uint8Array(size);
+        bytes.set(this.bytes.subarray(0, this.length));
+        this.bytes = bytes;
+        this.view = new DataView(bytes.buffer);
+    }
+
+    u8(value) { this.reserve(1); this.view.setUint8(this.length, value); this.length += 1; }
+    u16(value) { this.reserve(2); this.view.setUint16(this.length, value); this.length += 2; }
+    u32(value) { this.reserve(4); this.view.setUint32(this.length, value); this.length += 4; }
+    f64(value) { this.reserve(8); this.view.setFloat64(this.length, value); this.length += 8; }
+
+    raw(bytes) {
+        this.reserve(bytes.length);
+        this.bytes.set(bytes, this.length);
+        this.length += bytes.length;
+    }
+
+    // Head of a str/bin/array/map: fixed form when short, then 8/16/32-bit lengths
+    head(length, fix, fixMax, c8, c16, c32) {
+        if (length <= fixMax && fix !== null) this.u8(fix | length);
+        else if (length < 0x100 && c8 !== null) { this.u8(c8); this.u8(length); }
+        else if (length < 0x10000) { this.u8(c16); this.u16(length); }
+        else { this.u8(c32); this.u32(length); }
+    }
+
+    integer(value) {
+        if (value >= 0) {
+            if (value < 0x80) this.u8(value);
+            else if (value < 0x100) { this.u8(0xcc); this.u8(value); }
+            else if (value < 0x10000) { this.u8(0xcd); this.u16(value); }
+            else if (value < 0x100000000) { this.u8(0xce); this.u32(value); }
+            else { this.u8(0xcf); this.u32(Math.floor(value / 0x100000000)); this.u32(value >>> 0); }
+        } else {
+            if (value >= -0x20) this.u8(value & 0xff);
+            else if (value >= -0x80) { this.u8(0xd0); this.u8(value & 0xff); }
+            else if (value >= -0x8000) { this.u8(0xd1); this.u16(value & 0xffff); }
+            else if (value >= -0x80000000) { this.u8(0xd2); this.u32(value >>> 0); }
+            else {
+                this.u8(0xd3);
+                const high = Math.floor(value / 0x100000000);
+                this.u32(high >>> 0);
+                this.u32((value - high * 0x100000000) >>> 0);
+            }
+        }
+    }
+
+    value(value) {
+        if (value === null || value === undefined) this.u8(0xc0);
+        else if (value === false) this.u8(0xc2);
+        else if (value === true) this.u8(0xc3);
+        else if (typeof value === 'number') {
+            if (Number.isSafeInteger(value)) this.integer(value);
+            else { this.u8(0xcb); this.f64(value); }
+        } else if (typeof value === 'string') {
+            const bytes = textEncoder.encode(value);
+            this.head(bytes.length, 0xa0, 31, 0xd9, 0xda, 0xdb);
+            this.raw(bytes);
+        } else if (value instanceof ArrayBuffer || ArrayBuffer.isView(value)) {
+            const bytes = value instanceof ArrayBuffer
+                ? new Uint8Array(value)
+                : new Uint8Array(value.buffer, value.byteOffset, value.byteLength);
+            this.head(bytes.length, null, -1, 0xc4, 0xc5, 0xc6);
+            this.raw(bytes);
+        } else if (Array.isArray(value)) {
+            this.head(value.length, 0x90, 15, null, 0xdc, 0xdd);
+            for (const item of value) this.value(item);
+        } else if (value instanceof Date) {
+            this.value(value.toISOString());
+        } else if (typeof value === 'object') {
+            if (typeof value.toJSON === 'function') { this.value(value.toJSON()); return; }
+            // Like JSON: keys holding undefined or functions are left out
+            const keys = Object.keys(value).filter(
+                key => value[key] !== undefined && typeof value[key] !== 'function');
+            this.head(keys.length, 0x80, 15, null, 0xde, 0xdf);
+            for (const key of keys) {
+                this.value(key);
+                this.value(value[key]);
+            }
+        } else {
+            throw new Error(`msgpack: cannot encode ${typeof value}`);
+        }
+    }
+}
+
+export function encode(value) {
+    const writer = new Writer();
+    writer.value(value);
+    return writer.bytes.buffer.slice(0, writer.length);
+}
+
+// ── Decoding ────────────────────────────────────────────────────
+
+class Reader {
+    constructor(data) {
+        this.bytes = data instanceof ArrayBuffer
+            ? new Uint8Array(data)
+            : new Uint8Array(data.buffer, data.byteOffset, data.byteLength);
+        this.view = new DataView(this.bytes.buffer, this.bytes.byteOffset, this.bytes.byteLength);
+        this.offset = 0;
+    }
+
+    take(n) {
+        if (this.offset + n > this.bytes.length) throw new Error('msgpack: unexpected end of data');
+        const start = this.offset;
+        this.offset += n;
+        return start;
+    }
+
+    u8() { return this.view.getUint8(this.take(1)); }
+    u16() { return this.view.getUint16(this.take(2)); }
+    u32() { return this.view.getUint32(this.take(4)); }
+
+    str(length) {
+        const start = this.take(length);
+        return textDecoder.decode(this.bytes.subarray(start, start + length));
+    }
+
+    bin(length) {
+        const start = this.take(length);
+        return this.bytes.slice(start, start + length).buffer;
+    }
+
+    array(length) {
+        const items = new Array(length);
+        for (let i = 0; i < length; i++) items[i] = this.value();
+        return items;
+    }
+
+    map(length) {
+        const map = {};
+        for (let i = 0; i < length; i++) {
+            const key = this.value();
+            map[key] = this.value();
+        }
+        return map;
+    }
+
+    ext(length) {
+        this.u8();      // ext type
+        return this.bin(length);
+    }
+
+    value() {
+        const byte = this.u8();
+        if (byte < 0x80) return byte;
+        if (byte < 0x90) return this.map(byte & 0x0f);
+        if (byte < 0xa0) return this.array(byte & 0x0f);
+        if (byte < 0xc0) return this.str(byte & 0x1f);
+        if (byte >= 0xe0) return byte - 0x100;
+        switch (byte) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return this.bin(this.u8());
+            case 0xc5: return this.bin(this.u16());
+            case 0xc6: return this.bin(this.u32());
+            case 0xc7: return this.ext(this.u8());
+            case 0xc8: return this.ext(this.u16());
+            case 0xc9: return this.ext(this.u32());
+            case 0xca: return this.view.getFloat32(this.take(4));
+            case 0xcb: return this.view.getFloat64(this.take(8));
+            case 0xcc: return this.u8();
+            case 0xcd: return this.u16();
+            case 0xce: return this.u32();
+            case 0xcf: return this.u32() * 0x100000000 + this.u32();
+            case 0xd0: return this.view.getInt8(this.take(1));
+            case 0xd1: return this.view.getInt16(this.take(2));
+            case 0xd2: return this.view.getInt32(this.take(4));
+            case 0xd3: { const high = this.view.getInt32(this.take(4)); return high * 0x100000000 + this.u32(); }
+            case 0xd4: return this.ext(1);
+            case 0xd5: return this.ext(2);
+            case 0xd6: return this.ext(4);
+            case 0xd7: return this.ext(8);
+            case 0xd8: return this.ext(16);
+            case 0xd9: return this.str(this.u8());
+            case 0xda: return this.str(this.u16());
+            case 0xdb: return this.str(this.u32());
+            case 0xdc: return this.array(this.u16());
+            case 0xdd: return this.array(this.u32());
+            case 0xde: return this.map(this.u16());
+            case 0xdf: return this.map(this.u32());
+            default: throw new Error(`msgpack: invalid byte 0x${byte.toString(16)}`);
+        }
+    }
+}
+
+export function decode(data) {
+    const reader = new Reader(data);
+    const value = reader.value();
+    if (reader.offset !== reader.bytes.length) throw new Error('msgpack: trailing bytes');
+    return value;
+}
+
+// ── Socket.IO parser interface ──────────────────────────────────
+
+const isString = value => typeof value === 'string';
+const isObject = value => Object.prototype.toString.call(value) === '[object Object]';
+
+function isDataValid(packet) {
+    switch (packet.type) {
+        case PacketType.CONNECT:
+            return packet.data === undefined || isObject(packet.data);
+        case PacketType.DISCONNECT:
+            return packet.data === undefined;
+        case PacketType.CONNECT_ERROR:
+            return isString(packet.data) || isObject(packet.data);
+        default:
+            return Array.isArray(packet.data);
+    }
+}
+
+export class Encoder {
+    encode(packet) {
+        return [encode(packet)];
+    }
+}
+
+export class Decoder {
+    constructor() {
+        this.listeners = {};
+    }
+
+    on(event, fn) {
+        (this.listeners[event] = this.listeners[event] || []).push(fn);
+        return this;
+    }
+
+    off(event, fn) {
+        if (event === undefined) this.listeners = {};
+        else if (fn === undefined) delete this.listeners[event];
+        else this.listeners[event] = (this.listeners[event] || []).filter(f => f !== fn);
+        return this;
+    }
+
+    emit(event, ...args) {
+        for (const fn of (this.listeners[event] || []).slice()) fn.apply(this, args);
+        return this;
+    }
+
+    add(data) {
+        const packet = decode(data);
+        // python-socketio leaves out missing fields, or sends them as nil
+        if (packet.data === null) delete packet.data;
+        if (packet.id === null) delete packet.id;
+        this.checkPacket(packet);
+        this.emit('decoded', packet);
+    }
+
+    checkPacket(packet) {
+        const typeValid = Number.isInteger(packet.type)
+            && packet.type >= PacketType.CONNECT && packet.type <= PacketType.CONNECT_ERROR;
+        if (!typeValid) throw new Error('invalid packet type');
+        if (!isString(packet.nsp)) throw new Error('invalid namespace');
+        if (!isDataValid(packet)) throw new Error('invalid payload');
+        if (!(packet.id === undefined || Number.isInteger(packet.id))) throw new Error('invalid packet id');
+    }
+
+    destroy() {
+        this.listeners = {};
+    }
+}
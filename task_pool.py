@@ -0,0 +1,135 @@
+import threading
+from collections import deque
+
+'''
+Ready-made visual tasks, generated in the background before rounds ask for them.
+
+One bounded pool per key (difficulty level, task type). request_round pops a task in O(1); when
+a pool drops below its low-water mark the refill loop tops it back up to capacity. A miss (empty
+pool, or a key with no pool) just means the caller builds the task itself, as before.
+
+Hit and miss counts per key are kept so pool sizes can be tuned for peak load (see stats()).
+'''
+
+POOL_SIZE = 8
+LOW_WATER = 3
+REFILL_INTERVAL_SECONDS = 1.0
+
+
+class TaskPool:
+    '''
+    Background-filled pools of tasks.
+    build (callable): build(*key) returns a new task (or None if it can't right now).
+    keys (iterable): The pool keys, e.g. (difficulty, task_type) tuples.
+    '''
+
+    def __init__(self, build, keys, size: int = POOL_SIZE, low_water: int = LOW_WATER,
+                 interval: float = REFILL_INTERVAL_SECONDS):
+        self._build = build
+        self.size = size
+        self.low_water = low_water
+        self.interval = interval
+        self._pools = {key: deque(maxlen=size) for key in keys}
+        self._hits = dict.fromkeys(self._pools, 0)
+        self._misses = dict.fromkeys(self._pools, 0)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._wanted.set()
+
+    def take(self, key):
+        '''Pops a ready task for the key, or returns None (a miss) if there isn't one.'''
+        pool = self._pools.get(key)
+        if pool is None:
+            return None
+        try:
+            task = pool.popleft()
+        except IndexError:
+            task = None
+        with self._lock:
+            if task is None:
+                self._misses[key] += 1
+            else:
+                self._hits[key] += 1
+        if len(pool) < self.low_water:
+            self._wanted.set()
+        return task
+
+    def invalidate(self):
+        '''Drops every pooled task (e.g. the image catalog changed) and refills from scratch.'''
+        with self._lock:
+            self._generation += 1
+            for pool in self._pools.values():
+                pool.clear()
+        self._wanted.set()
+
+    def fill(self, sleep=None) -> int:
+        '''
+        Tops up every pool below its low-water mark to full capacity.
+        sleep (callable): Called with 0 between builds so green threads can yield.
+        Returns: int: Tasks built.
+        '''
+        built = 0
+        for key, pool in self._pools.items():
+            if len(pool) >= self.low_water:
+                continue
+            generation = self._generation
+            while len(pool) < self.size:
+                try:
+                    task = self._build(*key)
+                except Exception as e:
+                    print(f"[tasks] Could not pre-build {key}: {e}")
+                    break
+                if task is None or generation != self._generation:
+                    break
+                pool.append(task)
+                built += 1
+                if sleep:
+                    sleep(0)
+        return built
+
+    def run(self, sleep=None):
+        '''Refill loop for a background task: fills on demand, and at least every interval.'''
+        while True:
+            self._wanted.wait(self.interval)
+            self._wanted.clear()
+            try:
+                self.fill(sleep)
+            except Exception as e:
+                print(f"[tasks] Refill failed: {e}")
+
+    def stats(self) -> dict:
+        '''Per-key pool depth, hits and misses, plus totals and the overall hit rate.'''
+        with self._lock:
+            pools = {
+                '/'.join(map(str, key)): {
+                    'ready': len(pool), 'hits': self._hits[key], 'misses': self._misses[key],
+                }
+                for key, pool in self._pools.items()
+            }
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+        return {
+            'capacity': self.size,
+            'low_water': self.low_water,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+            'pools': pools,
+        }
+
+
+if __name__ == "__main__":
+    import itertools
+    import random
+
+    counter = itertools.count()
+    pool = TaskPool(lambda level, kind: {'id': next(counter), 'level': level, 'type': kind},
+                    [(level, kind) for level in range(1, 6) for kind in ('a', 'b')])
+    print(f"Pre-built {pool.fill()} tasks")
+    for _ in range(100):
+        key = (random.randint(1, 5), random.choice('ab'))
+        if pool.take(key) is None:
+            pool.fill()
+    stats = pool.stats()
+    print(f"hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.2f}")
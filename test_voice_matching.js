@@ -5,6 +5,10 @@
  *
  * Tests the phoneticCode, nameSimilarity, and handleVoiceCommand logic
  * to verify that pronunciation variants and help requests work correctly.
+ *
+ * The game now resolves transcripts on the server (name_index.py, tested
+ * by tests/test_name_index.py); these functions are kept here as the
+ * reference the server port was checked against.
  */
 
 // ── Copy of matching functions from game.js ────────────────────
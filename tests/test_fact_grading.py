@@ -0,0 +1,112 @@
+import pytest
+
+from fact_index import CompiledAnswer, CompiledFact, FactIndex, bounded_levenshtein, extract_keywords
+
+'''
+Fact answers: fact_index.FactIndex (free-form matching) and how app.py grades fact rounds.
+'''
+
+FACT = 'I have been to Japan three times'
+
+
+@pytest.fixture
+def index():
+    index = FactIndex()
+    index.update('ann', FACT)
+    index.update('bob', 'I once ate an entire cake alone')
+    return index
+
+
+def test_extract_keywords_drops_stop_words_and_punctuation():
+    assert extract_keywords('I have been to Japan, three times!') == ['japan', 'three', 'times']
+
+
+@pytest.mark.parametrize('a, b, limit, expected', [
+    ('kitten', 'sitting', 3, True),
+    ('kitten', 'sitting', 2, False),
+    ('cake', 'cake', 0, True),
+    ('cake', 'cakes', 1, True),
+    ('cake', 'caker', 0, False),
+])
+def test_bounded_levenshtein(a, b, limit, expected):
+    assert bounded_levenshtein(a, b, limit) is expected
+
+
+@pytest.mark.parametrize('answer', [
+    FACT,
+    'i HAVE been to japan three times',
+    'been to japan three times',
+    'japan three times',
+    'japn thre times',
+])
+def test_accepts_the_fact_and_close_paraphrases(index, answer):
+    assert index.check('ann', answer)
+
+
+@pytest.mark.parametrize('answer', ['', 'a', 'i', 'japan', 'pizza', 'I once ate an entire cake alone'])
+def test_rejects_unrelated_and_contained_fragments(index, answer):
+    # "a" and "japan" are contained in the fact, which alone is not enough
+    assert not index.check('ann', answer)
+
+
+def test_unknown_player_and_removed_fact_never_match(index):
+    assert not index.check('nobody', FACT)
+    index.remove('ann')
+    assert not index.check('ann', FACT)
+    index.update('bob', '   ')
+    assert len(index) == 0
+
+
+def test_score_round_matches_check(index):
+    answers = [('ann', FACT), ('bob', 'entire cake alone'), ('ann', 'pizza'), ('bob', FACT), ('ann', FACT)]
+    assert index.score_round(answers) == [index.check(sid, answer) for sid, answer in answers]
+    assert index.score_round(answers) == [True, True, False, False, True]
+
+
+def test_fact_without_keywords_uses_the_full_string():
+    fact = CompiledFact('It is, so it is')
+    assert not fact.keywords
+    assert fact.matches(CompiledAnswer('it is so it is'))
+    assert not fact.matches(CompiledAnswer('something else entirely'))
+
+
+@pytest.fixture
+def fact_round():
+    import app
+
+    host = app.socketio.test_client(app.app)
+    guest = app.socketio.test_client(app.app)
+    host.emit('create_party', {'name': 'Ann', 'fact': 'I once ate an entire cake alone'})
+    code = next(m for m in host.get_received() if m['name'] == 'party_created')['args'][0]['code']
+    guest.emit('join_party', {'code': code, 'name': 'Bob', 'fact': 'I have two cats at home'})
+    # Round 6 is a fact round; only the host answers it
+    host.emit('request_round', {'difficulty': 3, 'time_limit': 30, 'round': 6})
+    data = next(m for m in host.get_received() if m['name'] == 'round_data')['args'][0]
+    guest.get_received()
+    yield host, guest, data['fact_question']
+    guest.disconnect()
+    host.disconnect()
+
+
+def _submit(host, guest, answer):
+    host.emit('submit_answer', {'fact_answer': answer})
+    return next(m for m in guest.get_received() if m['name'] == 'round_results')['args'][0]
+
+
+def test_fact_round_accepts_the_right_choice(fact_round):
+    host, guest, question = fact_round
+    assert 'I have two cats at home' in question['choices']
+    result = _submit(host, guest, 'i have TWO cats at home')
+    assert result['both_correct'] and result['fact_expected'] == 'I have two cats at home'
+
+
+@pytest.mark.parametrize('answer', ['two catz at home', 'cats', 'a', 'I have two cats at home and more'])
+def test_fact_round_rejects_answers_that_are_not_a_choice(fact_round, answer):
+    host, guest, _ = fact_round
+    assert not _submit(host, guest, answer)['both_correct']
+
+
+def test_fact_round_rejects_a_wrong_choice(fact_round):
+    host, guest, question = fact_round
+    wrong = next(c for c in question['choices'] if c != 'I have two cats at home')
+    assert not _submit(host, guest, wrong)['both_correct']
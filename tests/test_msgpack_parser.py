@@ -0,0 +1,133 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+msgpack = pytest.importorskip('msgpack')
+
+'''
+static/msgpack-parser.js against the Python msgpack package (and python-socketio's packets).
+The parser is an ES module, so each test copies it to a .mjs file and runs a small script in node.
+'''
+
+PARSER = Path(__file__).resolve().parent.parent / 'static' / 'msgpack-parser.js'
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+
+VALUES = [
+    None, True, False,
+    0, 1, 127, 128, 255, 256, 65535, 65536, 2 ** 32 - 1, 2 ** 32, 2 ** 40, 2 ** 53 - 1,
+    -1, -32, -33, -128, -129, -32768, -32769, -2 ** 31, -2 ** 31 - 1, -2 ** 40,
+    1.5, -0.25, 1e300,
+    '', 'a' * 31, 'b' * 32, 'c' * 255, 'd' * 256, 'e' * 65536, 'héllo ✓ 🎧',
+    list(range(15)), list(range(16)), list(range(70000)),
+    {str(i): i for i in range(15)}, {str(i): i for i in range(16)},
+    {'nested': [{'a': [1, 2, {'b': None}]}, 'x']},
+]
+
+
+def _run(tmp_path, script: str, stdin: str) -> str:
+    shutil.copy(PARSER, tmp_path / 'msgpack-parser.mjs')
+    prelude = (
+        "import * as parser from './msgpack-parser.mjs';\n"
+        "import { readFileSync } from 'node:fs';\n"
+        "const input = readFileSync(0, 'utf8');\n"
+        "const hex = bytes => Buffer.from(bytes).toString('hex');\n"
+    )
+    (tmp_path / 'run.mjs').write_text(prelude + script)
+    result = subprocess.run(['node', 'run.mjs'], cwd=tmp_path, input=stdin,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_decodes_what_python_encodes(tmp_path):
+    packed = [msgpack.packb(value).hex() for value in VALUES]
+    out = _run(tmp_path, """
+        const decoded = JSON.parse(input).map(h => parser.decode(Buffer.from(h, 'hex')));
+        process.stdout.write(JSON.stringify(decoded));
+    """, json.dumps(packed))
+    assert json.loads(out) == VALUES
+
+
+def test_python_decodes_what_it_encodes(tmp_path):
+    out = _run(tmp_path, """
+        const encoded = JSON.parse(input).map(v => hex(new Uint8Array(parser.encode(v))));
+        process.stdout.write(JSON.stringify(encoded));
+    """, json.dumps(VALUES))
+    assert [msgpack.unpackb(bytes.fromhex(h), strict_map_key=False) for h in json.loads(out)] == VALUES
+
+
+def test_encoding_matches_python_byte_for_byte(tmp_path):
+    # Both pick the shortest form, so the bytes match for every non-float value
+    values = [v for v in VALUES if not isinstance(v, float)]
+    out = _run(tmp_path, """
+        const encoded = JSON.parse(input).map(v => hex(new Uint8Array(parser.encode(v))));
+        process.stdout.write(JSON.stringify(encoded));
+    """, json.dumps(values))
+    assert json.loads(out) == [msgpack.packb(v).hex() for v in values]
+
+
+def test_binary_round_trip(tmp_path):
+    data = bytes(range(256)) * 300
+    out = _run(tmp_path, """
+        const value = parser.decode(Buffer.from(input, 'hex'));
+        process.stdout.write(hex(new Uint8Array(parser.encode(value))));
+    """, msgpack.packb(data).hex())
+    assert msgpack.unpackb(bytes.fromhex(out)) == data
+
+
+def test_decoder_reads_python_socketio_packets(tmp_path):
+    from socketio import msgpack_packet, packet
+
+    packets = [
+        msgpack_packet.MsgPackPacket(packet.EVENT, data=['round_data', {'round': 3, 'choices': ['a', 'b']}],
+                                     namespace='/'),
+        msgpack_packet.MsgPackPacket(packet.ACK, data=[True], namespace='/', id=7),
+        msgpack_packet.MsgPackPacket(packet.CONNECT, data={'sid': 'abc'}, namespace='/'),
+    ]
+    out = _run(tmp_path, """
+        const decoded = [];
+        for (const h of JSON.parse(input)) {
+            const decoder = new parser.Decoder();
+            decoder.on('decoded', packet => decoded.push(packet));
+            decoder.add(Buffer.from(h, 'hex'));
+        }
+        process.stdout.write(JSON.stringify(decoded));
+    """, json.dumps([p.encode().hex() for p in packets]))
+    assert json.loads(out) == [
+        {'type': 2, 'nsp': '/', 'data': ['round_data', {'round': 3, 'choices': ['a', 'b']}]},
+        {'type': 3, 'nsp': '/', 'data': [True], 'id': 7},
+        {'type': 0, 'nsp': '/', 'data': {'sid': 'abc'}},
+    ]
+
+
+def test_encoder_output_is_read_by_python_socketio(tmp_path):
+    from socketio import msgpack_packet, packet
+
+    out = _run(tmp_path, """
+        const [encoded] = new parser.Encoder().encode(
+            {type: parser.PacketType.EVENT, nsp: '/', data: ['submit_answer', {audio_answer: 4}], id: 2});
+        process.stdout.write(hex(new Uint8Array(encoded)));
+    """, '')
+    decoded = msgpack_packet.MsgPackPacket(encoded_packet=bytes.fromhex(out))
+    assert decoded.packet_type == packet.EVENT
+    assert decoded.data == ['submit_answer', {'audio_answer': 4}]
+    assert decoded.id == 2
+
+
+def test_decoder_rejects_malformed_packets(tmp_path):
+    out = _run(tmp_path, """
+        const results = JSON.parse(input).map(h => {
+            try { new parser.Decoder().add(Buffer.from(h, 'hex')); return 'ok'; }
+            catch (e) { return e.message; }
+        });
+        process.stdout.write(JSON.stringify(results));
+    """, json.dumps([
+        msgpack.packb({'type': 9, 'nsp': '/'}).hex(),
+        msgpack.packb({'type': 2, 'nsp': '/', 'data': 'not a list'}).hex(),
+        msgpack.packb({'type': 2, 'nsp': '/', 'data': []})[:-1].hex(),
+    ]))
+    assert json.loads(out) == ['invalid packet type', 'invalid payload', 'msgpack: unexpected end of data']
@@ -0,0 +1,106 @@
+import pytest
+
+from name_index import NameIndex, candidate_phrases, normalize, phonetic_code, soundex, strip_suffix
+
+'''
+Resolving voice transcripts to teammate names (name_index.py).
+'''
+
+
+@pytest.fixture
+def index():
+    return NameIndex(['Andrew', 'Sarah', 'John', 'Ben', 'Sam', 'Mary Ann'])
+
+
+def test_helpers():
+    assert normalize("  Hey, SARAH's!  ") == "hey sarah's"
+    assert strip_suffix("sarah's") == 'sarah' and strip_suffix('is') == 'is'
+    assert phonetic_code('Phillip') == phonetic_code('Filip')
+    assert phonetic_code('Jon') == phonetic_code('John')
+    assert soundex('Robert') == soundex('Rupert') == 'R163'
+    assert soundex('') == ''
+
+
+def test_candidate_phrases_join_words_once_at_the_seam():
+    phrases = [p for p, _, _ in candidate_phrases('and drew')]
+    assert 'andrew' in phrases and 'and drew' in phrases
+
+
+@pytest.mark.parametrize('transcript, expected', [
+    ('Sarah', 'Sarah'),
+    ('hey sara', 'Sarah'),
+    ('can john help', 'John'),
+    ('jon', 'John'),
+    ('and drew', 'Andrew'),
+    ("sarah's", 'Sarah'),
+    ('johns', 'John'),
+    ('andru', 'Andrew'),
+    ('mary ann can you help', 'Mary Ann'),
+    ('maryann', 'Mary Ann'),
+])
+def test_final_transcripts_resolve(index, transcript, expected):
+    assert index.resolve(transcript, final=True) == expected
+
+
+@pytest.mark.parametrize('transcript', [
+    'i have been counting',
+    'i need some help',
+    'can you help',
+    'kris',
+    '',
+])
+def test_ordinary_speech_does_not_resolve(index, transcript):
+    assert index.resolve(transcript, final=True) is None
+    assert index.resolve(transcript, final=False) is None
+
+
+def test_interim_transcripts_need_an_exact_name(index):
+    assert index.resolve('hey sarah', final=False) == 'Sarah'
+    assert index.resolve('and drew', final=False) == 'Andrew'
+    # Phonetic and Soundex matches wait for the final transcript
+    assert index.resolve('hey sara', final=False) is None
+    assert index.resolve('andru', final=False) is None
+
+
+def test_phonetic_matches_only_whole_words(index):
+    # "sa rah" joined would sound like Sarah, but joined words only match exactly
+    assert index.resolve('sa ra', final=True) is None
+
+
+def test_excluded_and_ambiguous_names():
+    index = NameIndex(['Andrew', 'Sarah', 'Sara'])
+    assert index.resolve('andrew help me', exclude={'Andrew'}) is None
+    # "sara" is exactly one player, but the phonetic key is shared by two
+    assert index.resolve('sara') == 'Sara'
+    assert index.resolve('sarra') is None
+    assert index.resolve('sarra', exclude={'Sara'}) == 'Sarah'
+
+
+def test_canonical(index):
+    assert index.canonical('sarah') == 'Sarah'
+    assert index.canonical('MARY  ANN') == 'Mary Ann'
+    assert index.canonical('nobody') is None
+    assert index.canonical(None) is None
+
+
+def test_request_help_builds_the_index_when_this_worker_has_none():
+    import app
+
+    host = app.socketio.test_client(app.app)
+    guest = app.socketio.test_client(app.app)
+    host.emit('create_party', {'name': 'Ann', 'fact': ''})
+    code = next(m for m in host.get_received() if m['name'] == 'party_created')['args'][0]['code']
+    guest.emit('join_party', {'code': code, 'name': 'Ben', 'fact': ''})
+    host.emit('request_round', {'difficulty': 1, 'time_limit': 30, 'round': 1})
+    host.get_received()
+    # As if the party had been loaded from the shared store by another worker
+    app.name_indexes.clear()
+
+    def helped(transcript, final):
+        host.emit('request_help', {'transcripts': [transcript], 'final': final})
+        return [m['args'][0]['helper_name'] for m in host.get_received() if m['name'] == 'help_requested']
+
+    assert helped('i have been counting', True) == []
+    assert helped('hey ben', False) == ['Ben']
+    guest.disconnect()
+    host.disconnect()
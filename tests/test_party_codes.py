@@ -0,0 +1,76 @@
+import random
+import string
+
+import pytest
+
+from party_codes import CodeAllocator
+
+'''
+Party code allocation (party_codes.py).
+'''
+
+
+def test_allocates_every_code_exactly_once():
+    allocator = CodeAllocator(length=2, alphabet='ABCDEF', cooldown=0, rng=random.Random(7))
+    codes = [allocator.allocate() for _ in range(36)]
+    assert len(set(codes)) == 36
+    assert all(len(code) == 2 and set(code) <= set('ABCDEF') for code in codes)
+    with pytest.raises(RuntimeError):
+        allocator.allocate()
+
+
+def test_full_code_space_is_shuffled():
+    allocator = CodeAllocator(rng=random.Random(1))
+    codes = [allocator.allocate() for _ in range(1000)]
+    assert len(set(codes)) == 1000 and codes != sorted(codes)
+    assert all(len(code) == 4 and set(code) <= set(string.ascii_uppercase + string.digits) for code in codes)
+
+
+def test_released_codes_cool_down_before_reuse(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('party_codes.time.monotonic', lambda: now[0])
+    allocator = CodeAllocator(length=1, alphabet='AB', cooldown=60, rng=random.Random(3))
+    first, second = allocator.allocate(), allocator.allocate()
+    allocator.release(first)
+    now[0] = 30
+    # Still cooling, but nothing else is left: the longest-cooled code is reused
+    assert allocator.allocate() == first
+    allocator.release(second)
+    allocator.release(first)
+    now[0] = 200
+    assert {allocator.allocate(), allocator.allocate()} == {first, second}
+
+
+def test_release_ignores_unknown_and_foreign_codes():
+    allocator = CodeAllocator(length=1, alphabet='AB', cooldown=0)
+    code = allocator.allocate()
+    allocator.release('ZZ')
+    allocator.release('B' if code == 'A' else 'A')
+    allocator.release(code)
+    allocator.release(code)
+    assert len(allocator._cooling) == 1
+
+
+def test_prefix_is_kept():
+    allocator = CodeAllocator(prefix='B', rng=random.Random(2))
+    codes = [allocator.allocate() for _ in range(50)]
+    assert all(code.startswith('B') and len(code) == 4 for code in codes)
+    with pytest.raises(ValueError):
+        CodeAllocator(prefix='ABCD')
+
+
+def test_rejected_codes_come_back_after_the_cooldown():
+    taken = {'A'}
+    allocator = CodeAllocator(length=1, alphabet='AB', cooldown=0, accept=lambda code: code not in taken,
+                              rng=random.Random(1))
+    assert allocator.allocate() == 'B'
+    with pytest.raises(RuntimeError):
+        allocator.allocate()
+    # The party holding "A" elsewhere closed
+    taken.clear()
+    assert allocator.allocate() == 'A'
+
+
+def test_accept_filters_codes():
+    allocator = CodeAllocator(accept=lambda code: code[0] in 'XYZ', rng=random.Random(5))
+    assert all(allocator.allocate()[0] in 'XYZ' for _ in range(100))
@@ -0,0 +1,105 @@
+import pytest
+
+import models
+from party_store import (MemoryPartyStore, RedisPartyStore, SQLitePartyStore, StateMap, _dump,
+                         open_store, worker_for_party)
+
+'''
+Party/session stores (party_store.py): the three backends behind StateMap, and JSON storage.
+'''
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryPartyStore()
+    if request.param == 'sqlite':
+        return SQLitePartyStore(str(tmp_path / 'parties.db'))
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisPartyStore(fakeredis.FakeRedis())
+
+
+def _party():
+    party = models.Party('ABCD', 'sid1', models.Player('Ann', 'host', 'I like cake'))
+    party.players['sid2'] = models.Player('Bob', score=2)
+    party.round_data = models.RoundState.fact(6, {'sid1': 'sid2'}, {'sid1': frozenset({'a', 'b'})})
+    party.round_data.permissioned = {'Ann'}
+    party.round_data.answers['sid1'] = {'player': 'Ann', 'both_correct': True}
+    return party
+
+
+def test_round_trip_through_a_fresh_map(store):
+    StateMap(store, 'party')['ABCD'] = _party()
+    loaded = StateMap(store, 'party')['ABCD']
+    assert isinstance(loaded, models.Party)
+    assert list(loaded.players) == ['sid1', 'sid2']
+    assert loaded.players['sid2'].name == 'Bob' and loaded.players['sid2'].score == 2
+    rd = loaded.round_data
+    assert rd.is_fact and rd.assignments == {'sid1': 'sid2'}
+    assert rd.choices == {'sid1': frozenset({'a', 'b'})} and rd.permissioned == {'Ann'}
+    assert rd.answers == {'sid1': {'player': 'Ann', 'both_correct': True}}
+
+
+def test_save_persists_in_place_changes(store):
+    parties = StateMap(store, 'party')
+    parties['ABCD'] = _party()
+    parties['ABCD'].round = 4
+    parties.save('ABCD')
+    assert StateMap(store, 'party')['ABCD'].round == 4
+
+
+def test_delete_pop_and_contains(store):
+    parties = StateMap(store, 'party')
+    parties['ABCD'] = _party()
+    other = StateMap(store, 'party')
+    assert 'ABCD' in other and other.all_keys() == ['ABCD']
+    assert parties.pop('ABCD').code == 'ABCD'
+    assert 'ABCD' not in StateMap(store, 'party')
+    assert other.get('missing', 'default') == 'default'
+    with pytest.raises(KeyError):
+        other['missing']
+
+
+def test_len_and_iteration_only_cover_this_process(store):
+    parties = StateMap(store, 'party')
+    parties['ABCD'] = _party()
+    other = StateMap(store, 'party')
+    if not isinstance(store, MemoryPartyStore):
+        assert len(other) == 0 and list(other) == [] and other.cached('ABCD') is None
+    other.get('ABCD')
+    assert len(other) == 1 and list(other) == ['ABCD'] and other.cached('ABCD') is not None
+
+
+def test_cached_entries_expire(tmp_path):
+    store = SQLitePartyStore(str(tmp_path / 'parties.db'))
+    mine = StateMap(store, 'party')
+    theirs = StateMap(store, 'party')
+    mine['ABCD'] = _party()
+    assert theirs['ABCD'].round == 0
+    mine['ABCD'].round = 5
+    mine.save('ABCD')
+    assert theirs['ABCD'].round == 0        # still cached
+    theirs.ttl = 0
+    assert theirs['ABCD'].round == 5
+    del mine['ABCD']
+    assert theirs.get('ABCD') is None and len(theirs) == 0
+
+
+def test_values_are_stored_as_json():
+    data = _dump({'permissioned': {'b', 'a'}, 'party': _party()})
+    assert data.startswith(b'{') and b'__type__' in data and b'"permissioned":["a","b"]' in data
+    with pytest.raises(TypeError):
+        _dump({'fn': print})
+
+
+def test_open_store():
+    assert isinstance(open_store('memory'), MemoryPartyStore)
+    assert isinstance(open_store('sqlite://'), SQLitePartyStore)
+    with pytest.raises(ValueError):
+        open_store('postgres://db')
+
+
+def test_worker_for_party_spreads_codes():
+    assert worker_for_party('ABCD', 1) == 0
+    workers = {worker_for_party(f'C{i:03d}', 4) for i in range(200)}
+    assert workers == {0, 1, 2, 3}
@@ -0,0 +1,48 @@
+import threading
+
+from audio_spool import AudioSpool
+from audio_store import AudioStore
+from round_prefetch import AudioPrefetcher
+
+'''
+Prefetched round audio (round_prefetch.py) and giving back clips nobody took.
+'''
+
+
+def _prefetcher(store, gate=None):
+    def build(level, limit, current_round, party_code=None):
+        if gate is not None:
+            gate.wait(5)
+        return {'audio_id': store.put(party_code, b'mp3', round_number=current_round), 'level': level}
+
+    def release(code, round_number, task):
+        store.discard(task['audio_id'], code, round_number)
+    return AudioPrefetcher(build, max_workers=1, release=release)
+
+
+def test_take_hands_over_a_matching_task(tmp_path):
+    store = AudioStore(spool=AudioSpool(tmp_path))
+    prefetcher = _prefetcher(store)
+    prefetcher.schedule('P', 2, 30, 5)
+    assert prefetcher.take('P', 3, 30, 5) is None        # stale settings
+    prefetcher.schedule('P', 2, 30, 5)
+    task = prefetcher.take('P', 2, 30, 5)
+    assert task['level'] == 2 and store.get(task['audio_id']) is not None
+    assert prefetcher.take('P', 2, 30, 5) is None
+
+
+def test_replaced_and_discarded_builds_release_their_clips(tmp_path):
+    spool = AudioSpool(tmp_path)
+    store = AudioStore(spool=spool)
+    gate = threading.Event()
+    prefetcher = _prefetcher(store, gate)
+    prefetcher.schedule('P', 1, 30, 5)      # starts on the only worker
+    prefetcher.schedule('Q', 1, 30, 5)      # queued behind it
+    prefetcher.schedule('Q', 2, 30, 5)      # replaces the queued build: cancelled
+    prefetcher.schedule('P', 2, 30, 5)      # replaces the running build: released once built
+    gate.set()
+    kept = prefetcher.take('P', 2, 30, 5)
+    prefetcher.discard('Q')
+    prefetcher._executor.shutdown(wait=True)
+    assert len(store) == 1 and store.get(kept['audio_id']) is not None
+    assert spool._refs == {'P': {5: 1}}
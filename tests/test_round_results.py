@@ -0,0 +1,136 @@
+import pytest
+
+import models
+import round_results
+from round_results import RoundCollector
+from timer_wheel import TimerWheel
+
+'''
+Collecting a round's answers on the server (round_results.py).
+'''
+
+CORRECT = {'visual_correct': True, 'audio_correct': True, 'both_correct': True}
+WRONG = {'visual_correct': False, 'audio_correct': True, 'both_correct': False}
+
+
+class _Parties(dict):
+    def save(self, code):
+        pass
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture
+def party():
+    party = models.Party('DEMO', 'h', models.Player('Host', 'host'))
+    party.players['a'] = models.Player('Ann')
+    party.players['b'] = models.Player('Bob')
+    party.round_data = models.RoundState(
+        4, visual_task={'display_type': 'count', 'correct_answer': 7},
+        audio_task={'correct_answer': 3}, permissioned={'Host', 'Ann'},
+    )
+    return party
+
+
+@pytest.fixture
+def collector(party, clock):
+    sent = []
+    closed = []
+    wheel = TimerWheel(tick=0.125, clock=lambda: clock[0])
+    collector = RoundCollector(_Parties(DEMO=party), lambda event, payload, room: sent.append((event, payload)),
+                               wheel, on_close=lambda code, rd: closed.append(rd.number))
+    collector.sent, collector.closed, collector.wheel = sent, closed, wheel
+    return collector
+
+
+def _events(collector, name):
+    return [payload for event, payload in collector.sent if event == name]
+
+
+def test_round_closes_once_every_expected_player_answered(collector, party):
+    collector.open('DEMO', party.round_data, 30)
+    assert collector.submit('DEMO', 'h', dict(CORRECT, player='Host'))
+    assert _events(collector, 'player_answered') == [{'round': 4, 'player': 'Host', 'answered': 1, 'expected': 2}]
+    assert collector.submit('DEMO', 'a', dict(WRONG, player='Ann'))
+    [results] = _events(collector, 'round_results')
+    assert results['reason'] == 'answered' and results['advance'] and results['next_round'] == 5
+    assert results['visual_expected'] == 7 and results['audio_expected'] == 3
+    assert {r['player']: r['both_correct'] for r in results['results']} == {'Host': True, 'Ann': False}
+    assert party.round_data.closed and collector.closed == [4]
+    # The deadline timer was cancelled with the round
+    assert collector.wheel.advance(10_000) == 0
+
+
+def test_duplicate_and_late_answers_are_ignored_and_never_score(collector, party):
+    collector.open('DEMO', party.round_data, 30)
+    assert collector.submit('DEMO', 'h', dict(CORRECT, player='Host'))
+    assert not collector.submit('DEMO', 'h', dict(CORRECT, player='Host'))
+    collector.submit('DEMO', 'a', dict(CORRECT, player='Ann'))
+    assert not collector.submit('DEMO', 'b', dict(CORRECT, player='Bob'))
+    assert [p.score for p in party.players.values()] == [1, 1, 0]
+    assert len(_events(collector, 'round_results')) == 1
+
+
+def test_deadline_closes_the_round_and_replays_it(collector, party, clock):
+    delay = collector.open('DEMO', party.round_data, 30)
+    assert delay == 30 + round_results.DEADLINE_GRACE_SECONDS
+    collector.submit('DEMO', 'a', dict(WRONG, player='Ann'))
+    clock[0] = delay - 1
+    collector.wheel.advance()
+    assert not party.round_data.closed
+    clock[0] = delay + 1
+    collector.wheel.advance()
+    [results] = _events(collector, 'round_results')
+    assert results['reason'] == 'deadline' and not results['advance'] and results['next_round'] == 4
+    missing = next(r for r in results['results'] if r['player'] == 'Host')
+    assert missing['answered'] is False and not missing['both_correct']
+
+
+def test_time_limits_are_clamped(collector, party):
+    grace = round_results.DEADLINE_GRACE_SECONDS
+    assert collector.open('DEMO', party.round_data, 'soon') == round_results.MAX_TIME_LIMIT + grace
+    assert collector.open('DEMO', party.round_data, 1) == round_results.MIN_TIME_LIMIT + grace
+    assert collector.open('DEMO', party.round_data, 10_000) == round_results.MAX_TIME_LIMIT + grace
+
+
+def test_a_replayed_round_ignores_the_old_deadline(collector, party, clock):
+    collector.open('DEMO', party.round_data, 10)
+    clock[0] = 5
+    party.round_data = models.RoundState(4, permissioned={'Host'})
+    collector.open('DEMO', party.round_data, 30)
+    clock[0] = 20
+    collector.wheel.advance()
+    assert not party.round_data.closed
+    clock[0] = 5 + 30 + round_results.DEADLINE_GRACE_SECONDS + 1
+    collector.wheel.advance()
+    assert party.round_data.closed and len(_events(collector, 'round_results')) == 1
+
+
+def test_round_closes_when_awaited_players_leave(collector, party):
+    collector.open('DEMO', party.round_data, 30)
+    collector.submit('DEMO', 'h', dict(CORRECT, player='Host'))
+    del party.players['a']
+    collector.players_changed('DEMO')
+    [results] = _events(collector, 'round_results')
+    assert results['reason'] == 'answered' and [r['player'] for r in results['results']] == ['Host']
+
+
+def test_fact_rounds_wait_for_the_host_and_always_advance(collector, party):
+    party.players['h'].fact = 'I like cake'
+    party.players['a'].fact = 'I have two cats'
+    party.round_data = models.RoundState.fact(7, {'h': 'a'}, {'h': frozenset({'i have two cats'})})
+    collector.open('DEMO', party.round_data, 30)
+    collector.submit('DEMO', 'h', {'player': 'Host', 'visual_correct': True, 'audio_correct': True,
+                                   'both_correct': False, 'fact_expected': 'I have two cats'})
+    [results] = _events(collector, 'round_results')
+    assert results['advance'] and results['fact_expected'] == 'I have two cats'
+
+
+def test_discard_cancels_the_deadline(collector, party, clock):
+    collector.open('DEMO', party.round_data, 30)
+    collector.discard('DEMO')
+    clock[0] = 1000
+    assert collector.wheel.advance() == 0 and not party.round_data.closed
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from timer_wheel import TimerWheel
+
+'''
+The hierarchical timer wheel behind round deadlines (timer_wheel.py).
+'''
+
+# A tick that is exact in binary, so the simulated clock lands on tick boundaries
+TICK = 0.125
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture
+def wheel(clock):
+    return TimerWheel(tick=TICK, clock=lambda: clock[0])
+
+
+def _run_until(wheel, clock, seconds):
+    while clock[0] < seconds:
+        clock[0] += TICK
+        wheel.advance()
+
+
+def test_fires_on_the_first_tick_at_or_after_the_deadline(wheel, clock):
+    fired = []
+    wheel.schedule(1.0, lambda: fired.append(clock[0]))
+    wheel.schedule(0.3, lambda: fired.append(clock[0]))
+    _run_until(wheel, clock, 0.25)
+    assert fired == []
+    _run_until(wheel, clock, 2)
+    assert fired == [0.375, 1.0] and len(wheel) == 0
+
+
+def test_cancelled_timers_never_fire(wheel, clock):
+    fired = []
+    timers = [wheel.schedule(delay, lambda d=delay: fired.append(d)) for delay in (1, 2, 100, 5000)]
+    timers[1].cancel()
+    timers[3].cancel()
+    _run_until(wheel, clock, 6000)
+    assert fired == [1, 100] and len(wheel) == 0
+
+
+def test_zero_and_negative_delays_fire_on_the_next_tick(wheel, clock):
+    fired = []
+    wheel.schedule(0, lambda: fired.append('zero'))
+    wheel.schedule(-5, lambda: fired.append('negative'))
+    assert wheel.advance() == 0
+    clock[0] = TICK
+    assert wheel.advance() == 2 and fired == ['zero', 'negative']
+
+
+def test_many_timers_across_every_level_fire_within_one_tick(wheel, clock):
+    rng = random.Random(1)
+    late = []
+    count = 5000
+    for _ in range(count):
+        delay = rng.uniform(0, 4 * 3600)    # beyond one turn of the middle level
+        wheel.schedule(delay, lambda due=delay: late.append(clock[0] - due))
+    assert len(wheel) == count
+    _run_until(wheel, clock, 4 * 3600 + 1)
+    assert len(late) == count
+    assert min(late) >= 0 and max(late) <= TICK + 1e-6
+
+
+def test_timers_beyond_the_top_level_still_fire(clock):
+    wheel = TimerWheel(tick=1.0, sizes=(4, 4), clock=lambda: clock[0])
+    fired = []
+    wheel.schedule(50, lambda: fired.append(clock[0]))     # the wheel spans 16 ticks
+    for _ in range(60):
+        clock[0] += 1
+        wheel.advance()
+    assert fired == [50]
+
+
+def test_a_failing_callback_does_not_stop_the_others(wheel, clock):
+    fired = []
+
+    def fail():
+        raise RuntimeError('boom')
+    wheel.schedule(1, fail)
+    wheel.schedule(1, lambda: fired.append(True))
+    clock[0] = 1
+    assert wheel.advance() == 2 and fired == [True]
+
+
+def test_callbacks_can_schedule_more_timers(wheel, clock):
+    fired = []
+
+    def again():
+        fired.append(clock[0])
+        if len(fired) < 3:
+            wheel.schedule(1, again)
+    wheel.schedule(1, again)
+    _run_until(wheel, clock, 5)
+    assert fired == [1, 2, 3]
@@ -0,0 +1,149 @@
+import threading
+import time
+
+'''
+Hierarchical timer wheel: every timer of the server on one background task.
+
+Round deadlines used to exist only in the browser. The server now sets one per open round. A
+thread or green thread sleeping per party would cost a stack each, and a heap costs log(n) per
+operation. A wheel needs neither:
+    - time advances in ticks of TICK_SECONDS; level 0 has one slot per tick for the next
+      LEVEL_SIZES[0] ticks, and each level above has slots covering a whole turn of the level below
+    - a timer goes into the lowest level whose span reaches its expiry; when a slot of a higher
+      level comes due, its timers are moved (cascaded) down into the finer levels
+    - each tick fires the one level 0 slot that is due
+Scheduling and cancelling are O(1), and a tick costs O(1) plus the timers it fires or cascades,
+however many timers are pending. With the defaults (0.1s ticks, 256 x 64 x 64 slots) timers
+reach about 29 hours; later ones wait in the top level and are re-placed on each turn.
+
+    timers = TimerWheel()
+    socketio.start_background_task(timers.run, socketio.sleep)
+    timer = timers.schedule(30, lambda: close_round(code))
+    timer.cancel()
+'''
+
+TICK_SECONDS = 0.1
+LEVEL_SIZES = (256, 64, 64)
+
+
+class Timer:
+    '''A scheduled callback. Cancelling only marks it; the wheel drops it when its slot comes due.'''
+    __slots__ = ('expires', 'callback', 'cancelled')
+
+    def __init__(self, expires: int, callback):
+        self.expires = expires      # absolute tick
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    '''
+    Timers for any number of parties, advanced by one background task.
+    tick (float): Seconds per tick; timers fire up to one tick late, never early.
+    clock (callable): Monotonic time source (replaceable in tests).
+    '''
+
+    def __init__(self, tick: float = TICK_SECONDS, sizes=LEVEL_SIZES, clock=time.monotonic):
+        self.tick = tick
+        self.sizes = tuple(sizes)
+        self.clock = clock
+        # Ticks covered by one slot of each level: 1, sizes[0], sizes[0] * sizes[1], ...
+        self.spans = [1]
+        for size in self.sizes[:-1]:
+            self.spans.append(self.spans[-1] * size)
+        self._levels = [[[] for _ in range(size)] for size in self.sizes]
+        self._start = clock()
+        self._now = 0               # last tick processed
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def schedule(self, delay: float, callback) -> Timer:
+        '''Calls callback() on the wheel's task after delay seconds. Returns: Timer: Its handle.'''
+        with self._lock:
+            # First tick at or after the deadline, so timers never fire early
+            due = -(-(self.clock() - self._start + max(delay, 0)) // self.tick)
+            expires = max(int(due), self._now + 1)
+            timer = Timer(expires, callback)
+            self._place(timer)
+            self._pending += 1
+        return timer
+
+    def __len__(self):
+        '''Timers not yet fired or dropped (cancelled ones included until their slot comes due).'''
+        return self._pending
+
+    def advance(self, now: float = None) -> int:
+        '''
+        Processes every tick up to now and runs the timers that came due.
+        Returns: int: How many callbacks were run.
+        '''
+        target = self._ticks_at(self.clock() if now is None else now)
+        fired = 0
+        while True:
+            with self._lock:
+                if self._now >= target:
+                    return fired
+                self._now += 1
+                due = self._collect(self._now)
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                try:
+                    timer.callback()
+                except Exception as e:
+                    print(f"[timers] Callback failed: {e}")
+                fired += 1
+
+    def run(self, sleep=time.sleep):
+        '''Tick loop for a background task. sleep (callable): e.g. socketio.sleep.'''
+        while True:
+            sleep(self.tick)
+            self.advance()
+
+    def _ticks_at(self, now: float) -> int:
+        return int((now - self._start) / self.tick)
+
+    def _place(self, timer):
+        delta = timer.expires - self._now
+        for level, size in enumerate(self.sizes):
+            span = self.spans[level]
+            if delta < span * size or level == len(self.sizes) - 1:
+                if delta >= span * size:
+                    # Beyond the top level's reach: park it in the slot that comes due last, from
+                    # where it is re-placed until it comes within range
+                    slot = (self._now // span) % size
+                else:
+                    slot = (timer.expires // span) % size
+                self._levels[level][slot].append(timer)
+                return
+
+    def _collect(self, tick: int) -> list:
+        # Cascade the higher-level slots that start at this tick (coarsest first), then take the
+        # level 0 slot that is due
+        for level in range(len(self.sizes) - 1, 0, -1):
+            span = self.spans[level]
+            if tick % span == 0:
+                slot = self._levels[level][(tick // span) % self.sizes[level]]
+                if slot:
+                    moved = slot[:]
+                    slot.clear()
+                    for timer in moved:
+                        if timer.cancelled:
+                            self._pending -= 1
+                        else:
+                            self._place(timer)
+        slot = self._levels[0][tick % self.sizes[0]]
+        waiting = slot[:]
+        slot.clear()
+        due = []
+        for timer in waiting:
+            if timer.expires <= tick:
+                due.append(timer)
+            else:
+                self._place(timer)     # parked there by a single-level wheel
+        self._pending -= len(due)
+        return due
+
@@ -1,6 +1,9 @@
 import random
+import sys
 from pathlib import Path
 
+from file_watch import MtimeWatcher
+
 '''
 This module loads words from difficulty based files and randomly selects the set of words to be used in the TTS.
 
@@ -11,29 +14,82 @@ use word files:
     - emergency_words.txt
 
     emergency isn't a difficulty level, but a special set of words to be used in hard difficulty.
+
+All four lists are loaded once into the module-level WORD_BANK as tuples of interned strings.
+Rounds sample from memory; the files are only re-read when their mtime changes.
 '''
+
+FILE_MAP = {
+    'easy': 'easy_words.txt',
+    'medium': 'medium_words.txt',
+    'hard': 'hard_words.txt',
+    'emergency': 'emergency_words.txt'
+}
+
+
+def _read_words(file_path: Path) -> tuple[str, ...]:
+    with open(file_path, 'r') as file:
+        return tuple(sys.intern(line.strip()) for line in file)
+
+
+class WordBank:
+    '''
+    All word lists held in memory, reloaded from disk only when a file changes.
+    directory (Path): Where the word files live.
+    '''
+
+    def __init__(self, directory: Path = Path(__file__).parent):
+        self.paths = {level: directory / name for level, name in FILE_MAP.items()}
+        self._lists = {}
+        self.reload()
+        self.watcher = MtimeWatcher(list(self.paths.values()), self.reload)
+
+    def reload(self):
+        '''Re-reads every list and swaps them in together (a single reference assignment).'''
+        self._lists = {level: _read_words(path) for level, path in self.paths.items()}
+
+    def start_watching(self):
+        '''Hot-reloads the lists in the background when a word file is edited.'''
+        self.watcher.start()
+
+    def words(self, difficulty: str) -> tuple[str, ...]:
+        '''Returns the (shared, immutable) word tuple for a difficulty.'''
+        if difficulty not in self.paths:
+            raise ValueError("Invalid difficulty level. Choose from 'easy', 'medium', 'hard' or 'emergency'.")
+        return self._lists[difficulty]
+
+    def sample(self, difficulty: str, k: int) -> list[str]:
+        '''
+        Picks k distinct words without copying the list (O(k) random index draws).
+        difficulty: The difficulty level ('easy', 'medium', 'hard', 'emergency').
+        Returns: list[str]: The selected words.
+        '''
+        words = self.words(difficulty)
+        if k > len(words):
+            raise ValueError("Sample larger than word list")
+        if k * 2 > len(words):
+            return random.sample(words, k)
+        # The set is only for membership; the list keeps the draw order random
+        seen = set()
+        chosen = []
+        while len(chosen) < k:
+            index = random.randrange(len(words))
+            if index not in seen:
+                seen.add(index)
+                chosen.append(index)
+        return [words[i] for i in chosen]
+
+
+WORD_BANK = WordBank()
+
+
 def load_words(difficulty: str) -> list[str]:
     '''
     Loads words from a file based on the given difficulty level.
     difficulty: The difficulty level ('easy', 'medium', 'hard').
     Returns: list[str]: A list of words loaded from the corresponding file.
     '''
-    file_map = {
-        'easy': 'easy_words.txt',
-        'medium': 'medium_words.txt',
-        'hard': 'hard_words.txt',
-        'emergency': 'emergency_words.txt'
-    }
-    
-    if difficulty not in file_map:
-        raise ValueError("Invalid difficulty level. Choose from 'easy', 'medium', or 'hard'.")
-    
-    file_path = Path(__file__).parent / file_map[difficulty]
-    
-    with open(file_path, 'r') as file:
-        words = [line.strip() for line in file.readlines()]
-    
-    return words
+    return list(WORD_BANK.words(difficulty))
   
 if __name__ == "__main__":
     print("Testing word loader...\n")
@@ -42,3 +98,4 @@ if __name__ == "__main__":
     print("Medium:", load_words("medium")[:10])
     print("Hard:", load_words("hard")[:10])
     print("Emergency:", load_words("emergency")[:10])
+    print("Sample:", WORD_BANK.sample("hard", 4))
@@ -0,0 +1,81 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Bounded pool for blocking work (gTTS synthesis, MP3 assembly, file writes, image encoding).
+
+The server can run on real threads (the default, Werkzeug) or on green threads (eventlet or
+gevent, see ASYNC_MODE in app.py). On green threads a handler that blocks on a C call or a CPU
+loop stalls every other party, so that work must run on real OS threads while the calling
+green thread waits without holding up the event loop:
+
+    data = workers.run_blocking(audio_output.render_number_audio, text, slow, accents)
+
+run_blocking picks the right mechanism for the active mode:
+    - eventlet: eventlet.tpool (native threads, sized to BLOCKING_WORKERS)
+    - gevent: a gevent.threadpool.ThreadPool of BLOCKING_WORKERS native threads
+    - threading: a ThreadPoolExecutor, so no more than BLOCKING_WORKERS syntheses run at once
+
+Call configure() once at startup, after monkey patching; until then the threading pool is used.
+'''
+
+BLOCKING_WORKERS = int(os.environ.get('BLOCKING_WORKERS', 4))
+MODES = ('threading', 'eventlet', 'gevent')
+
+_mode = 'threading'
+_pool = None
+_lock = threading.Lock()
+
+
+def configure(mode: str, workers: int = BLOCKING_WORKERS):
+    '''
+    Selects how blocking work is run.
+    mode (str): 'threading', 'eventlet' or 'gevent' (the Socket.IO async mode).
+    workers (int): Maximum number of blocking calls running at once.
+    '''
+    global _mode, _pool
+    if mode not in MODES:
+        raise ValueError(f"Unknown async mode {mode!r}, expected one of {', '.join(MODES)}")
+    with _lock:
+        _mode = mode
+        if mode == 'eventlet':
+            from eventlet import tpool
+            tpool.set_num_threads(workers)
+            _pool = tpool
+        elif mode == 'gevent':
+            from gevent.threadpool import ThreadPool
+            _pool = ThreadPool(workers)
+        else:
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='blocking')
+
+
+def mode() -> str:
+    return _mode
+
+
+def run_blocking(fn, *args, **kwargs):
+    '''
+    Runs fn(*args, **kwargs) on the blocking pool and returns its result (or raises its exception).
+    Only the calling thread or green thread waits; the event loop keeps serving other events.
+    '''
+    if _pool is None:
+        configure(_mode)
+    if _mode == 'eventlet':
+        return _pool.execute(fn, *args, **kwargs)
+    if _mode == 'gevent':
+        return _pool.apply(fn, args, kwargs)
+    return _pool.submit(fn, *args, **kwargs).result()
+
+
+if __name__ == "__main__":
+    import time
+
+    configure('threading', workers=2)
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run_blocking, args=(time.sleep, 0.2)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"4 x 0.2s sleeps on 2 workers took {time.perf_counter() - start:.2f}s")